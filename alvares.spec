@@ -27,6 +27,7 @@ a = Analysis(
         'PIL',
         'PIL._tkinter_finder',
         'openpyxl',
+        'numpy',
         'docx',
         'data',
         'data.database',
@@ -39,6 +40,24 @@ a = Analysis(
         'month_utils',
         'tabel_filler',
         'excel_processor',
+        'tabel_matrix',
+        'tabel_cache',
+        'xlsx_reader',
+        'tabel_catalog',
+        'rop_index',
+        'tabel_history',
+        'tabel_changes',
+        'tabel_integrity',
+        'strength_series',
+        'yearly_summary',
+        'date_parser',
+        'parallel_utils',
+        'pib_resolver',
+        'memory_cache',
+        'snapshot',
+        'tabel_source',
+        'shared_tabel',
+        'tabel_compactor',
         'excel_reports',
         'word_generator',
         'version',
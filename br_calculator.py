@@ -4,6 +4,8 @@
 from datetime import datetime, timedelta
 from typing import List, Tuple
 
+from date_parser import parse_date_value
+
 def get_br_number(date: datetime) -> str:
     """
     Повертає номер БР для заданої дати
@@ -82,19 +84,13 @@ def parse_date_from_excel_cell(cell_value) -> datetime:
     Returns:
         datetime: Об'єкт дати
     """
-    if isinstance(cell_value, datetime):
-        return cell_value
-    elif isinstance(cell_value, str):
-        # Спробуємо різні формати дат
-        formats = ["%d.%m.%Y", "%d/%m/%Y", "%Y-%m-%d"]
-        for fmt in formats:
-            try:
-                return datetime.strptime(cell_value, fmt)
-            except ValueError:
-                continue
+    # дд.мм.рррр, дд/мм/рррр, ISO та серійні номери Excel (див. date_parser)
+    result = parse_date_value(cell_value)
+    if result is not None:
+        return result
+    if isinstance(cell_value, str):
         raise ValueError(f"Неможливо розпарсити дату: {cell_value}")
-    else:
-        raise ValueError(f"Невідомий тип даних для дати: {type(cell_value)}")
+    raise ValueError(f"Невідомий тип даних для дати: {type(cell_value)}")
 
 def get_day_column_for_date(date: datetime, base_year: int, base_month: int) -> int:
     """
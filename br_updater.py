@@ -2,27 +2,18 @@
 Утиліти для роботи з БР документами: парсинг дат, форматування ПІБ, читання табеля.
 """
 import re
-import os
 from datetime import datetime, timedelta
-from month_utils import parse_month_sheet_name
-import openpyxl
 from typing import List, Tuple
-
-# Кеш workbook: {шлях_файлу: workbook} — щоб не відкривати файл по 5 разів на кожен день
-_wb_cache = {}
-
-
-def _get_workbook(tabel_file: str):
-    """Повертає кешований workbook або завантажує новий."""
-    real_path = os.path.realpath(tabel_file)
-    if real_path not in _wb_cache:
-        _wb_cache[real_path] = openpyxl.load_workbook(tabel_file, data_only=True)
-    return _wb_cache[real_path]
+from pib_resolver import canonical_pib
+from rop_index import get_rop_index
+from tabel_matrix import MARK_100, MARK_ROP, MARK_30
+from tabel_cache import clear_memory_cache
+from tabel_source import get_tabel_source
 
 
 def clear_wb_cache():
-    """Очищає кеш workbook (викликати після завершення генерації)."""
-    _wb_cache.clear()
+    """Очищає кеш розібраного табеля в пам'яті (викликати після завершення генерації)."""
+    clear_memory_cache()
 
 
 def parse_filename_date(filename: str) -> datetime:
@@ -116,15 +107,16 @@ def pib_to_table_format(pib: str, rank: str = "") -> str:
 
 def normalize_pib(pib: str) -> str:
     """
-    Нормалізує ПІБ для порівняння (видаляє зайві пробіли)
+    Нормалізує ПІБ для порівняння (див. pib_resolver.canonical_pib):
+    регістр, апострофи, латинські двійники літер та пробіли не враховуються
 
     Args:
         pib: ПІБ
 
     Returns:
-        str: Нормалізований ПІБ
+        str: Канонічний ключ ПІБ (не для виводу в документи)
     """
-    return ' '.join(pib.strip().split())
+    return canonical_pib(pib)
 
 
 def get_soldiers_from_tabel(tabel_file: str, date: datetime) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
@@ -149,69 +141,17 @@ def _get_soldiers_from_tabel_detailed(
     tabel_file: str, date: datetime
 ) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]], List[Tuple[str, str]]]:
     """
-    Отримує списки ПІБ та звань з розділенням 100, роп та 30.
+    Отримує списки ПІБ та звань з розділенням 100, роп та 30
+    (з найшвидшого джерела табеля, див. tabel_source).
 
     Returns:
         (soldiers_100, soldiers_rop, soldiers_30)
+
+    Raises:
+        ValueError: якщо аркуш не знайдено або немає рядка заголовків
     """
-    wb = _get_workbook(tabel_file)
-
-    sheet_name = None
-    for name in wb.sheetnames:
-        parsed = parse_month_sheet_name(name)
-        if parsed and parsed[0] == date.year and parsed[1] == date.month:
-            sheet_name = name
-            break
-
-    if not sheet_name:
-        raise ValueError(f"Аркуш для {date.strftime('%m.%Y')} не знайдено")
-
-    ws = wb[sheet_name]
-
-    header_row = None
-    for row in range(1, 20):
-        if ws.cell(row, 6).value and "ПІБ" in str(ws.cell(row, 6).value):
-            header_row = row
-            break
-
-    if not header_row:
-        raise ValueError("Не знайдено рядок з заголовками")
-
-    col_num = 6 + date.day
-
-    soldiers_100 = []
-    soldiers_rop = []
-    soldiers_30 = []
-
-    for row in range(header_row + 1, ws.max_row + 1):
-        pib = ws.cell(row, 6).value
-        rank = ws.cell(row, 5).value or ""
-
-        if not pib or not str(pib).strip():
-            continue
-
-        pib_str = str(pib).strip()
-        rank_str = str(rank).strip() if rank else ""
-        mark = ws.cell(row, col_num).value
-
-        if mark:
-            mark_str = str(mark).strip()
-            # openpyxl може повертати float (100.0 замість 100)
-            try:
-                num_val = float(mark_str)
-                if num_val == int(num_val):
-                    mark_str = str(int(num_val))
-            except (ValueError, TypeError):
-                pass
-            mark_str = mark_str.lower()
-            if mark_str == "100":
-                soldiers_100.append((pib_str, rank_str))
-            elif mark_str == "роп":
-                soldiers_rop.append((pib_str, rank_str))
-            elif mark_str == "30":
-                soldiers_30.append((pib_str, rank_str))
-
-    return soldiers_100, soldiers_rop, soldiers_30
+    people = get_tabel_source(tabel_file).people_by_mark(date)
+    return people.get(MARK_100, []), people.get(MARK_ROP, []), people.get(MARK_30, [])
 
 
 def get_first_rop_entries(
@@ -219,67 +159,13 @@ def get_first_rop_entries(
 ) -> List[Tuple[str, str, str]]:
     """
     Знаходить бійців, у яких на дату табеля (br_date+1) починається серія 'роп'.
-    Тобто: tabel_day == 'роп' AND попередній день != 'роп'.
+    Тобто: tabel_day == 'роп' AND попередній день != 'роп'
+    (попередній день може бути на аркуші попереднього місяця).
 
     Returns:
         [(pib, rank, position)] — позиція з маленької літери
     """
-    tabel_date = get_tabel_date(br_date)
-
-    wb = _get_workbook(tabel_file)
-
-    sheet_name = None
-    for name in wb.sheetnames:
-        parsed = parse_month_sheet_name(name)
-        if parsed and parsed[0] == tabel_date.year and parsed[1] == tabel_date.month:
-            sheet_name = name
-            break
-
-    if not sheet_name:
-        return []
-
-    ws = wb[sheet_name]
-
-    header_row = None
-    for row in range(1, 20):
-        if ws.cell(row, 6).value and "ПІБ" in str(ws.cell(row, 6).value):
-            header_row = row
-            break
-
-    if not header_row:
-        return []
-
-    tabel_col = 6 + tabel_date.day
-    prev_col = 6 + br_date.day if br_date.month == tabel_date.month else None
-
-    result = []
-    for row in range(header_row + 1, ws.max_row + 1):
-        pib = ws.cell(row, 6).value
-        if not pib or not str(pib).strip():
-            continue
-
-        mark = ws.cell(row, tabel_col).value
-        if not mark or str(mark).strip().lower() != "роп":
-            continue
-
-        # Перевіряємо попередній день
-        if prev_col:
-            prev_mark = ws.cell(row, prev_col).value
-            prev_str = str(prev_mark).strip().lower() if prev_mark else ""
-            if prev_str == "роп":
-                continue  # Не перший день серії
-        # Якщо prev_col is None (перший день місяця) — вважаємо першим роп
-
-        pib_str = str(pib).strip()
-        rank_str = str(ws.cell(row, 5).value or "").strip()
-        position = ws.cell(row, 4).value
-        position_str = str(position).strip() if position else ""
-        if position_str:
-            position_str = position_str[0].lower() + position_str[1:]
-
-        result.append((pib_str, rank_str, position_str))
-
-    return result
+    return get_tabel_source(tabel_file).rop_first_day(get_tabel_date(br_date))
 
 
 def get_soldiers_returning_from_rop(
@@ -295,13 +181,14 @@ def get_soldiers_returning_from_rop(
         [(pib, rank)]
     """
     tabel_date = get_tabel_date(br_date)
+    rop_index = get_rop_index(tabel_file)
 
-    try:
-        _, rop_on_br_date, _ = _get_soldiers_from_tabel_detailed(tabel_file, br_date)
-    except ValueError:
+    # Без аркуша дати табеля не можна сказати, що серія закінчилась
+    if not rop_index.has_month(tabel_date):
         return []
 
-    if not rop_on_br_date:
+    ending = rop_index.ending(br_date)
+    if not ending:
         return []
 
     try:
@@ -314,7 +201,7 @@ def get_soldiers_returning_from_rop(
 
     return [
         (pib, rank)
-        for pib, rank in rop_on_br_date
+        for pib, rank in ending
         if normalize_pib(pib) not in already_in_br
     ]
 
@@ -324,64 +211,10 @@ def get_continuing_rop_entries(
 ) -> List[Tuple[str, str, str]]:
     """
     Знаходить бійців, у яких на дату табеля (br_date+1) продовжується серія 'роп'.
-    Тобто: tabel_day == 'роп' AND попередній день == 'роп' (не перший день).
+    Тобто: tabel_day == 'роп' AND попередній день == 'роп' (не перший день),
+    зокрема коли серія переходить з попереднього місяця.
 
     Returns:
         [(pib, rank, position)] — позиція з маленької літери
     """
-    tabel_date = get_tabel_date(br_date)
-
-    wb = _get_workbook(tabel_file)
-
-    sheet_name = None
-    for name in wb.sheetnames:
-        parsed = parse_month_sheet_name(name)
-        if parsed and parsed[0] == tabel_date.year and parsed[1] == tabel_date.month:
-            sheet_name = name
-            break
-
-    if not sheet_name:
-        return []
-
-    ws = wb[sheet_name]
-
-    header_row = None
-    for row in range(1, 20):
-        if ws.cell(row, 6).value and "ПІБ" in str(ws.cell(row, 6).value):
-            header_row = row
-            break
-
-    if not header_row:
-        return []
-
-    tabel_col = 6 + tabel_date.day
-    prev_col = 6 + br_date.day if br_date.month == tabel_date.month else None
-
-    result = []
-    for row in range(header_row + 1, ws.max_row + 1):
-        pib = ws.cell(row, 6).value
-        if not pib or not str(pib).strip():
-            continue
-
-        mark = ws.cell(row, tabel_col).value
-        if not mark or str(mark).strip().lower() != "роп":
-            continue
-
-        # Тільки ті, у кого попередній день теж "роп" (продовження серії)
-        if not prev_col:
-            continue  # Перший день місяця — вважаємо першим роп, пропускаємо
-        prev_mark = ws.cell(row, prev_col).value
-        prev_str = str(prev_mark).strip().lower() if prev_mark else ""
-        if prev_str != "роп":
-            continue  # Перший день серії — пропускаємо
-
-        pib_str = str(pib).strip()
-        rank_str = str(ws.cell(row, 5).value or "").strip()
-        position = ws.cell(row, 4).value
-        position_str = str(position).strip() if position else ""
-        if position_str:
-            position_str = position_str[0].lower() + position_str[1:]
-
-        result.append((pib_str, rank_str, position_str))
-
-    return result
+    return get_tabel_source(tabel_file).rop_continuing(get_tabel_date(br_date))
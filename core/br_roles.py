@@ -3,7 +3,7 @@
 """
 import os
 import sys
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import List, Dict, Tuple, Optional
 
 # Додаємо кореневу директорію проєкту в sys.path для імпортів
@@ -14,9 +14,15 @@ else:
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
-from br_updater import get_tabel_date, get_soldiers_from_tabel, _get_soldiers_from_tabel_detailed, pib_to_document_format, normalize_pib, get_soldiers_returning_from_rop, _get_workbook
+from br_updater import get_tabel_date, get_soldiers_from_tabel, _get_soldiers_from_tabel_detailed, pib_to_document_format, normalize_pib, get_soldiers_returning_from_rop
 from br_calculator import get_br_number
-from excel_processor import TabelReader
+from tabel_source import get_tabel_source
+from xlsx_reader import XlsxReader
+from date_parser import parse_date_column
+from tabel_matrix import MARK_100, MARK_ROP
+from pib_resolver import PibResolver
+from memory_cache import file_cache
+from snapshot import file_exists, file_version, get_snapshot, pinned_snapshot, read_text
 from data.database import (
     get_all_roles, get_role_composition, get_all_personnel,
     set_personnel_role, upsert_personnel_batch, get_connection
@@ -52,6 +58,8 @@ ROLE_DEFAULTS = {
 # Ролі, абзац яких видаляється якщо немає бійців
 ROLE_REMOVE_IF_EMPTY = {"{{ROLE_PPP}}"}
 
+# Індекс BR_4ShB.xlsx кешується у file_cache: ("br_4shb", шлях) -> ((mtime_ns, size), {дата: номер_БР})
+
 
 def auto_assign_role(position: str) -> Optional[str]:
     """
@@ -119,14 +127,16 @@ def import_personnel_from_tabel(tabel_file: str, sheet_name: str) -> int:
     Імпортує особовий склад з аркуша табеля до БД.
     Повертає кількість імпортованих записів.
     """
-    reader = TabelReader(tabel_file)
-    reader.load_workbook()
-    soldiers = reader.read_month_data(sheet_name)
-
-    records = []
-    for s in soldiers:
-        if s.pib and s.pib.strip():
-            records.append((s.pib, s.rank, s.position))
+    matrix = get_tabel_source(tabel_file).month_matrix(sheet_name)
+
+    # Існуючі записи зберігають своє написання ПІБ (і призначені ролі),
+    # навіть якщо в табелі ПІБ записано інакше (регістр, апостроф, латинська "i")
+    resolver = PibResolver(p["pib"] for p in get_all_personnel())
+    records = [
+        (resolver.resolve(pib) or pib, rank, position)
+        for pib, rank, position in zip(matrix.pibs.tolist(), matrix.ranks.tolist(),
+                                       matrix.positions.tolist())
+    ]
 
     if records:
         return upsert_personnel_batch(records)
@@ -138,17 +148,10 @@ def get_active_personnel_for_month(tabel_file: str, sheet_name: str) -> List[Dic
     Повертає бійців з позначками "100" та/або "роп" за обраний місяць.
     Формат повернення збігається з get_all_personnel() (pib, rank, position, role_id, role_name).
     """
-    reader = TabelReader(tabel_file)
-    reader.load_workbook()
-    soldiers = reader.read_month_data(sheet_name)
-
-    active_pibs = set()
-    for s in soldiers:
-        if s.days_100_combined:
-            active_pibs.add(s.pib.strip())
+    active = PibResolver(get_tabel_source(tabel_file).month_pibs(sheet_name, (MARK_100, MARK_ROP)))
 
     all_personnel = get_all_personnel()
-    return [p for p in all_personnel if p["pib"].strip() in active_pibs]
+    return [p for p in all_personnel if p["pib"] in active]
 
 
 def auto_assign_all_roles() -> Dict[str, int]:
@@ -432,6 +435,36 @@ def _insert_ack_list(paragraph, members: list):
     parent.remove(paragraph._element)
 
 
+def _load_br_4shb_index(br_4shb_file: str) -> Dict[date, str]:
+    """
+    Повертає {дата: номер_БР} з першого аркуша BR_4ShB.xlsx.
+    Кешується до зміни mtime/розміру файлу; при кількох записах на дату — останній.
+    """
+    real_path = os.path.realpath(br_4shb_file)
+    signature = file_version(real_path)
+
+    cached = file_cache.get(("br_4shb", real_path), lambda entry: entry[0] == signature)
+    if cached:
+        return cached[1]
+
+    snapshot = get_snapshot(real_path)
+    index = {}
+    with XlsxReader(snapshot.open()) as reader:
+        rows = reader.iter_rows(reader.sheetnames[0], max_col=2)
+        records = [(values[0], values[1]) for row_number, values in enumerate(rows, start=1)
+                   if row_number >= 2 and len(values) >= 2 and values[0] and values[1]]
+        # Стовпець дат розбирається пакетом (серійні номери Excel, ISO, дд.мм.рррр)
+        dates = parse_date_column([cell_date for _, cell_date in records], date1904=reader.date1904)
+
+    for (cell_id, _), row_date in zip(records, dates):
+        if row_date is not None:
+            index[row_date.date()] = str(cell_id)
+
+    size = sys.getsizeof(index) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in index.items())
+    file_cache.put(("br_4shb", real_path), (snapshot.version, index), size)
+    return index
+
+
 def get_br_from_4shb(br_4shb_file: str, tabel_date: datetime) -> Tuple[str, str]:
     """
     Знаходить номер та дату БР з файлу BR_4ShB.xlsx для дати табеля.
@@ -444,39 +477,16 @@ def get_br_from_4shb(br_4shb_file: str, tabel_date: datetime) -> Tuple[str, str]
     Returns:
         (номер_бр, дата_бр_форматована) або ("—", "—") якщо не знайдено
     """
-    if not os.path.exists(br_4shb_file):
+    if pinned_snapshot(br_4shb_file) is None and not os.path.exists(br_4shb_file):
         return "—", "—"
 
-    wb = _get_workbook(br_4shb_file)
-    ws = wb[wb.sheetnames[0]]
-
     target_date = tabel_date.date() if hasattr(tabel_date, 'date') else tabel_date
 
     # Шукаємо останній запис з потрібною датою (якщо декілька на одну дату)
-    found_id = None
-    found_date = None
-
-    for row in range(2, ws.max_row + 1):
-        cell_id = ws.cell(row, 1).value
-        cell_date = ws.cell(row, 2).value
-
-        if not cell_id or not cell_date:
-            continue
+    found_id = _load_br_4shb_index(br_4shb_file).get(target_date)
 
-        if hasattr(cell_date, 'date'):
-            row_date = cell_date.date()
-        elif isinstance(cell_date, str):
-            from datetime import datetime as dt
-            row_date = dt.strptime(cell_date[:10], "%Y-%m-%d").date()
-        else:
-            continue
-
-        if row_date == target_date:
-            found_id = str(cell_id)
-            found_date = row_date
-
-    if found_id and found_date:
-        date_str = found_date.strftime("%d.%m.%Y")
+    if found_id:
+        date_str = target_date.strftime("%d.%m.%Y")
         return found_id, date_str
 
     return "—", "—"
@@ -649,10 +659,9 @@ def generate_br_word(
         replacements["{{ROP}}"] = rop_list
 
     # Завдання з ROP.txt: {{ROP1}}-{{ROP4}}
-    if rop_txt_path and os.path.exists(rop_txt_path):
+    if rop_txt_path and file_exists(rop_txt_path):
         import re
-        with open(rop_txt_path, "r", encoding="utf-8") as f:
-            rop_content = f.read()
+        rop_content = read_text(rop_txt_path)
         for m in re.finditer(r"\{\{ROP(\d+)\}\}\s*(.+)", rop_content):
             marker = f"{{{{ROP{m.group(1)}}}}}"
             task_text = m.group(2).strip()
@@ -738,5 +747,17 @@ def generate_br_word(
     return output_file
 
 
+def render_br_job(task: tuple) -> str:
+    """
+    Генерує один БР у дочірньому процесі пакетної генерації.
+    task = (опис SharedTabel або None, дата БР, склад, шаблон, kwargs generate_br_word)
 
-
+    З описом задача бачить табель і файли (BR_4ShB.xlsx, Dodatky.md, ROP.txt)
+    тих версій, що й батьківський пакет (див. shared_tabel.attached_batch).
+    """
+    descriptor, br_date, composition, template_path, kwargs = task
+    if descriptor is None:
+        return generate_br_word(br_date, composition, template_path, **kwargs)
+    from shared_tabel import attached_batch
+    with attached_batch(descriptor):
+        return generate_br_word(br_date, composition, template_path, **kwargs)
@@ -5,6 +5,9 @@ import re
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from date_parser import parse_date_token
+from snapshot import file_exists, read_text
+
 
 def parse_dodatky(filepath: str) -> List[Dict]:
     """
@@ -18,8 +21,8 @@ def parse_dodatky(filepath: str) -> List[Dict]:
     Returns:
         [{date: datetime, населений_пункт: str, КСП_РОТИ: str}, ...]
     """
-    with open(filepath, "r", encoding="utf-8") as f:
-        content = f.read()
+    # Через знімок: у пакеті БР — закріплена версія файлу
+    content = read_text(filepath)
 
     entries = []
     for line in content.splitlines():
@@ -38,9 +41,8 @@ def parse_dodatky(filepath: str) -> List[Dict]:
         date_str = re.sub(r"\*+", "", parts[0]).strip()
         # Також прибираємо зворотні слеші (markdown escape)
         date_str = date_str.replace("\\", "")
-        try:
-            dt = datetime.strptime(date_str, "%d.%m.%Y")
-        except ValueError:
+        dt = parse_date_token(date_str)
+        if dt is None:
             continue
 
         location = parts[1].replace("\\", "").strip()
@@ -65,8 +67,7 @@ def get_location_for_date(filepath: str, br_date: datetime) -> Dict[str, str]:
     Returns:
         {населений_пункт: str, КСП_РОТИ: str} або {населений_пункт: "—", КСП_РОТИ: "—"}
     """
-    import os
-    if not os.path.exists(filepath):
+    if not file_exists(filepath):
         return {"населений_пункт": "—", "КСП_РОТИ": "—"}
 
     entries = parse_dodatky(filepath)
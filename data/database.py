@@ -206,3 +206,20 @@ def set_setting(key: str, value: str) -> None:
         conn.commit()
     finally:
         conn.close()
+
+
+def get_int_setting(key: str, default: int) -> int:
+    """
+    Цілочисельне налаштування; default, якщо його немає, воно некоректне
+    або app.db ще не створено (файл БД при цьому не створюється).
+    """
+    if not os.path.exists(DB_PATH):
+        return default
+    try:
+        value = get_setting(key, "")
+    except sqlite3.Error:
+        return default
+    try:
+        return int(value) if value else default
+    except ValueError:
+        return default
@@ -0,0 +1,118 @@
+"""
+Швидкий розбір дат з комірок.
+
+Дати в табелі, місячних файлах, BR_4ShB.xlsx та Dodatky.md розбиралися
+через datetime.strptime у циклах по рядках, часто з кількома спробами
+форматів на значення. Тут один спільний розбір:
+  - рядки "дд.мм.рррр", "дд/мм/рррр" та ISO "рррр-мм-дд" (можливо з часом) —
+    прямою нарізкою цифр, без strptime;
+  - серійні номери дат Excel (числа);
+  - комірки з кількома датами через пробіли/переноси рядків.
+Повторювані рядки розбираються один раз (кеш), а parse_date_column()
+розбирає стовпець цілком, не повторюючи розбір однакових значень.
+"""
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+from xlsx_reader import excel_serial_to_datetime
+
+# Допустимі серійні номери Excel (до 31.12.9999)
+_MAX_EXCEL_SERIAL = 2958465
+
+
+def _make(year: str, month: str, day: str) -> Optional[datetime]:
+    if not (year.isdigit() and month.isdigit() and day.isdigit()):
+        return None
+    try:
+        return datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def parse_date_token(token: str) -> Optional[datetime]:
+    """
+    Дата з одного рядка: "дд.мм.рррр", "дд/мм/рррр" (день і місяць можуть бути
+    однозначними, як у strptime) або ISO "рррр-мм-дд[...]". None — не дата.
+    """
+    token = token.strip()
+    if not token.isascii():
+        return None
+    n = len(token)
+    if n >= 10 and token[4] == "-" and token[7] == "-":
+        # ISO: рррр-мм-дд, далі може бути час ("T00:00:00" або " 00:00:00")
+        if n > 10 and token[10] not in "T ":
+            return None
+        return _make(token[:4], token[5:7], token[8:10])
+    if n == 10 and token[2] in "./" and token[5] == token[2]:
+        return _make(token[6:], token[3:5], token[:2])
+    # Повільніший шлях: однозначні день/місяць ("1.5.2025", "2025-5-1")
+    for sep in "./-":
+        if sep in token:
+            parts = token.split(sep)
+            if len(parts) != 3 or not (1 <= len(parts[1]) <= 2):
+                return None
+            if sep == "-":
+                year, day = parts[0], parts[2]
+            else:
+                year, day = parts[2], parts[0]
+            if len(year) == 4 and 1 <= len(day) <= 2:
+                return _make(year, parts[1], day)
+            return None
+    return None
+
+
+def parse_date_value(value, date1904: bool = False) -> Optional[datetime]:
+    """
+    Дата зі значення комірки: datetime/date, рядок з однією датою або
+    серійний номер Excel. None — значення не є датою.
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        return parse_date_token(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if 0 < value <= _MAX_EXCEL_SERIAL:
+            return excel_serial_to_datetime(value, date1904)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _cell_dates(text: str) -> Tuple[datetime, ...]:
+    return tuple(d for d in map(parse_date_token, text.split()) if d is not None)
+
+
+def parse_dates_in_cell(value, date1904: bool = False) -> List[datetime]:
+    """Всі дати з комірки (у рядку — кілька дат через пробіли/переноси рядків)"""
+    if isinstance(value, str):
+        return list(_cell_dates(value))
+    result = parse_date_value(value, date1904)
+    return [result] if result is not None else []
+
+
+def parse_date_column(values: Iterable, last: bool = False,
+                      date1904: bool = False) -> List[Optional[datetime]]:
+    """
+    Розбір стовпця комірок: для кожної — найраніша (або найпізніша, last=True)
+    з її дат, None — дати немає. Однакові значення розбираються один раз.
+    """
+    pick = max if last else min
+    memo = {}
+    result = []
+    for value in values:
+        # Тип у ключі — щоб True, 1 та 1.0 не збігались
+        key = (value.__class__, value)
+        try:
+            parsed = memo[key]
+        except KeyError:
+            dates = parse_dates_in_cell(value, date1904)
+            parsed = memo[key] = pick(dates) if dates else None
+        except TypeError:
+            # Нехешоване значення — без кешу
+            dates = parse_dates_in_cell(value, date1904)
+            parsed = pick(dates) if dates else None
+        result.append(parsed)
+    return result
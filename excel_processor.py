@@ -2,48 +2,185 @@
 Модуль читання даних з місячних табелів
 """
 from month_utils import MONTH_NAMES_UK, parse_month_sheet_name
-import openpyxl
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Sequence
 from br_calculator import parse_date_from_excel_cell, get_day_column_for_date, get_br_number, format_br_list
+from tabel_matrix import MARK_100, MARK_ROP, MARK_30, MARK_0, COL_NOTE, split_sheet_rows
+from tabel_cache import TabelData
+from tabel_source import get_tabel_source
+from snapshot import get_snapshot
+from xlsx_reader import XlsxReader
+
+# Категорії SoldierData -> слот маски днів ("100" = 100 + роп)
+_CATEGORY_SLOTS = {
+    "100": ("mask_100", "mask_rop"),
+    "роп": ("mask_rop",),
+    "30": ("mask_30",),
+    "0": ("mask_0",),
+}
+
+_MARK_SLOTS = {
+    "100": "mask_100",
+    "роп": "mask_rop",
+    "30": "mask_30",
+    "0": "mask_0",
+    "н-п": "mask_0",
+    "н/п": "mask_0",
+}
+
+# Коди позначок у порядку аргументів SoldierData.set_masks
+_MASK_CODES = (MARK_100, MARK_ROP, MARK_30, MARK_0)
+_MASK_SLOT_INDEX = {code: i for i, code in enumerate(_MASK_CODES)}
+
+
+def _mask_days(mask: int) -> Iterator[int]:
+    """Номери днів (1-based) з маски, у порядку зростання"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length()
+        mask ^= low
+
 
 class SoldierData:
-    """Клас для зберігання даних про бійця"""
-    
-    def __init__(self, row_number: int, pib: str, rank: str, position: str):
+    """
+    Клас для зберігання даних про бійця.
+
+    Дні кожної категорії зберігаються як 31-бітна маска місяця (біт d-1 = день d).
+    Списки дат, номери БР тощо будуються ліниво при першому зверненні і кешуються.
+    """
+
+    __slots__ = ("row_number", "pib", "rank", "position", "year", "month",
+                 "mask_100", "mask_rop", "mask_30", "mask_0",
+                 "_note", "no_payment", "_derived")
+
+    def __init__(self, row_number: int, pib: str, rank: str, position: str,
+                 year: Optional[int] = None, month: Optional[int] = None):
         self.row_number = row_number
         self.pib = pib
         self.rank = rank
         self.position = position
-        self.days_100: List[datetime] = []  # Дні з позначкою 100
-        self.days_rop: List[datetime] = []  # Дні з позначкою роп (позиції, прирівнюється до 100)
-        self.days_30: List[datetime] = []   # Дні з позначкою 30
-        self.days_0: List[datetime] = []    # Дні з позначкою н-п
-        self.note: str = ""                 # Примітка (може містити "не виплачувати")
-        self.br_numbers_100: List[str] = [] # Номери БР для днів 100 (включаючи роп)
-        self.br_numbers_30: List[str] = []  # Номери БР для днів 30
+        self.year = year
+        self.month = month
+        self.mask_100 = 0  # Дні з позначкою 100
+        self.mask_rop = 0  # Дні з позначкою роп (позиції, прирівнюється до 100)
+        self.mask_30 = 0   # Дні з позначкою 30
+        self.mask_0 = 0    # Дні з позначкою н-п
+        self._note = ""
+        self.no_payment = False  # Примітка містить "не виплачувати"
+        self._derived: Dict[str, Any] = {}
+
+    @property
+    def note(self) -> str:
+        """Примітка (може містити "не виплачувати")"""
+        return self._note
+
+    @note.setter
+    def note(self, value: str):
+        self._note = value or ""
+        self.no_payment = "не виплачувати" in self._note.lower()
 
     def add_day(self, date: datetime, mark: str):
         """Додає день з позначкою"""
-        if mark == "100":
-            self.days_100.append(date)
-        elif mark == "роп":
-            self.days_rop.append(date)
-        elif mark == "30":
-            self.days_30.append(date)
-        elif mark in ["0", "н-п", "н/п"]:
-            self.days_0.append(date)
+        slot = _MARK_SLOTS.get(mark)
+        if not slot:
+            return
+        if self.year is None:
+            self.year, self.month = date.year, date.month
+        elif (date.year, date.month) != (self.year, self.month):
+            raise ValueError(f"Дата {date.strftime('%d.%m.%Y')} поза місяцем {self.month:02d}.{self.year}")
+        setattr(self, slot, getattr(self, slot) | (1 << (date.day - 1)))
+        self._derived.clear()
+
+    def set_masks(self, mask_100: int, mask_rop: int, mask_30: int, mask_0: int):
+        """Встановлює маски днів усіх категорій"""
+        self.mask_100 = mask_100
+        self.mask_rop = mask_rop
+        self.mask_30 = mask_30
+        self.mask_0 = mask_0
+        self._derived.clear()
+
+    def category_mask(self, category: str) -> int:
+        """Маска днів категорії ("100" включає роп)"""
+        mask = 0
+        for slot in _CATEGORY_SLOTS[category]:
+            mask |= getattr(self, slot)
+        return mask
+
+    def _dates(self, key: str, mask: int) -> List[datetime]:
+        """Список дат за маскою (будується один раз і кешується під ключем)"""
+        dates = self._derived.get(key)
+        if dates is None:
+            year, month = self.year, self.month
+            dates = [datetime(year, month, day) for day in _mask_days(mask)]
+            self._derived[key] = dates
+        return dates
+
+    @property
+    def days_100(self) -> List[datetime]:
+        """Дні з позначкою 100"""
+        return self._dates("days_100", self.mask_100)
+
+    @property
+    def days_rop(self) -> List[datetime]:
+        """Дні з позначкою роп"""
+        return self._dates("days_rop", self.mask_rop)
+
+    @property
+    def days_30(self) -> List[datetime]:
+        """Дні з позначкою 30"""
+        return self._dates("days_30", self.mask_30)
+
+    @property
+    def days_0(self) -> List[datetime]:
+        """Дні з позначкою н-п"""
+        return self._dates("days_0", self.mask_0)
 
     @property
     def days_100_combined(self) -> List[datetime]:
         """Всі дні 100 + роп (для табелю/виплат)"""
-        return sorted(self.days_100 + self.days_rop)
+        return self._dates("days_100_combined", self.mask_100 | self.mask_rop)
+
+    def count(self, category: str) -> int:
+        """Кількість днів категорії (без побудови списку дат)"""
+        return bin(self.category_mask(category)).count("1")
+
+    def first_day(self, category: str) -> Optional[datetime]:
+        """Перший день категорії або None"""
+        mask = self.category_mask(category)
+        if not mask:
+            return None
+        return datetime(self.year, self.month, (mask & -mask).bit_length())
+
+    def last_day(self, category: str) -> Optional[datetime]:
+        """Останній день категорії або None"""
+        mask = self.category_mask(category)
+        if not mask:
+            return None
+        return datetime(self.year, self.month, mask.bit_length())
 
     def generate_br_numbers(self):
-        """Генерує номери БР для всіх днів"""
-        self.br_numbers_100 = [get_br_number(date) for date in self.days_100_combined]
-        self.br_numbers_30 = [get_br_number(date) for date in self.days_30]
-    
+        """Скидає кеш номерів БР (вони генеруються ліниво при зверненні)"""
+        self._derived.pop("br_100", None)
+        self._derived.pop("br_30", None)
+
+    @property
+    def br_numbers_100(self) -> List[str]:
+        """Номери БР для днів 100 (включаючи роп)"""
+        numbers = self._derived.get("br_100")
+        if numbers is None:
+            numbers = [get_br_number(date) for date in self.days_100_combined]
+            self._derived["br_100"] = numbers
+        return numbers
+
+    @property
+    def br_numbers_30(self) -> List[str]:
+        """Номери БР для днів 30"""
+        numbers = self._derived.get("br_30")
+        if numbers is None:
+            numbers = [get_br_number(date) for date in self.days_30]
+            self._derived["br_30"] = numbers
+        return numbers
+
     def get_br_list_100(self) -> str:
         """Повертає відформатований список БР для днів 100"""
         return format_br_list(self.br_numbers_100)
@@ -54,24 +191,46 @@ class SoldierData:
     
     def has_no_payment_note(self) -> bool:
         """Перевіряє чи є примітка про невиплату"""
-        return "не виплачувати" in self.note.lower() if self.note else False
+        return self.no_payment
     
     def __repr__(self):
-        return f"SoldierData({self.pib}, 100:{len(self.days_100)}, 30:{len(self.days_30)}, 0:{len(self.days_0)})"
+        return (f"SoldierData({self.pib}, 100:{bin(self.mask_100).count('1')}, "
+                f"30:{self.count('30')}, 0:{self.count('0')})")
 
 class TabelReader:
     """Клас для читання даних з табелю"""
     
-    def __init__(self, excel_file: str):
+    def __init__(self, excel_file: str, streaming: bool = False):
+        """
+        Args:
+            excel_file: Шлях до табелю
+            streaming: Потоковий режим — без повного розбору табеля: якщо кеш
+                неактуальний, читається лише потрібний аркуш (легкий читач xlsx)
+        """
         self.excel_file = excel_file
-        self.wb = None
+        self.streaming = streaming
+        self.tabel: Optional[TabelData] = None
+        self.sheetnames: List[str] = []
         self.soldiers: List[SoldierData] = []
     
     def load_workbook(self):
-        """Завантажує Excel файл"""
-        self.wb = openpyxl.load_workbook(self.excel_file, data_only=True)
+        """
+        Завантажує розібраний табель з найшвидшого джерела (див. tabel_source);
+        xlsx розбирається лише якщо файл змінився.
+        """
+        source = get_tabel_source(self.excel_file)
+        if self.streaming:
+            self.tabel = source.peek()
+            if self.tabel:
+                self.sheetnames = list(self.tabel.sheetnames)
+            else:
+                with XlsxReader(get_snapshot(self.excel_file).open()) as reader:
+                    self.sheetnames = list(reader.sheetnames)
+        else:
+            self.tabel = source.load()
+            self.sheetnames = list(self.tabel.sheetnames)
         print(f"Завантажено файл: {self.excel_file}")
-        print(f"Листи: {self.wb.sheetnames}")
+        print(f"Листи: {self.sheetnames}")
     
     def read_month_data(self, month_sheet: str) -> List[SoldierData]:
         """
@@ -83,74 +242,63 @@ class TabelReader:
         Returns:
             List[SoldierData]: Список даних про бійців
         """
-        if not self.wb:
+        soldiers = list(self.iter_month_data(month_sheet))
+        print(f"Прочитано {len(soldiers)} бійців з листа {month_sheet}")
+        return soldiers
+
+    def iter_month_data(self, month_sheet: str) -> Iterator[SoldierData]:
+        """
+        Ліниво генерує SoldierData з листа місяця.
+        Якщо кеш табеля актуальний — з матриці, інакше — потоково з одного аркуша.
+        """
+        if not self.sheetnames:
             self.load_workbook()
-        
-        if month_sheet not in self.wb.sheetnames:
+
+        if month_sheet not in self.sheetnames:
             raise ValueError(f"Лист '{month_sheet}' не знайдено")
-        
-        ws = self.wb[month_sheet]
-        soldiers = []
-        
-        # Знаходимо рядок з заголовками (шукаємо "ПІБ")
-        header_row = None
-        for row in range(1, 20):
-            if ws.cell(row, 6).value and "ПІБ" in str(ws.cell(row, 6).value):
-                header_row = row
-                break
-        
-        if not header_row:
-            raise ValueError("Не знайдено рядок з заголовками")
-        
-        print(f"Заголовки знайдено в рядку {header_row}")
 
+        if self.tabel and month_sheet in self.tabel.matrices:
+            matrix = self.tabel.get_matrix(month_sheet)
+            print(f"Заголовки знайдено в рядку {matrix.header_row}")
+            masks = zip(*(matrix.day_masks(code).tolist() for code in _MASK_CODES))
+            for i, day_masks in enumerate(masks):
+                yield self._make_soldier(
+                    int(matrix.rows[i]), matrix.pibs[i], matrix.ranks[i], matrix.positions[i],
+                    matrix.notes[i], day_masks, matrix.year, matrix.month
+                )
+            return
+
+        yield from self._stream_sheet(month_sheet)
+
+    def _stream_sheet(self, month_sheet: str) -> Iterator[SoldierData]:
+        """Потоково читає один аркуш (лише sheetN.xml потрібного місяця)"""
         # Визначаємо рік та місяць з назви листа
         year = self._extract_year_from_sheet_name(month_sheet)
         month = self._extract_month_from_sheet_name(month_sheet)
-        
-        # Читаємо дані бійців
-        for row in range(header_row + 1, ws.max_row + 1):
-            pib = ws.cell(row, 6).value  # Стовпець F
-            if not pib or not str(pib).strip():
-                continue
-            
-            rank = ws.cell(row, 5).value or ""  # Стовпець E
-            position = ws.cell(row, 4).value or ""  # Стовпець D
-            note = ws.cell(row, 38).value or ""  # Стовпець AL
-            
-            soldier = SoldierData(row, str(pib), str(rank), str(position))
-            soldier.note = str(note)
-            
-            # Читаємо позначки за дні
-            days_in_month = self._get_days_in_month(year, month)
-            for day in range(1, days_in_month + 1):
-                col = 6 + day  # Стовпець G = 7, тому 6 + day
-                cell_value = ws.cell(row, col).value
-                
-                if cell_value:
-                    mark = str(cell_value).strip()
-                    # openpyxl може повертати float (100.0 замість 100)
-                    try:
-                        num_val = float(mark)
-                        if num_val == int(num_val):
-                            mark = str(int(num_val))
-                    except (ValueError, TypeError):
-                        pass
-                    mark = mark.lower()
-                    # Нормалізуємо: "100" і "30" зберігаємо як є, "роп" окремо
-                    if mark in ["100", "30", "0", "н-п", "н/п", "роп"]:
-                        try:
-                            date = datetime(year, month, day)
-                            soldier.add_day(date, mark)
-                        except ValueError:
-                            print(f"Помилка дати для рядка {row}, день {day}")
-            
-            soldier.generate_br_numbers()
-            soldiers.append(soldier)
-        
-        print(f"Прочитано {len(soldiers)} бійців з листа {month_sheet}")
-        return soldiers
-    
+        days_in_month = self._get_days_in_month(year, month)
+
+        with XlsxReader(get_snapshot(self.excel_file).open()) as reader:
+            rows = reader.iter_rows(month_sheet, max_col=COL_NOTE)
+            header_row, records = split_sheet_rows(rows)
+            print(f"Заголовки знайдено в рядку {header_row}")
+
+            for row_number, pib, rank, position, note, codes in records:
+                day_masks = [0] * len(_MASK_CODES)
+                for day_idx, code in enumerate(codes[:days_in_month]):
+                    slot = _MASK_SLOT_INDEX.get(code)
+                    if slot is not None:
+                        day_masks[slot] |= 1 << day_idx
+                yield self._make_soldier(row_number, pib, rank, position, note,
+                                         day_masks, year, month)
+
+    def _make_soldier(self, row_number: int, pib: str, rank: str, position: str, note: str,
+                      day_masks: Sequence[int], year: int, month: int) -> SoldierData:
+        """Створює SoldierData з масок днів (порядок — як у _MASK_CODES)"""
+        soldier = SoldierData(row_number, pib, rank, position, year, month)
+        soldier.note = note
+        soldier.set_masks(*day_masks)
+        return soldier
+
     def _extract_month_from_sheet_name(self, sheet_name: str) -> int:
         """Витягує номер місяця з назви листа"""
         parsed = parse_month_sheet_name(sheet_name)
@@ -194,14 +342,8 @@ class TabelReader:
         result = []
         
         for soldier in soldiers:
-            if category == "100" and soldier.days_100_combined:
-                if include_no_payment or not soldier.has_no_payment_note():
-                    result.append(soldier)
-            elif category == "30" and soldier.days_30:
-                if include_no_payment or not soldier.has_no_payment_note():
-                    result.append(soldier)
-            elif category == "0" and soldier.days_0:
-                if include_no_payment or not soldier.has_no_payment_note():
+            if category in _CATEGORY_SLOTS and soldier.category_mask(category):
+                if include_no_payment or not soldier.no_payment:
                     result.append(soldier)
         
         return result
@@ -161,12 +161,8 @@ class ExcelReportGenerator:
     
     def _get_days_count_for_category(self, soldier: SoldierData, category: str) -> int:
         """Повертає кількість днів для категорії"""
-        if category == "100":
-            return len(soldier.days_100_combined)
-        elif category == "30":
-            return len(soldier.days_30)
-        elif category == "0":
-            return len(soldier.days_0)
+        if category in ("100", "30", "0"):
+            return soldier.count(category)
         return 0
     
     def _get_amount_for_category(self, category: str) -> str:
@@ -3,18 +3,47 @@
 """
 import os
 import sys
+from contextlib import nullcontext
 from datetime import datetime
+from typing import List, Optional
 from month_utils import get_available_months
-from excel_processor import TabelReader
+from excel_processor import TabelReader, SoldierData
 from word_generator import WordReportGenerator
 from excel_reports import ExcelReportGenerator
+from parallel_utils import get_worker_count, parallel_map
+from shared_tabel import SharedTabel, attached_batch
+from tabel_cache import load_tabel
+
+# Рапорти "всі типи": (генератор, категорія, включати "не виплачувати", назва файлу)
+ALL_REPORTS = [
+    ("excel", "100", False, "ДГВ_100к_{month}.xlsx"),
+    ("excel", "30", False, "ДГВ_30к_{month}.xlsx"),
+    ("word", "100", True, "Підтвердження_100к_{month}.docx"),
+    ("word", "30", True, "Підтвердження_30к_{month}.docx"),
+    ("excel", "0", False, "ДГВ_0к_{month}.xlsx"),
+]
+
+
+def _render_report_job(task: tuple) -> str:
+    """Створює один рапорт з ALL_REPORTS (виконується і в дочірньому процесі)"""
+    descriptor, excel_file, month, kind, category, include_no_payment, filename, month_display = task
+    with attached_batch(descriptor) if descriptor is not None else nullcontext():
+        reader = TabelReader(excel_file)
+        soldiers = reader.get_soldiers_by_category(reader.read_month_data(month), category,
+                                                   include_no_payment=include_no_payment)
+    if kind == "excel":
+        ExcelReportGenerator().create_dgv_report(soldiers, month_display, category, filename)
+    else:
+        WordReportGenerator().create_confirmation_report(soldiers, month_display, category, filename)
+    return filename
+
 
 class ReportGenerator:
     """Альварес-AI для генерації всіх типів рапортів"""
     
     def __init__(self, excel_file: str = "Табель_Багатомісячний.xlsx"):
         self.excel_file = excel_file
-        self.reader = TabelReader(excel_file)
+        self.reader = TabelReader(excel_file, streaming=True)
         self.word_generator = WordReportGenerator()
         self.excel_generator = ExcelReportGenerator()
         
@@ -114,14 +143,20 @@ class ReportGenerator:
             except ValueError:
                 print("Введіть число.")
     
-    def _generate_report(self, month: str, report_type: str):
-        """Генерує обраний рапорт"""
+    def _generate_report(self, month: str, report_type: str, soldiers: Optional[List[SoldierData]] = None):
+        """
+        Генерує обраний рапорт
+
+        Args:
+            soldiers: Вже прочитані дані місяця (щоб не читати аркуш повторно)
+        """
         print(f"\nВитя Альварес розпочав генерацію даних за {month}...")
         
         try:
             # Завантажуємо дані
-            self.reader.load_workbook()
-            soldiers = self.reader.read_month_data(month)
+            if soldiers is None:
+                self.reader.load_workbook()
+                soldiers = self.reader.read_month_data(month)
             
             if not soldiers:
                 print("Не знайдено даних для цього місяця, походу всі були вихідні")
@@ -179,7 +214,7 @@ class ReportGenerator:
             
             elif report_type == "6":
                 # Всі рапорти
-                self._generate_all_reports(soldiers, month_display)
+                self._generate_all_reports(month, soldiers)
             
             print("Вітя Альварес роботу завершив — необхідні дані успішно створено!")
             
@@ -187,41 +222,46 @@ class ReportGenerator:
             print(f"Бляяяя, Вітя рубає окуня — помилка при генерації необхідних даних: {e}")
             raise
     
-    def _generate_all_reports(self, soldiers, month_display: str):
+    def _generate_all_reports(self, month: str, soldiers: List[SoldierData]):
         """Вітя Альварес генерує всі типи рапортів за місяць"""
         print('"Працюю, як завжди швидко" © Вітя Альварес')
-        
-        # ДГВ 100к
-        soldiers_100 = self.reader.get_soldiers_by_category(soldiers, "100", include_no_payment=False)
-        if soldiers_100:
-            filename = f"ДГВ_100к_{month_display}.xlsx"
-            self.excel_generator.create_dgv_report(soldiers_100, month_display, "100", filename)
-        
-        # ДГВ 30к
-        soldiers_30 = self.reader.get_soldiers_by_category(soldiers, "30", include_no_payment=False)
-        if soldiers_30:
-            filename = f"ДГВ_30к_{month_display}.xlsx"
-            self.excel_generator.create_dgv_report(soldiers_30, month_display, "30", filename)
-        
-        # Підтвердження 100к
-        soldiers_100_all = self.reader.get_soldiers_by_category(soldiers, "100", include_no_payment=True)
-        if soldiers_100_all:
-            filename = f"Підтвердження_100к_{month_display}.docx"
-            self.word_generator.create_confirmation_report(soldiers_100_all, month_display, "100", filename)
-        
-        # Підтвердження 30к
-        soldiers_30_all = self.reader.get_soldiers_by_category(soldiers, "30", include_no_payment=True)
-        if soldiers_30_all:
-            filename = f"Підтвердження_30к_{month_display}.docx"
-            self.word_generator.create_confirmation_report(soldiers_30_all, month_display, "30", filename)
-        
-        # ДГВ 0к
-        soldiers_0 = self.reader.get_soldiers_by_category(soldiers, "0", include_no_payment=False)
-        if soldiers_0:
-            filename = f"ДГВ_0к_{month_display}.xlsx"
-            self.excel_generator.create_dgv_report(soldiers_0, month_display, "0", filename)
-        
+        self.generate_all_reports(month, soldiers)
         print("Вітя Альварес роботу завершив — всі дані створено!")
+
+    def generate_all_reports(self, month: str, soldiers: List[SoldierData]) -> List[str]:
+        """
+        Створює всі типи рапортів за місяць паралельно в пулі процесів.
+        Аркуш місяця передається процесам через спільну пам'ять (див. shared_tabel);
+        якщо рапорти створюються послідовно, табель не публікується.
+
+        Returns:
+            Назви створених файлів (у порядку ALL_REPORTS)
+        """
+        month_display = month.replace("_", " ").lower()
+        jobs = [
+            (kind, category, include_no_payment, filename.format(month=month_display))
+            for kind, category, include_no_payment, filename in ALL_REPORTS
+            if self.reader.get_soldiers_by_category(soldiers, category, include_no_payment)
+        ]
+        if not jobs:
+            return []
+
+        shared = None
+        if min(get_worker_count(), len(jobs)) > 1:
+            try:
+                shared = SharedTabel(load_tabel(self.excel_file), sheets=[month])
+            except OSError as e:
+                print(f"Попередження: спільна пам'ять недоступна, процеси читатимуть табель самі: {e}")
+        try:
+            descriptor = shared.descriptor if shared else None
+            return parallel_map(_render_report_job, [
+                (descriptor, self.excel_file, month, kind, category, include_no_payment,
+                 filename, month_display)
+                for kind, category, include_no_payment, filename in jobs
+            ])
+        finally:
+            if shared:
+                shared.close()
     
     def _ask_continue(self) -> bool:
         """Питає чи продовжити роботу"""
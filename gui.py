@@ -5,6 +5,8 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
+import multiprocessing
+import calendar
 import os
 import openpyxl
 from datetime import datetime
@@ -22,10 +24,17 @@ from br_calculator import get_br_number
 from month_utils import (get_available_months, parse_month_sheet_name, get_source_filename,
                          build_month_sheet_name, MONTH_NAMES_UK_REVERSE)
 from tabel_filler import fill_single_month, fill_tabel_months
+from tabel_cache import invalidate as invalidate_tabel
+from tabel_source import get_tabel_source, sync_mark_store_in_background
+from tabel_compactor import compact_workbook
+from tabel_changes import BR_BATCH_CHECKPOINT, changes_since, save_checkpoint
+from tabel_integrity import scan_tabel
+from strength_series import get_strength_series, br_date_series
+from yearly_summary import export_yearly_summary
 from data.database import (init_db, get_all_personnel, get_all_roles,
                            set_personnel_role)
 from core.br_roles import (auto_assign_all_roles, import_personnel_from_tabel,
-                           build_composition_for_date, generate_br_word,
+                           build_composition_for_date, render_br_job,
                            get_active_personnel_for_month)
 from path_utils import get_base_path, get_app_dir
 from version import APP_VERSION
@@ -53,6 +62,22 @@ _CLR_GRAY_HOVER = "#7f8c8d"
 _CLR_YELLOW = "#f1c40f"
 _CLR_DIM = "#7f849c"
 
+# Інтервал перевірки змін табеля/BR_4ShB/Dodatky для фонової перевірки цілісності (мс)
+INTEGRITY_POLL_MS = 3000
+
+# Теплова карта чисельності на екрані БР
+_HEATMAP_CELL_W = 44
+_HEATMAP_CELL_H = 20
+_HEATMAP_EMPTY = "#313244"   # немає аркуша табеля на дату
+_HEATMAP_LOW = (0x24, 0x34, 0x47)
+_HEATMAP_HIGH = (0x2e, 0xcc, 0x71)
+_HEATMAP_CATEGORIES = {
+    "Категорія 100 (з роп)": "100",
+    "Категорія роп": "роп",
+    "Категорія 30": "30",
+    "Категорія н-п": "0",
+}
+
 # Стилі для Treeview (залишаємо ttk)
 _TREE_BG = "#2b2b2b"
 _TREE_FG = "#dce4ee"
@@ -123,8 +148,20 @@ class ReportGUI:
         self.br_4shb_file = os.path.join(app_dir, "BR_4ShB.xlsx")
         self.output_dir = os.path.join(app_dir, "output")
 
+        # Фонова перевірка цілісності табеля
+        self._integrity_report = None
+        self._integrity_error = None
+        self._integrity_signature = None
+        self._integrity_running = False
+
+        # Ряди чисельності для теплової карти (екран БР)
+        self._strength_series = None
+        self._strength_running = False
+        self._heatmap_month = None
+
         self._create_main_menu()
         self._check_files()
+        self._poll_integrity()
 
         # Перевірка оновлень
         threading.Thread(target=self._background_update_check, daemon=True).start()
@@ -338,6 +375,14 @@ class ReportGUI:
         # Статус-бар
         self._make_status_bar(content, "Готово до роботи")
 
+        # Результат перевірки цілісності табеля — клікабельний
+        self._integrity_label = ctk.CTkLabel(
+            content, text="", font=ctk.CTkFont(size=11), text_color=_CLR_DIM, cursor="hand2"
+        )
+        self._integrity_label.pack(side="bottom", pady=(0, 2))
+        self._integrity_label.bind("<Button-1>", lambda e: self._show_integrity_report())
+        self._update_integrity_label()
+
     # ==================== ЕКРАН ДОКУМЕНТІВ ====================
 
     def _show_reports_screen(self):
@@ -392,6 +437,13 @@ class ReportGUI:
         )
         self.generate_btn.pack(side="left", padx=(0, 10))
 
+        self.summary_btn = ctk.CTkButton(
+            btn_frame, text="📈 Річне зведення", command=self._export_yearly_summary,
+            font=ctk.CTkFont(size=13, weight="bold"),
+            fg_color=_CLR_BLUE, hover_color=_CLR_BLUE_HOVER, height=42
+        )
+        self.summary_btn.pack(side="left", padx=(0, 10))
+
         ctk.CTkButton(
             btn_frame, text="← Назад", command=self._create_main_menu,
             font=ctk.CTkFont(size=12),
@@ -464,6 +516,9 @@ class ReportGUI:
         ctk.CTkLabel(main, text="(Номер розраховується автоматично)",
                       font=ctk.CTkFont(size=10), text_color=_CLR_DIM).pack(anchor="w", pady=(0, 10))
 
+        # Теплова карта чисельності по датах БР
+        self._make_heatmap(main)
+
         # Кнопки
         btn_frame = ctk.CTkFrame(main, fg_color="transparent")
         btn_frame.pack(fill="x", pady=(0, 10))
@@ -488,7 +543,7 @@ class ReportGUI:
 
         # Лог
         ctk.CTkLabel(main, text="Статус виконання", font=ctk.CTkFont(size=13, weight="bold")).pack(anchor="w", pady=(0, 5))
-        self.log_text = ctk.CTkTextbox(main, font=ctk.CTkFont(family="Consolas", size=10), height=150)
+        self.log_text = ctk.CTkTextbox(main, font=ctk.CTkFont(family="Consolas", size=10), height=100)
         self.log_text.pack(fill="both", expand=True)
 
         self._make_status_bar(content, "Введіть дати для автоматичного розрахунку номера наказу")
@@ -499,6 +554,160 @@ class ReportGUI:
         self.end_date_var.set(today.strftime("%d.%m.%Y"))
         self._update_order_number()
 
+        if self._heatmap_month is None:
+            self._heatmap_month = (today.year, today.month)
+        self._draw_heatmap()
+        self._refresh_strength_series()
+
+    # ---------- Теплова карта чисельності ----------
+
+    def _make_heatmap(self, parent):
+        ctk.CTkLabel(parent, text="Чисельність по датах БР",
+                      font=ctk.CTkFont(size=13, weight="bold")).pack(anchor="w", pady=(0, 5))
+
+        frame = ctk.CTkFrame(parent, fg_color="transparent")
+        frame.pack(fill="x", pady=(0, 10))
+
+        self._heatmap_canvas = tk.Canvas(
+            frame, width=7 * _HEATMAP_CELL_W, height=7 * _HEATMAP_CELL_H,
+            bg=_TREE_BG, highlightthickness=0
+        )
+        self._heatmap_canvas.pack(side="left")
+
+        controls = ctk.CTkFrame(frame, fg_color="transparent")
+        controls.pack(side="left", fill="both", expand=True, padx=(15, 0))
+
+        nav = ctk.CTkFrame(controls, fg_color="transparent")
+        nav.pack(anchor="w")
+        ctk.CTkButton(nav, text="◀", width=30, height=26, command=lambda: self._shift_heatmap_month(-1),
+                      fg_color=_CLR_GRAY, hover_color=_CLR_GRAY_HOVER).pack(side="left")
+        self._heatmap_title = ctk.CTkLabel(nav, text="", width=130, font=ctk.CTkFont(size=12, weight="bold"))
+        self._heatmap_title.pack(side="left", padx=5)
+        ctk.CTkButton(nav, text="▶", width=30, height=26, command=lambda: self._shift_heatmap_month(1),
+                      fg_color=_CLR_GRAY, hover_color=_CLR_GRAY_HOVER).pack(side="left")
+
+        self._heatmap_series_var = tk.StringVar(value=next(iter(_HEATMAP_CATEGORIES)))
+        self._heatmap_combo = ctk.CTkComboBox(
+            controls, variable=self._heatmap_series_var, values=list(_HEATMAP_CATEGORIES),
+            width=260, state="readonly", command=lambda _: self._draw_heatmap()
+        )
+        self._heatmap_combo.pack(anchor="w", pady=(8, 4))
+
+        self._heatmap_info = ctk.CTkLabel(
+            controls, text="", font=ctk.CTkFont(size=10), text_color=_CLR_DIM,
+            justify="left", anchor="w"
+        )
+        self._heatmap_info.pack(anchor="w")
+
+    def _refresh_strength_series(self):
+        """Перераховує ряди чисельності у фоні та перемальовує карту"""
+        if self._strength_running:
+            return
+        self._strength_running = True
+
+        def work():
+            series, error = None, None
+            try:
+                series = get_strength_series(self.excel_file)
+            except Exception as e:
+                error = str(e)
+
+            def done():
+                self._strength_running = False
+                self._strength_series = series
+                self._draw_heatmap()
+                if error:
+                    self._log(f"Карта чисельності: помилка: {error}")
+            self.root.after(0, done)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def _shift_heatmap_month(self, delta: int):
+        year, month = self._heatmap_month
+        month += delta
+        if month < 1:
+            year, month = year - 1, 12
+        elif month > 12:
+            year, month = year + 1, 1
+        self._heatmap_month = (year, month)
+        self._draw_heatmap()
+
+    def _heatmap_series_name(self) -> str:
+        label = self._heatmap_series_var.get()
+        return _HEATMAP_CATEGORIES.get(label, label)
+
+    def _draw_heatmap(self):
+        canvas = getattr(self, "_heatmap_canvas", None)
+        if canvas is None or not canvas.winfo_exists() or self._heatmap_month is None:
+            return
+        series = self._strength_series
+        if series is not None:
+            options = list(_HEATMAP_CATEGORIES) + list(series.roles)
+            self._heatmap_combo.configure(values=options)
+            if self._heatmap_series_var.get() not in options:
+                self._heatmap_series_var.set(options[0])
+
+        year, month = self._heatmap_month
+        self._heatmap_title.configure(text=f"{MONTH_NAMES_UK_REVERSE[month]} {year}")
+        first_weekday, days = calendar.monthrange(year, month)
+        values = []
+        if series is not None:
+            values = br_date_series(series, self._heatmap_series_name(),
+                                    datetime(year, month, 1), datetime(year, month, days))
+        peak = max((v for _, v in values if v is not None), default=0)
+
+        canvas.delete("all")
+        for col, name in enumerate(("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Нд")):
+            canvas.create_text((col + 0.5) * _HEATMAP_CELL_W, _HEATMAP_CELL_H / 2,
+                               text=name, fill=_CLR_DIM, font=("Arial", 8))
+        for day in range(1, days + 1):
+            value = values[day - 1][1] if values else None
+            pos = first_weekday + day - 1
+            x0 = (pos % 7) * _HEATMAP_CELL_W
+            y0 = (pos // 7 + 1) * _HEATMAP_CELL_H
+            if value is None:
+                color = _HEATMAP_EMPTY
+            else:
+                share = value / peak if peak else 0
+                color = "#%02x%02x%02x" % tuple(
+                    int(lo + (hi - lo) * share) for lo, hi in zip(_HEATMAP_LOW, _HEATMAP_HIGH)
+                )
+            tag = f"day{day}"
+            canvas.create_rectangle(x0 + 1, y0 + 1, x0 + _HEATMAP_CELL_W - 1, y0 + _HEATMAP_CELL_H - 1,
+                                    fill=color, outline="", tags=tag)
+            canvas.create_text(x0 + _HEATMAP_CELL_W / 2, y0 + _HEATMAP_CELL_H / 2,
+                               text=str(day) if value is None else f"{day}·{value}",
+                               fill=_TREE_FG, font=("Arial", 8), tags=tag)
+            canvas.tag_bind(tag, "<Button-1>", lambda e, d=day: self._on_heatmap_click(year, month, d))
+
+        if series is None:
+            info = "Розрахунок..." if self._strength_running else "Немає даних табеля"
+        else:
+            info = f"Максимум за місяць: {peak}\nКлік по дню — обрати дату БР"
+        self._heatmap_info.configure(text=info)
+
+    def _on_heatmap_click(self, year: int, month: int, day: int):
+        br_date = datetime(year, month, day)
+        date_str = br_date.strftime("%d.%m.%Y")
+        self.start_date_var.set(date_str)
+        try:
+            end_date = datetime.strptime(self.end_date_var.get().strip(), "%d.%m.%Y")
+        except ValueError:
+            end_date = None
+        if end_date is None or end_date < br_date:
+            self.end_date_var.set(date_str)
+        self._update_order_number()
+
+        if self._strength_series is not None:
+            from br_updater import get_tabel_date
+            values = self._strength_series.on(get_tabel_date(br_date))
+            if values:
+                parts = [f"{label.replace('Категорія ', '')}: {values[key]}"
+                         for label, key in _HEATMAP_CATEGORIES.items()]
+                self._update_status(f"БР {date_str} — " + ", ".join(parts))
+            else:
+                self._update_status(f"БР {date_str} — немає аркуша табеля")
+
     def _update_order_number(self):
         date_str = self.start_date_var.get().strip()
         if not date_str:
@@ -556,6 +765,13 @@ class ReportGUI:
         )
         self.fill_tabel_btn.pack(side="left", padx=(0, 10))
 
+        self.compact_tabel_btn = ctk.CTkButton(
+            btn_frame, text="🗜 Стиснути табель", command=self._compact_tabel,
+            font=ctk.CTkFont(size=12),
+            fg_color=_CLR_GRAY, hover_color=_CLR_GRAY_HOVER, height=42
+        )
+        self.compact_tabel_btn.pack(side="left", padx=(0, 10))
+
         ctk.CTkButton(
             btn_frame, text="← Назад", command=self._create_main_menu,
             font=ctk.CTkFont(size=12),
@@ -652,7 +868,12 @@ class ReportGUI:
                     template_sheet = wb[available[-1]]
                     new_sheet = wb.copy_worksheet(template_sheet)
                     new_sheet.title = sheet_name
-                    for row in range(9, new_sheet.max_row + 1):
+                    # Лише до останнього рядка з ПІБ, а не до max_row з форматуванням
+                    try:
+                        last_row = get_tabel_source(self.excel_file).data_extent(template_sheet.title)
+                    except ValueError:
+                        last_row = new_sheet.max_row
+                    for row in range(9, last_row + 1):
                         for col in range(1, new_sheet.max_column + 1):
                             new_sheet.cell(row, col).value = None
                 else:
@@ -660,6 +881,8 @@ class ReportGUI:
 
                 wb.save(self.excel_file)
                 wb.close()
+                invalidate_tabel(self.excel_file)
+                sync_mark_store_in_background(self.excel_file)
 
                 messagebox.showinfo("Успіх", f"Аркуш '{sheet_name}' створено!", parent=dialog)
 
@@ -708,7 +931,7 @@ class ReportGUI:
 
         self.roles_month_var = tk.StringVar()
         try:
-            months = get_available_months(self.excel_file)
+            months = self.generator.available_months if self.generator else get_available_months(self.excel_file)
         except Exception:
             months = []
         months_combo = ctk.CTkComboBox(actions, variable=self.roles_month_var, values=months,
@@ -949,6 +1172,88 @@ class ReportGUI:
             except Exception as e:
                 messagebox.showerror("Помилка", f"Не вдалося завантажити файл:\n{str(e)}")
 
+    # ==================== ПЕРЕВІРКА ЦІЛІСНОСТІ ====================
+
+    def _integrity_files_signature(self):
+        """(mtime, розмір) табеля, BR_4ShB.xlsx та Dodatky.md (None — файлу немає)"""
+        signature = []
+        for path in (self.excel_file, self.br_4shb_file, self.dodatky_path):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _poll_integrity(self):
+        """Запускає перевірку у фоні, якщо якийсь із файлів змінився"""
+        signature = self._integrity_files_signature()
+        if signature[0] is not None and signature != self._integrity_signature \
+                and not self._integrity_running:
+            self._integrity_signature = signature
+            self._integrity_running = True
+            self._update_integrity_label()
+            threading.Thread(target=self._run_integrity_scan, daemon=True).start()
+            if self.current_screen == "br_create":
+                self._refresh_strength_series()
+        self.root.after(INTEGRITY_POLL_MS, self._poll_integrity)
+
+    def _run_integrity_scan(self):
+        report, error = None, None
+        try:
+            report = scan_tabel(self.excel_file, self.br_4shb_file, self.dodatky_path)
+        except Exception as e:
+            error = str(e)
+
+        def done():
+            self._integrity_running = False
+            self._integrity_report, self._integrity_error = report, error
+            self._update_integrity_label()
+        self.root.after(0, done)
+
+    def _update_integrity_label(self):
+        label = getattr(self, "_integrity_label", None)
+        if label is None or not label.winfo_exists():
+            return
+        report = self._integrity_report
+        if self._integrity_running and report is None:
+            text, color = "Перевірка табеля...", _CLR_DIM
+        elif self._integrity_error:
+            text, color = "⚠ Перевірка табеля не вдалась — натисніть для деталей", _CLR_YELLOW
+        elif report is None:
+            text, color = "", _CLR_DIM
+        elif report.ok:
+            text, color = "✓ Табель без помилок", "#2ecc71"
+        else:
+            text, color = f"⚠ Проблем у табелі: {report.total} — натисніть для звіту", _CLR_YELLOW
+        label.configure(text=text, text_color=color)
+
+    def _show_integrity_report(self):
+        if self._integrity_error:
+            text = f"Помилка перевірки:\n{self._integrity_error}"
+        elif self._integrity_report is not None:
+            text = self._integrity_report.summary(limit=200)
+        else:
+            return
+
+        win = ctk.CTkToplevel(self.root)
+        win.title("Перевірка табеля")
+        win.geometry("620x480")
+        win.transient(self.root)
+
+        textbox = ctk.CTkTextbox(win, font=ctk.CTkFont(family="Consolas", size=11), wrap="none")
+        textbox.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+        textbox.insert("0.0", text)
+        textbox.configure(state="disabled")
+
+        def rescan():
+            # Скидаємо підпис — наступне опитування запустить перевірку
+            self._integrity_signature = None
+            win.destroy()
+
+        ctk.CTkButton(win, text="Перевірити ще раз", command=rescan,
+                      fg_color=_CLR_GRAY, hover_color=_CLR_GRAY_HOVER).pack(pady=(0, 10))
+
     def _log(self, message):
         if hasattr(self, 'log_text'):
             self.log_text.configure(state="normal")
@@ -960,7 +1265,8 @@ class ReportGUI:
     def _update_status(self, message):
         if hasattr(self, 'status_label'):
             self.status_label.configure(text=message)
-            busy_keywords = ("Імпорт", "Автопризначен", "Генерація", "Заповнення", "Склад", "Створ")
+            busy_keywords = ("Імпорт", "Автопризначен", "Генерація", "Заповнення", "Склад", "Створ",
+                             "Стиснення")
             is_busy = any(message.startswith(kw) for kw in busy_keywords)
             if hasattr(self, '_busy_icon_label'):
                 if is_busy:
@@ -1016,12 +1322,10 @@ class ReportGUI:
 
             self._log(f"✓ Знайдено та оброблено {len(soldiers)} військовослужбовців")
 
-            month_display = month.replace("_", " ").lower()
-
             if report_type == "6":
-                self._generate_all_reports(soldiers, month_display)
+                self._generate_all_reports(month, soldiers)
             else:
-                self.generator._generate_report(month, report_type)
+                self.generator._generate_report(month, report_type, soldiers)
                 self._log("✓ Рапорт успішно створено!")
 
             self._log("=" * 60)
@@ -1043,44 +1347,48 @@ class ReportGUI:
                 state="normal", text="📄 Створити рапорти"
             ))
 
-    def _generate_all_reports(self, soldiers, month_display):
-        self._log('"Працюю, як завжди швидко" © Вітя Альварес\n')
+    def _export_yearly_summary(self):
+        parsed = parse_month_sheet_name(self.selected_month.get())
+        if not parsed:
+            messagebox.showwarning("Увага", "Оберіть місяць — зведення буде за його рік!")
+            return
+        year = parsed[0]
 
-        reports = []
+        if not messagebox.askyesno("Підтвердження", f"Створити зведення по бійцях за {year} рік?"):
+            return
 
-        soldiers_100 = self.generator.reader.get_soldiers_by_category(soldiers, "100", include_no_payment=False)
-        if soldiers_100:
-            filename = f"ДГВ_100к_{month_display}.xlsx"
-            self.generator.excel_generator.create_dgv_report(soldiers_100, month_display, "100", filename)
-            reports.append(filename)
-            self._log(f"✓ Створено: {filename}")
+        self.summary_btn.configure(state="disabled", text="⏳ Створення...")
+        self.log_text.configure(state="normal")
+        self.log_text.delete("0.0", "end")
 
-        soldiers_30 = self.generator.reader.get_soldiers_by_category(soldiers, "30", include_no_payment=False)
-        if soldiers_30:
-            filename = f"ДГВ_30к_{month_display}.xlsx"
-            self.generator.excel_generator.create_dgv_report(soldiers_30, month_display, "30", filename)
-            reports.append(filename)
-            self._log(f"✓ Створено: {filename}")
+        thread = threading.Thread(target=self._do_export_yearly_summary, args=(year,))
+        thread.daemon = True
+        thread.start()
 
-        soldiers_100_all = self.generator.reader.get_soldiers_by_category(soldiers, "100", include_no_payment=True)
-        if soldiers_100_all:
-            filename = f"Підтвердження_100к_{month_display}.docx"
-            self.generator.word_generator.create_confirmation_report(soldiers_100_all, month_display, "100", filename)
-            reports.append(filename)
+    def _do_export_yearly_summary(self, year):
+        try:
+            self._update_status(f"Створення зведення за {year} рік...")
+            filename = export_yearly_summary(self.excel_file, year)
             self._log(f"✓ Створено: {filename}")
+            self._update_status("Готово!")
+            self.root.after(0, lambda: messagebox.showinfo(
+                "Успіх", f"Зведення створено: {filename}\n\nПеревірте файл у поточній папці."
+            ))
+        except Exception as e:
+            error_msg = f"Помилка: {str(e)}"
+            self._log(f"❌ {error_msg}")
+            self._update_status("Помилка!")
+            self.root.after(0, lambda: messagebox.showerror("Помилка", error_msg))
+        finally:
+            self.root.after(0, lambda: self.summary_btn.configure(
+                state="normal", text="📈 Річне зведення"
+            ))
 
-        soldiers_30_all = self.generator.reader.get_soldiers_by_category(soldiers, "30", include_no_payment=True)
-        if soldiers_30_all:
-            filename = f"Підтвердження_30к_{month_display}.docx"
-            self.generator.word_generator.create_confirmation_report(soldiers_30_all, month_display, "30", filename)
-            reports.append(filename)
-            self._log(f"✓ Створено: {filename}")
+    def _generate_all_reports(self, month, soldiers):
+        self._log('"Працюю, як завжди швидко" © Вітя Альварес\n')
 
-        soldiers_0 = self.generator.reader.get_soldiers_by_category(soldiers, "0", include_no_payment=False)
-        if soldiers_0:
-            filename = f"ДГВ_0к_{month_display}.xlsx"
-            self.generator.excel_generator.create_dgv_report(soldiers_0, month_display, "0", filename)
-            reports.append(filename)
+        reports = self.generator.generate_all_reports(month, soldiers)
+        for filename in reports:
             self._log(f"✓ Створено: {filename}")
 
         self._log(f"\n✓ Всього створено файлів: {len(reports)}")
@@ -1151,6 +1459,39 @@ class ReportGUI:
                 state="normal", text="📊 Заповнити табель"
             ))
 
+    def _compact_tabel(self):
+        if not messagebox.askyesno(
+            "Підтвердження",
+            "Стиснути файл табеля?\n\nФайл буде переписано (резервна копія — поруч, *.bak).\n"
+            "Закрийте табель в Excel перед продовженням."
+        ):
+            return
+
+        self.compact_tabel_btn.configure(state="disabled", text="⏳ Стиснення...")
+        self.log_text.configure(state="normal")
+        self.log_text.delete("0.0", "end")
+
+        thread = threading.Thread(target=self._do_compact_tabel)
+        thread.daemon = True
+        thread.start()
+
+    def _do_compact_tabel(self):
+        try:
+            self._update_status("Стиснення табелю...")
+            result = compact_workbook(self.excel_file)
+            self._log(result.summary())
+            self._update_status("Готово!")
+            self.root.after(0, lambda: messagebox.showinfo("Успіх", result.summary()))
+        except Exception as e:
+            error_msg = f"Помилка: {str(e)}"
+            self._log(error_msg)
+            self._update_status("Помилка!")
+            self.root.after(0, lambda: messagebox.showerror("Помилка", error_msg))
+        finally:
+            self.root.after(0, lambda: self.compact_tabel_btn.configure(
+                state="normal", text="🗜 Стиснути табель"
+            ))
+
     # ==================== WORD БР ====================
 
     def _preview_composition(self):
@@ -1240,45 +1581,93 @@ class ReportGUI:
         def do_generate():
             import random
             from datetime import timedelta
-            from br_updater import clear_wb_cache
-            try:
-                created = 0
-                current = start_date
-                while current <= end_date:
-                    ds = current.strftime("%d.%m.%Y")
-                    self.root.after(0, lambda d=ds: self._log(f"\n--- БР на {d} ---"))
-                    composition = build_composition_for_date(self.excel_file, current)
-                    total = sum(len(m) for m in composition.values())
-                    self.root.after(0, lambda t=total: self._log(f"  Осіб з роллю: {t}"))
-
-                    if random_templates is not None:
-                        label, current_tpl = random.choice(random_templates)
-                        self.root.after(0, lambda lb=label: self._log(f"  Шаблон: Варіант {lb}"))
-                    else:
-                        current_tpl = tpl_path
-
-                    result_path = generate_br_word(
-                        current, composition, current_tpl, self.output_dir,
-                        br_4shb_file=self.br_4shb_file,
-                        tabel_file=self.excel_file,
-                        rop_txt_path=self.rop_txt_path,
-                        dodatky_path=self.dodatky_path
-                    )
-                    self.root.after(0, lambda p=result_path: self._log(f"  Створено: {p}"))
-                    created += 1
-
-                    current += timedelta(days=1)
-
-                self.root.after(0, lambda: self._log(f"\nВсього створено {created} файлів БР"))
-                self.root.after(0, lambda: self._update_status(f"Створено {created} БР"))
-                self.root.after(0, lambda: messagebox.showinfo(
-                    "Готово", f"Створено {created} файлів БР"
-                ))
-            except Exception as e:
-                self.root.after(0, lambda: self._log(f"ПОМИЛКА: {e}"))
-                self.root.after(0, lambda: self._update_status("Помилка генерації"))
-            finally:
-                clear_wb_cache()
+            from br_updater import clear_wb_cache, get_tabel_date
+            from parallel_utils import parallel_map
+            from shared_tabel import SharedTabel
+            from snapshot import pinned_batch
+            from tabel_cache import load_tabel
+            # Весь пакет читає одну версію табеля та BR_4ShB.xlsx (знімки в пам'яті)
+            with pinned_batch():
+                shared = None
+                try:
+                    # Дати табеля, з яких будуються БР пакета (дата БР + 1)
+                    tabel_start, tabel_end = get_tabel_date(start_date), get_tabel_date(end_date)
+                    changes = changes_since(self.excel_file, BR_BATCH_CHECKPOINT)
+                    if changes is not None:
+                        changed = [d.strftime("%d.%m.%Y")
+                                   for d in changes.dates_between(tabel_start, tabel_end)]
+                        self.root.after(0, lambda c=changes, d=changed: self._log(
+                            f"Зміни табеля з останнього пакету БР:\n{c.summary()}\n"
+                            f"У вибраному періоді змінено дат: {len(d)}"
+                            + (f" ({', '.join(d)})" if d else "")))
+
+                    # Склад і шаблон на кожен день — тут (ролі з app.db),
+                    # документи — паралельно в пулі процесів
+                    jobs = []
+                    current = start_date
+                    while current <= end_date:
+                        ds = current.strftime("%d.%m.%Y")
+                        self.root.after(0, lambda d=ds: self._log(f"\n--- БР на {d} ---"))
+                        composition = build_composition_for_date(self.excel_file, current)
+                        total = sum(len(m) for m in composition.values())
+                        self.root.after(0, lambda t=total: self._log(f"  Осіб з роллю: {t}"))
+
+                        if random_templates is not None:
+                            label, current_tpl = random.choice(random_templates)
+                            self.root.after(0, lambda lb=label: self._log(f"  Шаблон: Варіант {lb}"))
+                        else:
+                            current_tpl = tpl_path
+
+                        jobs.append((current, composition, current_tpl))
+                        current += timedelta(days=1)
+
+                    # Дочірні процеси беруть розібраний табель зі спільної пам'яті,
+                    # а BR_4ShB.xlsx, Dodatky.md і ROP.txt — закріплених версій пакета
+                    try:
+                        shared = SharedTabel(load_tabel(self.excel_file), files=(
+                            self.br_4shb_file, self.dodatky_path, self.rop_txt_path))
+                    except OSError as e:
+                        self.root.after(0, lambda err=e: self._log(
+                            f"Попередження: спільна пам'ять недоступна: {err}"))
+                    kwargs = {
+                        "output_dir": self.output_dir,
+                        "br_4shb_file": self.br_4shb_file,
+                        "tabel_file": self.excel_file,
+                        "rop_txt_path": self.rop_txt_path,
+                        "dodatky_path": self.dodatky_path,
+                    }
+                    descriptor = shared.descriptor if shared else None
+                    results = parallel_map(render_br_job, [
+                        (descriptor, br_date, composition, current_tpl, kwargs)
+                        for br_date, composition, current_tpl in jobs
+                    ], return_exceptions=True)
+
+                    created = 0
+                    for (br_date, _, _), result in zip(jobs, results):
+                        if isinstance(result, Exception):
+                            ds = br_date.strftime("%d.%m.%Y")
+                            self.root.after(0, lambda d=ds, e=result: self._log(f"ПОМИЛКА ({d}): {e}"))
+                        else:
+                            self.root.after(0, lambda p=result: self._log(f"  Створено: {p}"))
+                            created += 1
+                    # Контрольна точка — лише якщо створено всі БР, і лише за дати
+                    # пакета: зміни за інші дні лишаються в стрічці змін
+                    if jobs and created == len(jobs):
+                        save_checkpoint(self.excel_file, BR_BATCH_CHECKPOINT,
+                                        start=tabel_start, end=tabel_end)
+
+                    self.root.after(0, lambda: self._log(f"\nВсього створено {created} файлів БР"))
+                    self.root.after(0, lambda: self._update_status(f"Створено {created} БР"))
+                    self.root.after(0, lambda: messagebox.showinfo(
+                        "Готово", f"Створено {created} файлів БР"
+                    ))
+                except Exception as e:
+                    self.root.after(0, lambda: self._log(f"ПОМИЛКА: {e}"))
+                    self.root.after(0, lambda: self._update_status("Помилка генерації"))
+                finally:
+                    if shared:
+                        shared.close()
+                    clear_wb_cache()
 
         threading.Thread(target=do_generate, daemon=True).start()
 
@@ -1291,4 +1680,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Потрібно для пулу процесів у зібраному exe (PyInstaller, Windows)
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,123 @@
+"""
+Спільний кеш розібраних файлів у пам'яті з обмеженням розміру.
+
+GUI працює цілий день, тому розібрані табелі, індекс BR_4ShB.xlsx тощо
+не можуть накопичуватись без меж. Кожен запис має оцінку розміру в байтах;
+коли сума перевищує бюджет (налаштування "cache_budget_mb" в app.db),
+витісняються найдавніше використані записи. Лічильники влучань, промахів
+і витіснень пишуться в лог.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+BUDGET_SETTING = "cache_budget_mb"
+DEFAULT_BUDGET_MB = 128
+
+
+def estimate_strings(values: Iterable[str]) -> int:
+    """Оцінка пам'яті під набір рядків Python (в байтах)."""
+    return sum(sys.getsizeof(v) for v in values)
+
+
+class MemoryLRU:
+    """Потокобезпечний LRU-кеш з бюджетом пам'яті"""
+
+    def __init__(self, name: str, budget_bytes: Optional[int] = None):
+        """
+        Args:
+            name: Назва кешу для логу
+            budget_bytes: Бюджет у байтах (за замовчуванням — з налаштувань)
+        """
+        self.name = name
+        self._budget = budget_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def budget_bytes(self) -> int:
+        if self._budget is None:
+            from data.database import get_int_setting
+            self._budget = max(1, get_int_setting(BUDGET_SETTING, DEFAULT_BUDGET_MB)) * 1024 * 1024
+        return self._budget
+
+    def get(self, key: Hashable, valid: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Повертає значення (і робить його найсвіжішим) або None.
+        Якщо valid(value) повертає False — це промах, значення не повертається.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (valid is not None and not valid(entry[0])):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key: Hashable) -> Any:
+        """Значення без зміни порядку та лічильників (або None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def put(self, key: Hashable, value: Any, size: int):
+        """Додає/замінює запис і витісняє найдавніші, поки не влізе в бюджет."""
+        budget = self.budget_bytes
+        evicted = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            # Найсвіжіший запис не витісняється, навіть якщо сам більший за бюджет
+            while self.total_bytes > budget and len(self._entries) > 1:
+                old_key, (_, old_size) = self._entries.popitem(last=False)
+                self.total_bytes -= old_size
+                self.evictions += 1
+                evicted.append((old_key, old_size))
+        for old_key, old_size in evicted:
+            print(f"Кеш {self.name}: витіснено {old_key} (~{old_size / 1048576:.1f} МБ)")
+        if evicted:
+            self.log_stats()
+
+    def pop(self, key: Hashable):
+        """Видаляє запис (якщо є)."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[1]
+
+    def clear(self):
+        """Видаляє всі записи (лічильники зберігаються)."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "budget": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def log_stats(self):
+        """Пише стан кешу в лог."""
+        s = self.stats()
+        print(f"Кеш {self.name}: записів {s['entries']}, ~{s['bytes'] / 1048576:.1f} з "
+              f"{s['budget'] / 1048576:.0f} МБ, влучань {s['hits']}, промахів {s['misses']}, "
+              f"витіснень {s['evictions']}")
+
+
+# Спільний кеш розібраних файлів (табелі, BR_4ShB.xlsx)
+file_cache = MemoryLRU("файлів")
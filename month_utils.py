@@ -3,7 +3,6 @@
 Автоматично визначає доступні місяці з аркушів Табель_Багатомісячний.xlsx.
 """
 import re
-import openpyxl
 from datetime import datetime
 from typing import List, Tuple, Optional, Dict
 
@@ -58,17 +57,10 @@ def get_available_months(excel_file: str) -> List[str]:
     """
     Читає назви аркушів з Excel файлу та повертає ті,
     що відповідають патерну Місяць_Рік, відсортовані хронологічно.
+    Перелік береться з найшвидшого джерела табеля (див. tabel_source).
     """
-    wb = openpyxl.load_workbook(excel_file, read_only=True)
-    months = []
-    for name in wb.sheetnames:
-        parsed = parse_month_sheet_name(name)
-        if parsed:
-            year, month_num = parsed
-            months.append((year, month_num, name))
-    wb.close()
-    months.sort(key=lambda x: (x[0], x[1]))
-    return [name for _, _, name in months]
+    from tabel_source import get_tabel_source
+    return get_tabel_source(excel_file).available_months()
 
 
 def get_sheet_name_for_date(date: datetime, sheetnames: list) -> str:
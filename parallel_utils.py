@@ -0,0 +1,76 @@
+"""
+Паралельна обробка незалежних задач у пулі процесів.
+
+Розбір XML аркушів — CPU-робота, яку GIL не дає розпаралелити потоками,
+тому незалежні аркуші/файли обробляються в ProcessPoolExecutor.
+Кількість процесів задається налаштуванням "parse_workers" в app.db
+(1 — вимкнути паралельність). Якщо пул недоступний — задачі виконуються
+послідовно в поточному процесі.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Sequence
+
+WORKERS_SETTING = "parse_workers"
+
+
+def get_worker_count() -> int:
+    """Кількість процесів для паралельного розбору (налаштування або к-сть ядер)."""
+    from data.database import get_int_setting
+    return max(1, get_int_setting(WORKERS_SETTING, os.cpu_count() or 1))
+
+
+def parallel_map(func: Callable, items: Sequence, workers: Optional[int] = None,
+                 return_exceptions: bool = False) -> List:
+    """
+    Виконує func(item) для кожного елемента, зберігаючи порядок результатів.
+
+    Args:
+        func: Функція рівня модуля (має пікл-серіалізуватися)
+        items: Аргументи задач (по одному на задачу)
+        workers: Кількість процесів (за замовчуванням — get_worker_count())
+        return_exceptions: Повертати виняток задачі як результат замість підняття
+
+    Returns:
+        Список результатів у порядку items
+    """
+    items = list(items)
+    if workers is None:
+        workers = get_worker_count()
+    workers = min(workers, len(items))
+
+    if workers > 1:
+        # Помилки пулу (не вдалося створити процеси, пул впав) — перехід на
+        # послідовну обробку; винятки самих задач (OSError від відкритого в
+        # Word/Excel файлу тощо) піднімаються або повертаються як є.
+        pool = None
+        try:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            futures = [pool.submit(func, item) for item in items]
+        except (OSError, BrokenProcessPool) as e:
+            if pool is not None:
+                pool.shutdown(wait=False)
+            print(f"Попередження: пул процесів недоступний, обробка послідовно: {e}")
+        else:
+            try:
+                return [_result(f.result, return_exceptions) for f in futures]
+            except BrokenProcessPool as e:
+                print(f"Попередження: пул процесів впав, обробка послідовно: {e}")
+            finally:
+                for future in futures:
+                    future.cancel()
+                pool.shutdown()
+
+    return [_result(lambda: func(item), return_exceptions) for item in items]
+
+
+def _result(getter: Callable, return_exceptions: bool):
+    if not return_exceptions:
+        return getter()
+    try:
+        return getter()
+    except BrokenProcessPool:
+        raise
+    except Exception as e:
+        return e
@@ -0,0 +1,57 @@
+"""
+Зіставлення ПІБ між табелем, місячними джерельними файлами та app.db.
+
+Один і той самий боєць може бути записаний по-різному: різний регістр,
+різні апострофи (' ʼ ’), латинські літери-двійники замість кириличних
+(i/і, o/о, c/с...), зайві пробіли. canonical_pib() зводить усі варіанти
+до одного ключа; ключі інтернуються і кешуються, тому повторні порівняння
+в циклах не створюють нових рядків.
+"""
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+# Варіанти апострофа -> звичайний апостроф
+_APOSTROPHES = str.maketrans({ch: "'" for ch in "ʼ’‘`´ʹ′"})
+
+# Латинські літери, що виглядають як кириличні (після casefold)
+_LATIN_LOOKALIKES = str.maketrans("aceiopxykmtbhï", "асеіорхукмтвнї")
+
+
+@lru_cache(maxsize=8192)
+def canonical_pib(pib: str) -> str:
+    """
+    Канонічний ключ ПІБ для порівняння:
+    регістр, апострофи, латинські двійники та пробіли не враховуються.
+    """
+    if not pib:
+        return ""
+    key = " ".join(pib.split()).casefold()
+    key = key.translate(_APOSTROPHES).translate(_LATIN_LOOKALIKES)
+    return sys.intern(key)
+
+
+class PibResolver:
+    """Ростер ПІБ з пошуком за канонічним ключем"""
+
+    def __init__(self, pibs: Iterable[str] = ()):
+        # {канонічний_ключ: ПІБ як у ростері (перше входження)}
+        self._by_key: Dict[str, str] = {}
+        for pib in pibs:
+            self.add(pib)
+
+    def add(self, pib: str):
+        """Додає ПІБ до ростера (дублікати за ключем ігноруються)"""
+        key = canonical_pib(pib)
+        if key:
+            self._by_key.setdefault(key, pib)
+
+    def resolve(self, pib: str) -> Optional[str]:
+        """ПІБ з ростера для будь-якого варіанта написання або None"""
+        return self._by_key.get(canonical_pib(pib))
+
+    def __contains__(self, pib: str) -> bool:
+        return canonical_pib(pib) in self._by_key
+
+    def __len__(self) -> int:
+        return len(self._by_key)
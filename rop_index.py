@@ -0,0 +1,148 @@
+"""
+Індекс серій 'роп' по всіх аркушах місяців табеля.
+
+Серія — безперервна послідовність днів з позначкою 'роп' одного бійця.
+Серії зшиваються через межі місяців і років (якщо аркуш наступного місяця
+існує і 1-го числа боєць теж на 'роп'), тому "перший день роп" і
+"продовження роп" визначаються правильно і для 1-го числа місяця.
+Індекс будується один раз на версію файлу табеля (разом з каталогом).
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pib_resolver import canonical_pib
+from tabel_catalog import TabelCatalog, get_catalog
+from tabel_matrix import TabelMatrix, MARK_ROP
+
+
+class RopRun:
+    """Одна серія 'роп': ПІБ, перший і останній день"""
+
+    __slots__ = ("pib", "start", "end")
+
+    def __init__(self, pib: str, start: datetime, end: datetime):
+        self.pib = pib
+        self.start = start
+        self.end = end
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days + 1
+
+    def __repr__(self):
+        return f"RopRun({self.pib}, {self.start.strftime('%d.%m.%Y')}-{self.end.strftime('%d.%m.%Y')})"
+
+
+def _day(date: datetime) -> datetime:
+    return datetime(date.year, date.month, date.day)
+
+
+def _next_month(year: int, month: int) -> Tuple[int, int]:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+class RopIndex:
+    """Серії 'роп' табеля з доступом за датою"""
+
+    def __init__(self, catalog: TabelCatalog):
+        self.runs: List[RopRun] = []
+        # {дата: [(індекс бійця в матриці дати, серія)]}
+        self._entries: Dict[datetime, List[Tuple[int, RopRun]]] = {}
+        # {(рік, місяць): TabelMatrix}
+        self._matrices: Dict[Tuple[int, int], TabelMatrix] = {}
+        self._runs_by_pib: Dict[str, List[RopRun]] = {}
+
+        # Серії, що тривають на останній день попереднього аркуша: {канонічний ПІБ: серія}
+        open_runs: Dict[str, RopRun] = {}
+        prev_key: Optional[Tuple[int, int]] = None
+
+        for key in sorted(catalog.month_sheets):
+            matrix = catalog.tabel.matrices.get(catalog.month_sheets[key])
+            if matrix is None:
+                open_runs, prev_key = {}, None
+                continue
+            self._matrices[key] = matrix
+
+            # Зшиваємо лише з безпосередньо попереднім місяцем
+            carried = open_runs if prev_key and _next_month(*prev_key) == key else {}
+            open_runs = self._index_sheet(matrix, carried)
+            prev_key = key
+
+    def _index_sheet(self, matrix: TabelMatrix, carried: Dict[str, RopRun]) -> Dict[str, RopRun]:
+        """Додає серії аркуша; повертає серії, відкриті на останній день місяця"""
+        days = matrix.days_in_month
+        rop = matrix.marks[:, :days] == MARK_ROP
+        still_open: Dict[str, RopRun] = {}
+
+        for i in np.flatnonzero(rop.any(axis=1)).tolist():
+            key = canonical_pib(matrix.pibs[i])
+            run: Optional[RopRun] = None
+            prev_day = 0
+            for day in (np.flatnonzero(rop[i]) + 1).tolist():
+                date = datetime(matrix.year, matrix.month, day)
+                if run is not None and day == prev_day + 1:
+                    run.end = date
+                elif day == 1 and key in carried:
+                    run = carried.pop(key)
+                    run.end = date
+                else:
+                    run = RopRun(matrix.pibs[i], date, date)
+                    self.runs.append(run)
+                    self._runs_by_pib.setdefault(key, []).append(run)
+                self._entries.setdefault(date, []).append((i, run))
+                prev_day = day
+            if run is not None and prev_day == days:
+                still_open.setdefault(key, run)
+
+        return still_open
+
+    # ---------- Запити ----------
+
+    def _select(self, date: datetime, predicate) -> Tuple[Optional[TabelMatrix], np.ndarray]:
+        """Матриця дати та маска бійців, чиї серії задовольняють predicate"""
+        date = _day(date)
+        matrix = self._matrices.get((date.year, date.month))
+        if matrix is None:
+            return None, np.zeros(0, dtype=bool)
+        mask = np.zeros(len(matrix), dtype=bool)
+        for i, run in self._entries.get(date, ()):
+            if predicate(run, date):
+                mask[i] = True
+        return matrix, mask
+
+    def first_day(self, date: datetime) -> List[Tuple[str, str, str]]:
+        """[(pib, rank, position)] — бійці, у яких на дату починається серія 'роп'"""
+        matrix, mask = self._select(date, lambda run, d: run.start == d)
+        return matrix.people_with_positions(mask) if matrix is not None else []
+
+    def continuing(self, date: datetime) -> List[Tuple[str, str, str]]:
+        """[(pib, rank, position)] — бійці, у яких на дату триває серія 'роп' (2-й+ день)"""
+        matrix, mask = self._select(date, lambda run, d: run.start < d)
+        return matrix.people_with_positions(mask) if matrix is not None else []
+
+    def ending(self, date: datetime) -> List[Tuple[str, str]]:
+        """[(pib, rank)] — бійці, у яких дата є останнім днем серії 'роп'"""
+        matrix, mask = self._select(date, lambda run, d: run.end == d)
+        return matrix.people(mask) if matrix is not None else []
+
+    def runs_for(self, pib: str) -> List[RopRun]:
+        """Серії 'роп' бійця у хронологічному порядку"""
+        return list(self._runs_by_pib.get(canonical_pib(pib), ()))
+
+    def has_month(self, date: datetime) -> bool:
+        """Чи є розібраний аркуш місяця для дати"""
+        return (date.year, date.month) in self._matrices
+
+
+def rop_index_for(catalog: TabelCatalog) -> RopIndex:
+    """Повертає індекс 'роп' версії табеля (будується один раз)"""
+    if catalog.rop_index is None:
+        catalog.rop_index = RopIndex(catalog)
+    return catalog.rop_index
+
+
+def get_rop_index(tabel_file: str) -> RopIndex:
+    """Індекс 'роп' поточної версії файлу табеля"""
+    return rop_index_for(get_catalog(tabel_file))
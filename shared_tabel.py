@@ -0,0 +1,214 @@
+"""
+Розібраний табель у спільній пам'яті для дочірніх процесів.
+
+Паралельна генерація документів (рапорти, БР) виконується в пулі процесів.
+Передавати кожній задачі списки SoldierData чи матриці через pickle —
+дорого, тому батьківський процес один раз публікує аркуші місяців у
+multiprocessing.shared_memory: коди позначок і номери рядків — як є,
+ПІБ/звання/посади/примітки — індексами в таблицю унікальних рядків.
+Задача отримує лише маленький опис (descriptor) і підключається до блоку
+за назвою лише для читання (attach_tabel). Підключений табель кладеться
+в кеш процесу, тож load_tabel/TabelReader/br_updater у дочірньому процесі
+працюють без читання файлу.
+
+Опис також несе знімки (snapshot) допоміжних файлів (BR_4ShB.xlsx,
+Dodatky.md, ROP.txt), закріплені батьківським процесом, і версію табеля:
+задача в attached_batch() бачить ті самі версії, що й батьківський пакет,
+навіть якщо файли збережено посеред генерації.
+"""
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from memory_cache import file_cache
+from snapshot import FileSnapshot, pin_files, pinned_batch
+from tabel_cache import TabelData
+from tabel_matrix import TabelMatrix, MAX_DAYS, to_object_array
+
+# Стовпці таблиці індексів рядків: ПІБ, звання, посада, примітка
+_STRING_FIELDS = ("pibs", "ranks", "positions", "notes")
+_ALIGN = 8
+
+# Опубліковані в цьому процесі: {назва блоку: TabelData}
+_published: Dict[str, TabelData] = {}
+# Підключені в цьому процесі: {назва блоку: (SharedMemory, TabelData)}
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, TabelData]] = {}
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class SharedTabel:
+    """
+    Публікація аркушів місяців TabelData у спільній пам'яті.
+    Використовується як контекстний менеджер: блок звільняється на виході.
+    """
+
+    def __init__(self, tabel: TabelData, files: Iterable[str] = (),
+                 sheets: Optional[Iterable[str]] = None):
+        """
+        Args:
+            tabel: Розібраний табель
+            files: Допоміжні файли, знімки яких передаються задачам
+                   (у pinned_batch() — закріплені версії пакета)
+            sheets: Аркуші, які публікуються (за замовчуванням — усі);
+                    у підключеному табелі решти аркушів немає серед матриць
+        """
+        # Таблиця унікальних рядків (кожен рядок зберігається один раз)
+        index: Dict[str, int] = {}
+        strings: List[str] = []
+
+        def intern(value: str) -> int:
+            idx = index.get(value)
+            if idx is None:
+                idx = index[value] = len(strings)
+                strings.append(value)
+            return idx
+
+        parts: List[Tuple[str, np.ndarray]] = []
+        wanted = None if sheets is None else set(sheets)
+        sheets = []
+        for name, matrix in tabel.matrices.items():
+            if wanted is not None and name not in wanted:
+                continue
+            if matrix is None:
+                sheets.append({"name": name})
+                continue
+            fields = [getattr(matrix, field).tolist() for field in _STRING_FIELDS]
+            idx = np.array([[intern(value) for value in column] for column in fields],
+                           dtype=np.int32).reshape(len(_STRING_FIELDS), len(matrix)).T
+            sheets.append({"name": name, "year": matrix.year, "month": matrix.month,
+                           "header_row": matrix.header_row, "count": len(matrix)})
+            parts.append((f"{name}/rows", np.ascontiguousarray(matrix.rows, dtype=np.int32)))
+            parts.append((f"{name}/marks", np.ascontiguousarray(matrix.marks, dtype=np.uint8)))
+            parts.append((f"{name}/strings", np.ascontiguousarray(idx)))
+
+        encoded = [value.encode("utf-8") for value in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        parts.append(("string_offsets", offsets))
+        parts.append(("string_blob", np.frombuffer(b"".join(encoded), dtype=np.uint8)))
+
+        layout: Dict[str, Tuple[int, Tuple[int, ...], str]] = {}
+        total = 0
+        for key, array in parts:
+            total = _aligned(total)
+            layout[key] = (total, array.shape, array.dtype.str)
+            total += array.nbytes
+
+        # Табель передається спільною пам'яттю — закріплюється лише його версія
+        pins: Dict[str, FileSnapshot] = pin_files(files)
+        pins[tabel.path] = FileSnapshot(tabel.path, None, tabel.mtime_ns, tabel.size)
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+        for key, array in parts:
+            offset, shape, dtype = layout[key]
+            np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)[...] = array
+
+        self.descriptor: Dict[str, Any] = {
+            "name": self.shm.name,
+            "path": tabel.path,
+            "sheetnames": list(tabel.sheetnames),
+            "mtime_ns": tabel.mtime_ns,
+            "size": tabel.size,
+            "content_hash": tabel.content_hash,
+            "sheet_digests": dict(tabel.sheet_digests),
+            "strings_digest": tabel.strings_digest,
+            "sheets": sheets,
+            "layout": layout,
+            "pins": pins,
+        }
+        _published[self.shm.name] = tabel
+
+    def close(self):
+        """Звільняє блок спільної пам'яті"""
+        _published.pop(self.shm.name, None)
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "SharedTabel":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _open_shared(name: str) -> shared_memory.SharedMemory:
+    """
+    Підключення до блоку. Звільняє (unlink) його лише власник — SharedTabel.close();
+    дочірні процеси пулу ділять resource_tracker з батьківським, тож їхня
+    реєстрація блоку знімається разом з реєстрацією власника.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _view(shm: shared_memory.SharedMemory, layout: Dict, key: str) -> np.ndarray:
+    offset, shape, dtype = layout[key]
+    array = np.ndarray(tuple(shape), dtype=dtype, buffer=shm.buf, offset=offset)
+    array.flags.writeable = False
+    return array
+
+
+def attach_tabel(descriptor: Dict[str, Any], install: bool = True) -> TabelData:
+    """
+    TabelData з опублікованого блоку (коди позначок і номери рядків — без копіювання).
+
+    Args:
+        descriptor: SharedTabel.descriptor
+        install: Покласти табель у кеш процесу, щоб load_tabel(шлях) не читав файл
+    """
+    name = descriptor["name"]
+    tabel = _published.get(name)
+    if tabel is None and name in _attached:
+        tabel = _attached[name][1]
+    if tabel is None:
+        shm = _open_shared(name)
+        layout = descriptor["layout"]
+        offsets = _view(shm, layout, "string_offsets").tolist()
+        blob = bytes(_view(shm, layout, "string_blob"))
+        strings = to_object_array([blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+                                   for i in range(len(offsets) - 1)])
+
+        matrices: Dict[str, Optional[TabelMatrix]] = {}
+        for sheet in descriptor["sheets"]:
+            sheet_name = sheet["name"]
+            if "count" not in sheet:
+                matrices[sheet_name] = None
+                continue
+            idx = _view(shm, layout, f"{sheet_name}/strings")
+            columns = [strings[idx[:, i]] for i in range(len(_STRING_FIELDS))]
+            matrices[sheet_name] = TabelMatrix(
+                sheet_name, sheet["year"], sheet["month"], sheet["header_row"],
+                _view(shm, layout, f"{sheet_name}/rows"),
+                *columns,
+                _view(shm, layout, f"{sheet_name}/marks").reshape(-1, MAX_DAYS),
+            )
+
+        tabel = TabelData(descriptor["path"], descriptor["sheetnames"], matrices,
+                          descriptor["mtime_ns"], descriptor["size"], descriptor["content_hash"],
+                          descriptor["sheet_digests"], descriptor["strings_digest"])
+        _attached[name] = (shm, tabel)
+
+    if install:
+        file_cache.put(("tabel", tabel.path), tabel, tabel.estimate_size())
+    return tabel
+
+
+@contextmanager
+def attached_batch(descriptor: Dict[str, Any]) -> Iterator[TabelData]:
+    """
+    Задача в дочірньому процесі: табель зі спільної пам'яті та знімки файлів,
+    закріплені батьківським процесом. Файли з опису не читаються з диска,
+    а табель не перевіряється за mtime.
+    """
+    with pinned_batch(descriptor.get("pins")):
+        yield attach_tabel(descriptor)
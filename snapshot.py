@@ -0,0 +1,212 @@
+"""
+Знімки файлів у пам'яті для узгодженого читання.
+
+Табель часто відкритий в Excel під час генерації: читання може натрапити
+на напівзаписаний файл. Знімок — це байти файлу, прочитані один раз на
+версію файлу (mtime + розмір) і перевірені на цілісність; далі всі читачі
+працюють з копією в пам'яті.
+
+Усередині pinned_batch() перший знімок кожного файлу закріплюється за
+потоком: пакет (наприклад, 31 БР поспіль) бачить одну версію табеля
+і більше не звертається до диска по цей файл. Закріплені знімки можна
+передати в дочірній процес (pinned_batch(pins), див. shared_tabel), щоб
+він бачив ті самі версії, що й батьківський.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+from memory_cache import file_cache
+
+# Спроби прочитати файл, що саме зараз записується
+READ_ATTEMPTS = 5
+READ_RETRY_DELAY = 0.3
+
+_pins = threading.local()
+
+
+class FileSnapshot:
+    """Незмінна копія вмісту файлу"""
+
+    __slots__ = ("path", "data", "mtime_ns", "size", "_content_hash")
+
+    def __init__(self, path: str, data: Optional[bytes], mtime_ns: int,
+                 size: Optional[int] = None):
+        """
+        Args:
+            data: Вміст файлу; None — закріплено лише версію (mtime, size),
+                  вміст за потреби читається з диска (див. get_snapshot)
+        """
+        self.path = path
+        self.data = data
+        self.mtime_ns = mtime_ns
+        self.size = len(data) if data is not None else size
+        self._content_hash: Optional[str] = None
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        return self.mtime_ns, self.size
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-1 вмісту (рахується один раз)."""
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha1(self.data).hexdigest()
+        return self._content_hash
+
+    def version_only(self) -> "FileSnapshot":
+        """Знімок без вмісту — лише версія (для передачі в дочірній процес)."""
+        return FileSnapshot(self.path, None, self.mtime_ns, self.size)
+
+    def open(self) -> io.BytesIO:
+        """Новий file-like об'єкт над знімком (для XlsxReader тощо)."""
+        return io.BytesIO(self.data)
+
+    def __repr__(self):
+        return f"FileSnapshot({self.path}, {self.size} байт)"
+
+
+def _pinned() -> Optional[Dict[str, FileSnapshot]]:
+    return getattr(_pins, "snapshots", None)
+
+
+def pinned_snapshot(path: str) -> Optional[FileSnapshot]:
+    """Закріплений у поточному пакеті знімок файлу або None."""
+    pinned = _pinned()
+    if pinned is None:
+        return None
+    return pinned.get(os.path.realpath(path))
+
+
+def file_version(path: str) -> Tuple[int, int]:
+    """
+    (mtime_ns, розмір) файлу. Усередині pinned_batch() — версія закріпленого
+    знімка: файл закріплюється при першому ж запиті версії, навіть якщо
+    розібрані дані беруться з кешу, тож збереження файлу посеред пакета
+    не змінює версію, яку бачать наступні читачі. Для знімка без вмісту
+    (закріплено лише версію) файл не читається і не перевіряється.
+    """
+    pinned = _pinned()
+    if pinned is not None:
+        snapshot = pinned.get(os.path.realpath(path))
+        if snapshot is not None:
+            return snapshot.version
+        return get_snapshot(path).version
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_stable(real_path: str) -> FileSnapshot:
+    """
+    Читає файл цілком так, щоб він не змінився під час читання.
+    Для .xlsx додатково перевіряє, що zip цілий (не напівзаписаний).
+    """
+    last_error: Optional[Exception] = None
+    for attempt in range(READ_ATTEMPTS):
+        if attempt:
+            time.sleep(READ_RETRY_DELAY)
+        try:
+            before = os.stat(real_path)
+            with open(real_path, "rb") as f:
+                data = f.read()
+            after = os.stat(real_path)
+        except PermissionError as e:
+            # Файл тимчасово заблоковано (Excel зберігає його)
+            last_error = e
+            continue
+        if (before.st_mtime_ns, before.st_size) != (after.st_mtime_ns, after.st_size) \
+                or len(data) != after.st_size:
+            last_error = OSError(f"Файл змінювався під час читання: {real_path}")
+            continue
+        if real_path.lower().endswith((".xlsx", ".xlsm")):
+            try:
+                with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                    zf.infolist()
+            except zipfile.BadZipFile as e:
+                last_error = OSError(f"Файл пошкоджено або ще записується: {real_path} ({e})")
+                continue
+        return FileSnapshot(real_path, data, after.st_mtime_ns)
+    raise last_error
+
+
+def get_snapshot(path: str) -> FileSnapshot:
+    """
+    Знімок поточної версії файлу: закріплений у пакеті, з кешу (якщо mtime
+    і розмір не змінились) або щойно прочитаний.
+    """
+    real_path = os.path.realpath(path)
+    pinned = _pinned()
+    expected = None
+    if pinned is not None and real_path in pinned:
+        snapshot = pinned[real_path]
+        if snapshot.data is not None:
+            return snapshot
+        # Закріплено лише версію — читаємо файл, але прийнятна тільки вона
+        expected = snapshot.version
+
+    st = os.stat(real_path)
+    version = (st.st_mtime_ns, st.st_size)
+    snapshot = file_cache.get(("snapshot", real_path), lambda s: s.version == version)
+    if snapshot is None:
+        snapshot = _read_stable(real_path)
+        file_cache.put(("snapshot", real_path), snapshot, snapshot.size)
+
+    if expected is not None and snapshot.version != expected:
+        raise OSError(f"Файл змінився під час пакетної обробки: {real_path}")
+    if pinned is not None:
+        pinned[real_path] = snapshot
+    return snapshot
+
+
+def pin_files(paths: Iterable[str]) -> Dict[str, FileSnapshot]:
+    """
+    Знімки наявних файлів з paths (у пакеті — закріплюються):
+    {реальний_шлях: FileSnapshot} для pinned_batch(pins) в іншому процесі.
+    """
+    pins = {}
+    for path in paths:
+        if path and file_exists(path):
+            snapshot = get_snapshot(path)
+            pins[snapshot.path] = snapshot
+    return pins
+
+
+def file_exists(path: str) -> bool:
+    """Чи існує файл (закріплений у пакеті вважається наявним без звернення до диска)."""
+    return pinned_snapshot(path) is not None or os.path.isfile(path)
+
+
+def read_text(path: str, encoding: str = "utf-8") -> str:
+    """Вміст текстового файлу зі знімка (у пакеті — закріпленої версії)."""
+    text = get_snapshot(path).data.decode(encoding)
+    # Як open() у текстовому режимі
+    return text.replace("\r\n", "\n")
+
+
+@contextmanager
+def pinned_batch(pins: Optional[Dict[str, FileSnapshot]] = None):
+    """
+    Пакетне читання: у межах блоку кожен файл читається з диска щонайбільше
+    один раз, і всі читачі в цьому потоці бачать ту саму його версію.
+
+    Args:
+        pins: Знімки, закріплені наперед ({реальний_шлях: FileSnapshot},
+              див. pin_files) — наприклад, передані батьківським процесом
+    """
+    outer = _pinned()
+    if outer is not None:
+        # Вкладений пакет — використовуємо зовнішній
+        for real_path, snapshot in (pins or {}).items():
+            outer.setdefault(real_path, snapshot)
+        yield
+        return
+    _pins.snapshots = dict(pins or {})
+    try:
+        yield
+    finally:
+        _pins.snapshots = None
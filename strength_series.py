@@ -0,0 +1,145 @@
+"""
+Щоденна чисельність по категоріях і ролях.
+
+Щоб побачити кількість на 100/роп/30/н-п по днях місяця, раніше доводилось
+формувати склад на кожну дату окремо. Тут ряди будуються одним проходом
+по історії табеля (TabelHistory, усі аркуші місяців):
+  - категорії — кількість бійців з позначкою на кожну дату табеля
+    ("100" включає роп, як у рапортах);
+  - ролі — кількість членів ролі у складі БР: позначка 100/роп на дату
+    табеля або роп, що щойно закінчився (як у build_composition_for_date).
+
+Ряди прив'язані до дат табеля; дата БР = дата табеля - 1 день
+(див. br_updater.get_tabel_date). Результат кешується до зміни версії
+табеля або призначень ролей.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from br_updater import get_tabel_date
+from memory_cache import file_cache
+from tabel_catalog import get_catalog
+from tabel_history import TabelHistory, history_for
+from tabel_matrix import MARK_100, MARK_ROP
+
+
+class StrengthSeries:
+    """Ряди щоденної чисельності на осі дат табеля"""
+
+    def __init__(self, dates: List[datetime], categories: Dict[str, np.ndarray],
+                 roles: Dict[str, np.ndarray]):
+        self.dates = dates
+        # {категорія: кількість на кожну дату} (ключі як у CATEGORY_CODES)
+        self.categories = categories
+        # {назва ролі: кількість у складі БР на кожну дату}
+        self.roles = roles
+        self._index = {day: i for i, day in enumerate(dates)}
+
+    def __repr__(self):
+        return f"StrengthSeries(дат: {len(self.dates)}, ролей: {len(self.roles)})"
+
+    def _series(self, name: str) -> np.ndarray:
+        series = self.categories.get(name)
+        if series is None:
+            series = self.roles[name]
+        return series
+
+    def value(self, name: str, day: datetime) -> Optional[int]:
+        """Значення ряду (категорія або роль) на дату табеля; None — дати немає в табелі"""
+        i = self._index.get(day)
+        if i is None:
+            return None
+        return int(self._series(name)[i])
+
+    def on(self, day: datetime) -> Dict[str, int]:
+        """{категорія/роль: значення} на дату табеля (порожньо, якщо дати немає)"""
+        i = self._index.get(day)
+        if i is None:
+            return {}
+        result = {name: int(series[i]) for name, series in self.categories.items()}
+        result.update((name, int(series[i])) for name, series in self.roles.items())
+        return result
+
+    def window(self, start: Optional[datetime] = None, end: Optional[datetime] = None
+               ) -> Tuple[List[datetime], Dict[str, List[int]]]:
+        """
+        Всі ряди за період дат табеля [start, end].
+
+        Returns:
+            (дати, {категорія/роль: [значення на кожну дату]})
+        """
+        lo = bisect_left(self.dates, start) if start else 0
+        hi = bisect_right(self.dates, end) if end else len(self.dates)
+        result = {name: series[lo:hi].tolist() for name, series in self.categories.items()}
+        result.update((name, series[lo:hi].tolist()) for name, series in self.roles.items())
+        return self.dates[lo:hi], result
+
+
+def _br_presence(history: TabelHistory) -> np.ndarray:
+    """
+    Маска "у складі БР" (бійці × дати табеля): 100/роп на дату табеля
+    або роп напередодні без 100/роп сьогодні (повернення з позиції).
+    """
+    marks = history.marks
+    present = np.isin(marks, (MARK_100, MARK_ROP))
+    if marks.shape[1] > 1:
+        days = np.array(history.dates, dtype="datetime64[D]")
+        # Попередній стовпець — справді вчорашній день (між аркушами бувають пропуски)
+        consecutive = (days[1:] - days[:-1]) == np.timedelta64(1, "D")
+        returning = (marks[:, :-1] == MARK_ROP) & ~present[:, 1:] & consecutive
+        present[:, 1:] |= returning
+    return present
+
+
+def build_series(history: TabelHistory,
+                 role_composition: Dict[str, List[Dict]]) -> StrengthSeries:
+    """Ряди чисельності для історії табеля та призначень ролей"""
+    _, counts = history.daily_counts()
+    categories = {name: np.array(values, dtype=np.int32) for name, values in counts.items()}
+
+    present = _br_presence(history)
+    roles = {}
+    for role_name, members in role_composition.items():
+        people = {history.person_index(m["pib"]) for m in members} - {None}
+        rows = np.array(sorted(people), dtype=np.int64)
+        roles[role_name] = present[rows].sum(axis=0, dtype=np.int32) if len(rows) \
+            else np.zeros(len(history.dates), dtype=np.int32)
+    return StrengthSeries(list(history.dates), categories, roles)
+
+
+def get_strength_series(tabel_file: str) -> StrengthSeries:
+    """Ряди чисельності поточної версії табеля (з кешу, якщо табель і ролі не змінились)"""
+    from data.database import get_role_composition
+
+    catalog = get_catalog(tabel_file)
+    history = history_for(catalog)
+    role_composition = get_role_composition()
+    roles_key = tuple((name, tuple(sorted(m["pib"] for m in members)))
+                      for name, members in role_composition.items())
+
+    version = catalog.tabel.content_hash
+    key = ("strength", catalog.tabel.path)
+    cached = file_cache.get(key, lambda entry: entry[0] == version and entry[1] == roles_key)
+    if cached:
+        return cached[2]
+
+    series = build_series(history, role_composition)
+    size = sum(s.nbytes for s in series.categories.values()) + \
+        sum(s.nbytes for s in series.roles.values())
+    file_cache.put(key, (version, roles_key, series), size)
+    return series
+
+
+def br_date_series(series: StrengthSeries, name: str, start: datetime,
+                   end: datetime) -> List[Tuple[datetime, Optional[int]]]:
+    """[(дата БР, значення ряду на дату табеля БР+1)] для кожного дня [start, end]"""
+    result = []
+    day = start
+    while day <= end:
+        result.append((day, series.value(name, get_tabel_date(day))))
+        day += timedelta(days=1)
+    return result
+
@@ -0,0 +1,383 @@
+"""
+Персистентний кеш розібраного табеля.
+
+Розібрані аркуші місяців (TabelMatrix) зберігаються у .npz-файлі поруч з app.db
+(папка tabel_cache/). Запис ідентифікується шляхом файлу, а актуальність
+перевіряється за mtime, розміром та хешем вмісту. Файл табеля розбирається
+лише тоді, коли він справді змінився, і навіть тоді повторно розбираються
+лише аркуші, XML-частина яких (sheetN.xml) змінилась. Сам xlsx читається
+через знімок у пам'яті (snapshot), тому відкритий в Excel файл не заважає.
+Після заповнення табеля записувач сам публікує нову версію в кеш (publish),
+тож наступне читання не розбирає щойно збережений файл.
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from memory_cache import file_cache, estimate_strings
+from month_utils import parse_month_sheet_name
+from parallel_utils import parallel_map
+from path_utils import get_app_dir
+from snapshot import FileSnapshot, file_version, get_snapshot
+from tabel_matrix import TabelMatrix, COL_NOTE, to_object_array
+from xlsx_reader import XlsxReader, iter_sheet_part
+
+CACHE_DIR = os.path.join(get_app_dir(), "tabel_cache")
+CACHE_VERSION = 2
+
+# TabelData у пам'яті живуть у спільному file_cache під ключем ("tabel", реальний_шлях)
+# Завантаження, що тривають: {реальний_шлях: Future з TabelData}
+_inflight: Dict[str, Future] = {}
+# Файли, про зміну яких повідомили через invalidate()
+_dirty: Set[str] = set()
+_lock = threading.Lock()
+
+
+class TabelData:
+    """Розібраний табель: назви всіх аркушів + матриці аркушів місяців"""
+
+    def __init__(self, path: str, sheetnames: List[str],
+                 matrices: Dict[str, Optional[TabelMatrix]],
+                 mtime_ns: int, size: int, content_hash: str,
+                 sheet_digests: Optional[Dict[str, str]] = None, strings_digest: str = ""):
+        self.path = path
+        self.sheetnames = sheetnames
+        # {назва_аркуша: TabelMatrix або None, якщо немає рядка заголовків}
+        self.matrices = matrices
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.content_hash = content_hash
+        # Відбитки частин zip для інкрементального розбору:
+        # {назва_аркуша: SHA-1 sheetN.xml} та SHA-1 списку спільних рядків
+        self.sheet_digests = sheet_digests or {}
+        self.strings_digest = strings_digest
+        # TabelCatalog цієї версії (будується ліниво, див. tabel_catalog)
+        self.catalog = None
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        """(mtime_ns, розмір) файлу, з якого розібрано дані"""
+        return self.mtime_ns, self.size
+
+    def get_matrix(self, sheet_name: str) -> TabelMatrix:
+        """
+        Повертає матрицю аркуша.
+
+        Raises:
+            ValueError: якщо аркуш не знайдено або немає рядка заголовків
+        """
+        if sheet_name not in self.matrices:
+            raise ValueError(f"Лист '{sheet_name}' не знайдено")
+        matrix = self.matrices[sheet_name]
+        if matrix is None:
+            raise ValueError("Не знайдено рядок з заголовками")
+        return matrix
+
+    def estimate_size(self) -> int:
+        """Оцінка пам'яті, яку займають матриці (для бюджету file_cache)."""
+        total = 0
+        for matrix in self.matrices.values():
+            if matrix is None:
+                continue
+            total += matrix.rows.nbytes + matrix.marks.nbytes
+            for values in (matrix.pibs, matrix.ranks, matrix.positions, matrix.notes):
+                total += values.nbytes + estimate_strings(values.tolist())
+        return total
+
+
+def _sidecar_path(real_path: str) -> str:
+    key = hashlib.sha1(os.path.normcase(real_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{key}.npz")
+
+
+def load_tabel(tabel_file: str) -> TabelData:
+    """
+    Повертає розібраний табель: з пам'яті, з .npz-кешу або (якщо файл змінився)
+    розбором знімка xlsx (див. snapshot) — лише змінених аркушів.
+
+    Потокобезпечна: одночасні виклики для одного файлу чекають на одне
+    завантаження (single-flight), а не розбирають файл кожен окремо.
+    Усередині snapshot.pinned_batch() використовується закріплений знімок.
+    """
+    real_path = os.path.realpath(tabel_file)
+    while True:
+        version = file_version(real_path)
+        with _lock:
+            if real_path not in _dirty:
+                cached = file_cache.get(("tabel", real_path), lambda d: d.version == version)
+                if cached:
+                    return cached
+            flight = _inflight.get(real_path)
+            leader = flight is None
+            if leader:
+                flight = _inflight[real_path] = Future()
+
+        if not leader:
+            # Чекаємо на чуже завантаження і перевіряємо кеш ще раз
+            # (файл міг змінитись, поки воно тривало)
+            flight.result()
+            continue
+
+        try:
+            data = _load(real_path, version)
+            flight.set_result(data)
+            return data
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with _lock:
+                _inflight.pop(real_path, None)
+
+
+def _load(real_path: str, version: Tuple[int, int]) -> TabelData:
+    """Завантаження для load_tabel (виконує лише один потік на файл)."""
+    with _lock:
+        force_hash = real_path in _dirty
+        _dirty.discard(real_path)
+
+    previous = file_cache.peek(("tabel", real_path)) or _read_sidecar(real_path)
+    if previous and previous.version == version and not force_hash:
+        data = previous
+    else:
+        snapshot = get_snapshot(real_path)
+        data = _revalidate(previous, snapshot) if previous else None
+        if data is None:
+            data = _parse_workbook(snapshot, previous)
+            _save_sidecar(data)
+
+    file_cache.put(("tabel", real_path), data, data.estimate_size())
+    return data
+
+
+def peek_tabel(tabel_file: str) -> Optional[TabelData]:
+    """
+    Повертає розібраний табель лише якщо кеш (пам'ять або .npz) актуальний.
+    Файл табеля не розбирається.
+    """
+    real_path = os.path.realpath(tabel_file)
+    version = file_version(real_path)
+
+    with _lock:
+        if real_path in _dirty or real_path in _inflight:
+            # Файл щойно змінили або його вже завантажують — не вгадуємо
+            return None
+        cached = file_cache.get(("tabel", real_path), lambda d: d.version == version)
+    if cached:
+        return cached
+
+    previous = file_cache.peek(("tabel", real_path)) or _read_sidecar(real_path)
+    if previous is None:
+        return None
+    if previous.version == version:
+        data = previous
+    else:
+        data = _revalidate(previous, get_snapshot(real_path))
+    if data is not None:
+        file_cache.put(("tabel", real_path), data, data.estimate_size())
+    return data
+
+
+def get_month_matrix(tabel_file: str, sheet_name: str) -> TabelMatrix:
+    """Повертає TabelMatrix аркуша (див. TabelData.get_matrix)."""
+    return load_tabel(tabel_file).get_matrix(sheet_name)
+
+
+def invalidate(tabel_file: str):
+    """
+    Повідомляє кеш, що файл табеля щойно змінено (викликати після збереження).
+    Наступне завантаження перевірить вміст за хешем навіть якщо mtime і розмір
+    збіглися (грубий mtime файлової системи), і розбере змінені аркуші.
+    """
+    real_path = os.path.realpath(tabel_file)
+    with _lock:
+        file_cache.pop(("tabel", real_path))
+        _dirty.add(real_path)
+
+
+def publish(tabel_file: str, sheetnames: List[str],
+            matrices: Dict[str, Optional[TabelMatrix]]) -> TabelData:
+    """
+    Write-through після збереження табеля: кладе в кеш (пам'ять і .npz)
+    розібрані дані нової версії файлу, не розбираючи його.
+    Матриці надає той, хто щойно записав файл (див. TabelSheetWriter.save).
+
+    Args:
+        sheetnames: Назви всіх аркушів збереженої книги
+        matrices: {назва аркуша місяця: TabelMatrix або None}
+    """
+    real_path = os.path.realpath(tabel_file)
+    snapshot = get_snapshot(real_path)
+    # Відбитки частин zip потрібні для інкрементального розбору наступних версій
+    with XlsxReader(snapshot.open()) as reader:
+        strings_digest = reader.shared_strings_digest()
+        sheet_digests = {name: reader.sheet_digest(name) for name in matrices}
+
+    data = TabelData(real_path, list(sheetnames), matrices, snapshot.mtime_ns, snapshot.size,
+                     snapshot.content_hash, sheet_digests, strings_digest)
+    with _lock:
+        _dirty.discard(real_path)
+        file_cache.put(("tabel", real_path), data, data.estimate_size())
+    _save_sidecar(data)
+    print(f"Кеш табеля оновлено без розбору: {real_path}")
+    return data
+
+
+def clear_memory_cache():
+    """Звільняє кеш розібраних файлів у пам'яті (.npz-файли залишаються)."""
+    file_cache.log_stats()
+    file_cache.clear()
+
+
+def _revalidate(data: TabelData, snapshot: FileSnapshot) -> Optional[TabelData]:
+    """
+    Повертає data, якщо її вміст збігається зі знімком, інакше None.
+    Якщо змінився лише mtime (файл пересохранили без змін) — оновлює mtime у кеші.
+    """
+    if data.size != snapshot.size or data.content_hash != snapshot.content_hash:
+        return None
+    if data.mtime_ns != snapshot.mtime_ns:
+        data.mtime_ns = snapshot.mtime_ns
+        # Вміст той самий — оновлюємо mtime у кеші, щоб не хешувати наступного разу
+        _save_sidecar(data)
+    return data
+
+
+def _parse_workbook(snapshot: FileSnapshot, previous: Optional[TabelData] = None) -> TabelData:
+    """
+    Розбір табеля легким читачем xlsx (тільки значення аркушів місяців).
+
+    Аркуші, у яких sheetN.xml не змінився відносно previous, не розбираються
+    повторно. Якщо змінився список спільних рядків, індекси рядків у XML
+    могли зсунутись — тоді розбираються всі аркуші.
+    """
+    with XlsxReader(snapshot.open()) as reader:
+        sheetnames = list(reader.sheetnames)
+        strings_digest = reader.shared_strings_digest()
+        reusable = previous is not None and previous.strings_digest == strings_digest
+
+        matrices: Dict[str, Optional[TabelMatrix]] = {}
+        sheet_digests: Dict[str, str] = {}
+        to_parse: List[Tuple[Tuple[bytes, int, List[str], str], str, int, int]] = []
+        for name in sheetnames:
+            parsed = parse_month_sheet_name(name)
+            if not parsed:
+                continue
+            sheet_digest = reader.sheet_digest(name)
+            sheet_digests[name] = sheet_digest
+            if (reusable and name in previous.matrices
+                    and previous.sheet_digests.get(name) == sheet_digest):
+                matrices[name] = previous.matrices[name]
+            else:
+                matrices[name] = None
+                # У задачу — лише стиснений XML аркуша та спільні рядки, не весь файл
+                to_parse.append((reader.sheet_part(name), name, parsed[0], parsed[1]))
+
+    # Незалежні аркуші розбираються паралельно в пулі процесів
+    for (_, name, _, _), matrix in zip(to_parse, parallel_map(_parse_sheet, to_parse)):
+        matrices[name] = matrix
+
+    print(f"Розбір табеля: {snapshot.path} (аркушів розібрано: {len(to_parse)}, "
+          f"без змін: {len(matrices) - len(to_parse)})")
+    return TabelData(snapshot.path, sheetnames, matrices, snapshot.mtime_ns, snapshot.size,
+                     snapshot.content_hash, sheet_digests, strings_digest)
+
+
+def _parse_sheet(task: Tuple[Tuple[bytes, int, List[str], str], str, int, int]) -> Optional[TabelMatrix]:
+    """
+    Розбирає один аркуш місяця з XML-частини (XlsxReader.sheet_part)
+    (виконується і в дочірньому процесі). Повертає None, якщо немає рядка заголовків.
+    """
+    part, name, year, month = task
+    try:
+        return TabelMatrix.from_rows(name, year, month, iter_sheet_part(part, max_col=COL_NOTE))
+    except ValueError:
+        return None
+
+
+def _save_sidecar(data: TabelData):
+    """Зберігає розібраний табель у .npz (без pickle)."""
+    sheets_meta = []
+    arrays = {}
+    for i, (name, matrix) in enumerate(data.matrices.items()):
+        if matrix is None:
+            sheets_meta.append({"name": name, "header_row": None,
+                                "digest": data.sheet_digests.get(name, "")})
+            continue
+        sheets_meta.append({"name": name, "header_row": matrix.header_row,
+                            "digest": data.sheet_digests.get(name, "")})
+        arrays[f"s{i}_rows"] = matrix.rows
+        arrays[f"s{i}_marks"] = matrix.marks
+        arrays[f"s{i}_pibs"] = np.array(matrix.pibs.tolist(), dtype=str)
+        arrays[f"s{i}_ranks"] = np.array(matrix.ranks.tolist(), dtype=str)
+        arrays[f"s{i}_positions"] = np.array(matrix.positions.tolist(), dtype=str)
+        arrays[f"s{i}_notes"] = np.array(matrix.notes.tolist(), dtype=str)
+
+    meta = {
+        "version": CACHE_VERSION,
+        "path": data.path,
+        "mtime_ns": data.mtime_ns,
+        "size": data.size,
+        "hash": data.content_hash,
+        "sheetnames": data.sheetnames,
+        "strings_digest": data.strings_digest,
+        "sheets": sheets_meta,
+    }
+    arrays["meta"] = np.array(json.dumps(meta, ensure_ascii=False))
+
+    target = _sidecar_path(data.path)
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, target)
+    except OSError as e:
+        print(f"Попередження: не вдалося зберегти кеш табеля: {e}")
+
+
+def _read_sidecar(real_path: str) -> Optional[TabelData]:
+    """
+    Читає .npz-кеш файлу (без перевірки актуальності — див. _revalidate).
+    Застарілий кеш теж корисний: з нього беруться незмінені аркуші.
+    """
+    target = _sidecar_path(real_path)
+    if not os.path.exists(target):
+        return None
+
+    try:
+        with np.load(target, allow_pickle=False) as npz:
+            meta = json.loads(str(npz["meta"]))
+            if meta.get("version") != CACHE_VERSION or meta.get("path") != real_path:
+                return None
+
+            matrices: Dict[str, Optional[TabelMatrix]] = {}
+            sheet_digests: Dict[str, str] = {}
+            for i, sheet in enumerate(meta["sheets"]):
+                name = sheet["name"]
+                sheet_digests[name] = sheet["digest"]
+                if sheet["header_row"] is None:
+                    matrices[name] = None
+                    continue
+                year, month = parse_month_sheet_name(name)
+                matrices[name] = TabelMatrix(
+                    name, year, month, sheet["header_row"],
+                    npz[f"s{i}_rows"],
+                    to_object_array(npz[f"s{i}_pibs"].tolist()),
+                    to_object_array(npz[f"s{i}_ranks"].tolist()),
+                    to_object_array(npz[f"s{i}_positions"].tolist()),
+                    to_object_array(npz[f"s{i}_notes"].tolist()),
+                    npz[f"s{i}_marks"],
+                )
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Попередження: кеш табеля пошкоджено, буде перебудовано: {e}")
+        return None
+
+    return TabelData(real_path, meta["sheetnames"], matrices,
+                     meta["mtime_ns"], meta["size"], meta["hash"],
+                     sheet_digests, meta["strings_digest"])
@@ -0,0 +1,133 @@
+"""
+Каталог табеля: індекс аркушів, рядків заголовків та меж даних.
+
+Будується один раз на версію файлу табеля (разом з розібраним TabelData)
+і відповідає на запити "який аркуш для дати", "де заголовок/дані",
+"в якому рядку ПІБ" без повторних проходів по аркушах.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from month_utils import parse_month_sheet_name
+from pib_resolver import canonical_pib
+from tabel_cache import TabelData
+from tabel_matrix import TabelMatrix, COL_FIRST_DAY, COL_NOTE
+
+
+class SheetInfo:
+    """Розкладка одного аркуша місяця"""
+
+    def __init__(self, sheet_name: str, year: int, month: int, matrix: Optional[TabelMatrix]):
+        self.sheet_name = sheet_name
+        self.year = year
+        self.month = month
+        self.header_row: Optional[int] = None
+        self.first_data_row: Optional[int] = None
+        self.last_data_row: Optional[int] = None
+        self.days_in_month = 0
+        # Стовпці днів: день d -> стовпець COL_FIRST_DAY + d - 1
+        self.first_day_column = COL_FIRST_DAY
+        self.last_day_column = COL_FIRST_DAY - 1
+        self.note_column = COL_NOTE
+        # {канонічний ПІБ: індекс у TabelMatrix}
+        self.pib_index: Dict[str, int] = {}
+
+        if matrix is not None:
+            self.header_row = matrix.header_row
+            self.days_in_month = matrix.days_in_month
+            self.last_day_column = COL_FIRST_DAY + matrix.days_in_month - 1
+            if len(matrix):
+                self.first_data_row = int(matrix.rows[0])
+                self.last_data_row = int(matrix.rows[-1])
+            for i, pib in enumerate(matrix.pibs.tolist()):
+                self.pib_index.setdefault(canonical_pib(pib), i)
+
+    def day_column(self, day: int) -> int:
+        """Номер стовпця Excel для дня місяця"""
+        return self.first_day_column + day - 1
+
+    def __repr__(self):
+        return (f"SheetInfo({self.sheet_name}, заголовок: {self.header_row}, "
+                f"дані: {self.first_data_row}-{self.last_data_row})")
+
+
+class TabelCatalog:
+    """Індекс аркушів табеля для однієї версії файлу"""
+
+    def __init__(self, tabel: TabelData):
+        self.tabel = tabel
+        self.sheetnames: List[str] = list(tabel.sheetnames)
+        # {(рік, місяць): назва_аркуша}
+        self.month_sheets: Dict[Tuple[int, int], str] = {}
+        self.sheets: Dict[str, SheetInfo] = {}
+
+        for name in self.sheetnames:
+            parsed = parse_month_sheet_name(name)
+            if not parsed:
+                continue
+            self.month_sheets.setdefault(parsed, name)
+            self.sheets[name] = SheetInfo(name, parsed[0], parsed[1], tabel.matrices.get(name))
+
+        # Аркуші місяців у хронологічному порядку
+        self.available_months: List[str] = [
+            self.month_sheets[key] for key in sorted(self.month_sheets)
+        ]
+        # RopIndex цієї версії (будується ліниво, див. rop_index)
+        self.rop_index = None
+        # TabelHistory цієї версії (будується ліниво, див. tabel_history)
+        self.history = None
+
+    def sheet_for(self, year: int, month: int) -> Optional[str]:
+        """Назва аркуша для (рік, місяць) або None"""
+        return self.month_sheets.get((year, month))
+
+    def sheet_for_date(self, date: datetime) -> str:
+        """
+        Назва аркуша для дати.
+
+        Raises:
+            ValueError: якщо аркуш не знайдено
+        """
+        sheet_name = self.month_sheets.get((date.year, date.month))
+        if not sheet_name:
+            raise ValueError(f"Аркуш для {date.strftime('%m.%Y')} не знайдено")
+        return sheet_name
+
+    def matrix_for_date(self, date: datetime) -> TabelMatrix:
+        """
+        TabelMatrix аркуша місяця для дати.
+
+        Raises:
+            ValueError: якщо аркуш не знайдено або немає рядка заголовків
+        """
+        return self.tabel.get_matrix(self.sheet_for_date(date))
+
+    def row_for_pib(self, sheet_name: str, pib: str) -> Optional[int]:
+        """Номер рядка Excel для ПІБ на аркуші або None"""
+        info = self.sheets.get(sheet_name)
+        if not info:
+            return None
+        idx = info.pib_index.get(canonical_pib(pib))
+        if idx is None:
+            return None
+        return int(self.tabel.matrices[sheet_name].rows[idx])
+
+
+def catalog_for(tabel: TabelData) -> TabelCatalog:
+    """Повертає каталог версії табеля (будується один раз)"""
+    if tabel.catalog is None:
+        tabel.catalog = TabelCatalog(tabel)
+    return tabel.catalog
+
+
+def get_catalog(tabel_file: str) -> TabelCatalog:
+    """Каталог поточної версії табеля (з найшвидшого джерела, див. tabel_source)"""
+    from tabel_source import get_tabel_source
+    return catalog_for(get_tabel_source(tabel_file).load())
+
+
+def peek_catalog(tabel_file: str) -> Optional[TabelCatalog]:
+    """Каталог, лише якщо його можна отримати без розбору файлу табеля"""
+    from tabel_source import get_tabel_source
+    tabel = get_tabel_source(tabel_file).peek()
+    return catalog_for(tabel) if tabel else None
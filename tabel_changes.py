@@ -0,0 +1,306 @@
+"""
+Стрічка змін між версіями табеля.
+
+Коли в табелі правлять кілька клітинок, наступні кроки (БР, рапорти,
+імпорт особового складу) не знають, що саме змінилось, і переробляють усе.
+Тут позначки двох версій (боєць × день з TabelHistory) вирівнюються за
+канонічним ПІБ і датою та порівнюються векторно: результат — змінені
+клітинки, дати зі змінами, додані та зникли бійці.
+
+Стан позначок можна зберегти як контрольну точку (таблиця
+tabel_checkpoints в app.db), щоб потім спитати "що змінилось з останнього
+пакету БР": changes_since(табель, BR_BATCH_CHECKPOINT). Пакет оновлює
+контрольну точку лише за оброблені дати (save_checkpoint(..., start, end)):
+зміни за інші дні залишаються у стрічці до пакету, який їх охопить.
+
+Запуск з командного рядка:
+    python tabel_changes.py [шлях_до_табеля] [контрольна_точка]
+"""
+import io
+import os
+import sqlite3
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tabel_catalog import get_catalog
+from tabel_history import history_for, TabelHistory
+from tabel_matrix import MARK_EMPTY, MARK_100, MARK_ROP, MARK_30, MARK_0, MARK_UNKNOWN
+
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tabel_checkpoints (
+    name TEXT NOT NULL,
+    source_path TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    state BLOB NOT NULL,
+    PRIMARY KEY (name, source_path)
+);
+"""
+
+# Контрольна точка після пакетної генерації БР
+BR_BATCH_CHECKPOINT = "br_batch"
+
+# Код позначки -> текст у звіті змін
+_CODE_TEXT = {
+    MARK_EMPTY: "",
+    MARK_100: "100",
+    MARK_ROP: "роп",
+    MARK_30: "30",
+    MARK_0: "0",
+    MARK_UNKNOWN: "?",
+}
+
+
+class MarkState:
+    """Позначки однієї версії табеля: бійці (канонічні ПІБ) × дні"""
+
+    def __init__(self, keys: List[str], pibs: List[str], days: np.ndarray,
+                 marks: np.ndarray, content_hash: str = ""):
+        """
+        Args:
+            keys: Канонічні ПІБ рядків
+            pibs: ПІБ як у табелі (для звіту)
+            days: Порядкові номери дат (date.toordinal), int32, за зростанням
+            marks: Коди позначок (len(keys) × len(days)), uint8
+            content_hash: SHA-1 файлу табеля цієї версії
+        """
+        self.keys = keys
+        self.pibs = pibs
+        self.days = days
+        self.marks = marks
+        self.content_hash = content_hash
+
+    @classmethod
+    def from_history(cls, history: TabelHistory, content_hash: str = "") -> "MarkState":
+        days = np.array([d.toordinal() for d in history.dates], dtype=np.int32)
+        return cls(history.keys, history.pibs, days, history.marks, content_hash)
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            keys=np.array(self.keys, dtype=str),
+            pibs=np.array(self.pibs, dtype=str),
+            days=self.days,
+            marks=self.marks,
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, content_hash: str = "") -> "MarkState":
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            return cls(npz["keys"].tolist(), npz["pibs"].tolist(), npz["days"],
+                       npz["marks"], content_hash)
+
+    def merged(self, update: "MarkState", start: datetime, end: datetime) -> "MarkState":
+        """
+        Стан, у якому дні [start, end] взято з update, а решта — з цього стану.
+        Бійці — з обох станів (у днях, яких стан не має, позначки порожні).
+        """
+        first, last = start.toordinal(), end.toordinal()
+        in_range = (update.days >= first) & (update.days <= last)
+        kept = (self.days < first) | (self.days > last)
+
+        key_index = {key: i for i, key in enumerate(update.keys)}
+        pibs = list(update.pibs)
+        for key, pib in zip(self.keys, self.pibs):
+            if key not in key_index:
+                key_index[key] = len(pibs)
+                pibs.append(pib)
+        days = np.union1d(self.days[kept], update.days[in_range]).astype(np.int32)
+        before = _align(self, key_index, days, kept)
+        after = _align(update, key_index, days, in_range)
+        marks = np.where(np.isin(days, update.days[in_range])[None, :], after, before)
+        # Відбиток файлу лише якщо стан збігається з цією версією в усі дні
+        content_hash = update.content_hash if self.content_hash == update.content_hash else ""
+        return MarkState(list(key_index), pibs, days, marks, content_hash)
+
+
+class TabelChanges:
+    """Різниця між двома версіями табеля"""
+
+    def __init__(self, cells: List[Tuple[str, datetime, str, str]], added: List[str],
+                 removed: List[str], from_hash: str = "", to_hash: str = ""):
+        # [(ПІБ, дата, було, стало)] — у порядку дат, далі ПІБ
+        self.cells = cells
+        # ПІБ бійців, яких не було / яких більше немає в табелі
+        self.added = added
+        self.removed = removed
+        self.from_hash = from_hash
+        self.to_hash = to_hash
+        # Дати, на які змінилась хоча б одна позначка (за зростанням)
+        self.dates: List[datetime] = sorted({cell[1] for cell in cells})
+
+    def __bool__(self) -> bool:
+        return bool(self.cells or self.added or self.removed)
+
+    def __repr__(self):
+        return (f"TabelChanges(клітинок: {len(self.cells)}, дат: {len(self.dates)}, "
+                f"+{len(self.added)}/-{len(self.removed)} бійців)")
+
+    def dates_between(self, start: datetime, end: datetime) -> List[datetime]:
+        """Дати зі змінами в межах [start, end]"""
+        return [d for d in self.dates if start <= d <= end]
+
+    def summary(self, limit: int = 10) -> str:
+        """Звіт для логу/GUI (перші limit дат і бійців)"""
+        if not self:
+            return "Змін немає"
+
+        def listed(values: List[str]) -> str:
+            more = f" … (+{len(values) - limit})" if len(values) > limit else ""
+            return ", ".join(values[:limit]) + more
+
+        lines = [f"Змінено позначок: {len(self.cells)}"]
+        if self.dates:
+            lines.append(f"Дати: {listed([d.strftime('%d.%m.%Y') for d in self.dates])}")
+        if self.added:
+            lines.append(f"Додано бійців: {listed(self.added)}")
+        if self.removed:
+            lines.append(f"Зникли з табеля: {listed(self.removed)}")
+        return "\n".join(lines)
+
+
+def _align(state: MarkState, key_index: Dict[str, int], days: np.ndarray,
+           columns: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Позначки стану на спільній осі (усі ключі × усі дні).
+    columns — маска днів стану, які переносяться (None — усі).
+    """
+    aligned = np.zeros((len(key_index), len(days)), dtype=np.uint8)
+    state_days, marks = state.days, state.marks
+    if columns is not None:
+        state_days, marks = state_days[columns], marks[:, columns]
+    if len(state.keys) and len(state_days):
+        rows = np.array([key_index[key] for key in state.keys], dtype=np.int64)
+        cols = np.searchsorted(days, state_days)
+        aligned[np.ix_(rows, cols)] = marks
+    return aligned
+
+
+def diff_states(old: MarkState, new: MarkState) -> TabelChanges:
+    """Порівнює позначки двох версій табеля"""
+    if old.content_hash and old.content_hash == new.content_hash:
+        return TabelChanges([], [], [], old.content_hash, new.content_hash)
+    old_keys, new_keys = set(old.keys), set(new.keys)
+    added = [pib for key, pib in zip(new.keys, new.pibs) if key not in old_keys]
+    removed = [pib for key, pib in zip(old.keys, old.pibs) if key not in new_keys]
+
+    # Спільна вісь: ключі нової версії, далі зниклі; дні обох версій
+    key_index = {key: i for i, key in enumerate(new.keys)}
+    names = list(new.pibs)
+    for key, pib in zip(old.keys, old.pibs):
+        if key not in key_index:
+            key_index[key] = len(names)
+            names.append(pib)
+    days = np.union1d(old.days, new.days)
+
+    before = _align(old, key_index, days)
+    after = _align(new, key_index, days)
+    # Вісь дат першою — клітинки впорядковані за датою
+    cols, rows = np.nonzero((before != after).T)
+    cells = []
+    for col, row in zip(cols.tolist(), rows.tolist()):
+        day = datetime.combine(date.fromordinal(int(days[col])), datetime.min.time())
+        cells.append((names[row], day, _CODE_TEXT.get(int(before[row, col]), "?"),
+                      _CODE_TEXT.get(int(after[row, col]), "?")))
+    return TabelChanges(cells, added, removed, old.content_hash, new.content_hash)
+
+
+def current_state(tabel_file: str) -> MarkState:
+    """Стан позначок поточної версії файлу табеля"""
+    catalog = get_catalog(tabel_file)
+    return MarkState.from_history(history_for(catalog), catalog.tabel.content_hash)
+
+
+def _connect(db_path: Optional[str]) -> sqlite3.Connection:
+    if db_path is None:
+        from data.database import DB_PATH
+        db_path = DB_PATH
+    conn = sqlite3.connect(db_path)
+    conn.executescript(CHECKPOINT_SCHEMA)
+    return conn
+
+
+def save_checkpoint(tabel_file: str, name: str = BR_BATCH_CHECKPOINT,
+                    db_path: Optional[str] = None, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None) -> MarkState:
+    """
+    Зберігає поточний стан позначок табеля як контрольну точку name.
+
+    Args:
+        start, end: Дати табеля, які оброблено (None — усі). Інші дні
+                    зберігають стан з попередньої контрольної точки
+    """
+    state = current_state(tabel_file)
+    if start is not None or end is not None:
+        previous = load_checkpoint(tabel_file, name, db_path)
+        if previous is None:
+            previous = MarkState([], [], np.zeros(0, dtype=np.int32),
+                                 np.zeros((0, 0), dtype=np.uint8))
+        state = previous.merged(state, start or datetime.min, end or datetime.max)
+    conn = _connect(db_path)
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tabel_checkpoints "
+                "(name, source_path, content_hash, state) VALUES (?, ?, ?, ?)",
+                (name, os.path.realpath(tabel_file), state.content_hash,
+                 sqlite3.Binary(state.to_bytes()))
+            )
+    finally:
+        conn.close()
+    return state
+
+
+def load_checkpoint(tabel_file: str, name: str = BR_BATCH_CHECKPOINT,
+                    db_path: Optional[str] = None) -> Optional[MarkState]:
+    """Стан позначок з контрольної точки або None (якщо її ще немає)"""
+    conn = _connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT content_hash, state FROM tabel_checkpoints "
+            "WHERE name = ? AND source_path = ?",
+            (name, os.path.realpath(tabel_file))
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return MarkState.from_bytes(row[1], row[0])
+
+
+def changes_since(tabel_file: str, name: str = BR_BATCH_CHECKPOINT,
+                  db_path: Optional[str] = None) -> Optional[TabelChanges]:
+    """
+    Зміни табеля з контрольної точки name.
+
+    Returns:
+        TabelChanges або None, якщо контрольної точки ще немає
+        (тоді вважати зміненим усе)
+    """
+    try:
+        checkpoint = load_checkpoint(tabel_file, name, db_path)
+    except (sqlite3.Error, ValueError, OSError) as e:
+        print(f"Попередження: контрольну точку '{name}' не прочитано: {e}")
+        return None
+    if checkpoint is None:
+        return None
+    return diff_states(checkpoint, current_state(tabel_file))
+
+
+if __name__ == "__main__":
+    import sys
+    from path_utils import get_app_dir
+
+    tabel_path = sys.argv[1] if len(sys.argv) > 1 else \
+        os.path.join(get_app_dir(), "Табель_Багатомісячний.xlsx")
+    checkpoint_name = sys.argv[2] if len(sys.argv) > 2 else BR_BATCH_CHECKPOINT
+    changes = changes_since(tabel_path, checkpoint_name)
+    if changes is None:
+        print(f"Контрольної точки '{checkpoint_name}' ще немає — зберігаю поточний стан")
+        save_checkpoint(tabel_path, checkpoint_name)
+    else:
+        print(changes.summary(limit=50))
@@ -0,0 +1,169 @@
+"""
+Стиснення файлу табеля.
+
+Місяці копіювання аркушів (copy_worksheet + очищення значень) залишають
+у табелі тисячі відформатованих порожніх комірок, дублікати стилів та
+спільні рядки, на які вже ніщо не посилається. Від цього повільнішає
+кожне відкриття і збереження файлу.
+
+compact_workbook() переписує табель:
+  - прибирає порожні комірки нижче/правіше останньої комірки зі значенням
+    (межі аркуша), разом з висотами таких рядків;
+  - перебудовує таблицю стилів комірок лише з використаних стилів без дублікатів;
+  - спільні рядки openpyxl записує заново — лише ті, що є у значеннях.
+Значення, ширини стовпців, об'єднання комірок і заголовки зберігаються;
+перед заміною файл перевіряється, а оригінал зберігається як резервна копія.
+
+Запуск з командного рядка:
+    python tabel_compactor.py [шлях_до_табеля]
+"""
+import os
+import shutil
+import time
+from typing import Dict, Tuple
+
+import openpyxl
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.utils.indexed_list import IndexedList
+
+from tabel_cache import invalidate as invalidate_tabel
+from tabel_source import sync_mark_store_in_background
+
+BACKUP_SUFFIX = ".bak"
+
+
+class CompactionResult:
+    """Підсумок стиснення: розмір файлу та час відкриття до/після"""
+
+    def __init__(self, path: str, size_before: int, size_after: int,
+                 load_before: float, load_after: float, cells_removed: int,
+                 styles_before: int, styles_after: int, backup_path: str):
+        self.path = path
+        self.size_before = size_before
+        self.size_after = size_after
+        self.load_before = load_before
+        self.load_after = load_after
+        self.cells_removed = cells_removed
+        self.styles_before = styles_before
+        self.styles_after = styles_after
+        self.backup_path = backup_path
+
+    def summary(self) -> str:
+        """Звіт для логу/GUI"""
+        return "\n".join([
+            f"Файл: {self.path}",
+            f"Розмір: {self.size_before / 1024:.0f} КБ -> {self.size_after / 1024:.0f} КБ",
+            f"Відкриття: {self.load_before:.2f} с -> {self.load_after:.2f} с",
+            f"Видалено порожніх комірок: {self.cells_removed}",
+            f"Стилів комірок: {self.styles_before} -> {self.styles_after}",
+            f"Резервна копія: {self.backup_path}",
+        ])
+
+
+def _timed_load(path: str):
+    start = time.perf_counter()
+    wb = openpyxl.load_workbook(path)
+    return wb, time.perf_counter() - start
+
+
+def _sheet_values(ws) -> Dict[Tuple[int, int], object]:
+    """{(рядок, стовпець): значення} непорожніх комірок аркуша"""
+    # ws._cells — без створення порожніх комірок, як це робить iter_rows
+    return {key: cell.value for key, cell in ws._cells.items()
+            if cell.value is not None and cell.value != ""}
+
+
+def _trim_sheet(ws) -> int:
+    """Прибирає порожні комірки за межами даних. Повертає кількість видалених."""
+    values = _sheet_values(ws)
+    last_row = max((row for row, _ in values), default=0)
+    last_col = max((col for _, col in values), default=0)
+    # Об'єднання комірок у межах даних (шапка) зберігаються разом з форматуванням
+    for merged in ws.merged_cells.ranges:
+        if merged.min_row <= last_row and merged.min_col <= last_col:
+            last_row = max(last_row, merged.max_row)
+            last_col = max(last_col, merged.max_col)
+
+    outside = [key for key in ws._cells if key[0] > last_row or key[1] > last_col]
+    for key in outside:
+        del ws._cells[key]
+    for row in [row for row in ws.row_dimensions if row > last_row]:
+        del ws.row_dimensions[row]
+    for merged in [m for m in ws.merged_cells.ranges
+                   if m.min_row > last_row or m.min_col > last_col]:
+        ws.merged_cells.remove(merged)
+    return len(outside)
+
+
+def compact_workbook(tabel_file: str) -> CompactionResult:
+    """
+    Стискає файл табеля на місці (оригінал -> <файл>.bak).
+
+    Raises:
+        ValueError: якщо після стиснення значення або ширини стовпців не збіглися
+            (оригінальний файл тоді не змінюється)
+    """
+    size_before = os.path.getsize(tabel_file)
+    wb, load_before = _timed_load(tabel_file)
+
+    expected_values = {ws.title: _sheet_values(ws) for ws in wb.worksheets}
+    expected_widths = {
+        ws.title: {key: dim.width for key, dim in ws.column_dimensions.items()}
+        for ws in wb.worksheets
+    }
+
+    cells_removed = sum(_trim_sheet(ws) for ws in wb.worksheets)
+
+    # Таблиця стилів заповнюється заново під час збереження — лише
+    # стилями, які справді використовують комірки, рядки та стовпці
+    styles_before = len(wb._cell_styles)
+    wb._cell_styles = IndexedList([StyleArray()])
+
+    # openpyxl відкриває лише файли з розширенням xlsx/xlsm
+    root, ext = os.path.splitext(tabel_file)
+    tmp_path = f"{root}.{os.getpid()}.tmp{ext}"
+    try:
+        wb.save(tmp_path)
+        styles_after = len(wb._cell_styles)
+        wb.close()
+
+        compacted, load_after = _timed_load(tmp_path)
+        try:
+            for ws in compacted.worksheets:
+                if _sheet_values(ws) != expected_values.get(ws.title):
+                    raise ValueError(f"Значення аркуша '{ws.title}' змінились після стиснення")
+                widths = {key: dim.width for key, dim in ws.column_dimensions.items()}
+                if any(widths.get(key) != width
+                       for key, width in expected_widths[ws.title].items()
+                       if width):
+                    raise ValueError(f"Ширини стовпців аркуша '{ws.title}' змінились після стиснення")
+            if len(compacted.worksheets) != len(expected_values):
+                raise ValueError("Кількість аркушів змінилась після стиснення")
+        finally:
+            compacted.close()
+
+        backup_path = tabel_file + BACKUP_SUFFIX
+        shutil.copy2(tabel_file, backup_path)
+        os.replace(tmp_path, tabel_file)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    invalidate_tabel(tabel_file)
+    sync_mark_store_in_background(tabel_file)
+    result = CompactionResult(tabel_file, size_before, os.path.getsize(tabel_file),
+                              load_before, load_after, cells_removed,
+                              styles_before, styles_after, backup_path)
+    print(result.summary())
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    from path_utils import get_app_dir
+
+    if len(sys.argv) > 1:
+        tabel_path = sys.argv[1]
+    else:
+        tabel_path = os.path.join(get_app_dir(), "Табель_Багатомісячний.xlsx")
+    compact_workbook(tabel_path)
@@ -4,11 +4,18 @@
 import os
 import openpyxl
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple, Optional
+from typing import Iterator, List, Dict, Tuple, Optional
 from collections import defaultdict
 import re
-from br_calculator import parse_date_from_excel_cell
-from month_utils import get_available_months, parse_month_sheet_name, get_source_filename, MONTH_NAMES_UK_LOWER
+from date_parser import parse_date_column, parse_dates_in_cell
+from month_utils import parse_month_sheet_name, get_source_filename, MONTH_NAMES_UK_LOWER
+from parallel_utils import parallel_map
+from pib_resolver import canonical_pib
+from snapshot import get_snapshot
+from tabel_cache import TabelData, peek_tabel, invalidate as invalidate_tabel, publish as publish_tabel
+from tabel_catalog import catalog_for
+from tabel_matrix import TabelMatrix, COL_NOTE
+from tabel_source import get_tabel_source, sync_mark_store_in_background
 
 
 class SoldierPeriod:
@@ -108,48 +115,14 @@ class SourceFileReader:
         """
         if not cell_value:
             return None
-        
-        try:
-            # Якщо це вже datetime
-            if isinstance(cell_value, datetime):
-                return cell_value
-            
-            # Якщо це рядок
-            if isinstance(cell_value, str):
-                cell_str = cell_value.strip()
-                
-                # Якщо в комірці кілька дат (розділених пробілами або новими рядками)
-                # Розділяємо на окремі дати
-                date_strings = re.split(r'[\s\n\r]+', cell_str)
-                dates = []
-                
-                for date_str in date_strings:
-                    date_str = date_str.strip()
-                    if not date_str:
-                        continue
-                    # Спробуємо формат dd.mm.yyyy
-                    try:
-                        date_obj = datetime.strptime(date_str, "%d.%m.%Y")
-                        dates.append(date_obj)
-                    except ValueError:
-                        continue
-                
-                if dates:
-                    # Якщо потрібна перша дата - повертаємо мінімальну
-                    # Якщо потрібна остання - повертаємо максимальну
-                    if take_first:
-                        return min(dates)
-                    else:
-                        return max(dates)
-                
-                # Якщо не вдалося розпарсити як окремі дати, спробуємо через parse_date_from_excel_cell
-                return parse_date_from_excel_cell(cell_value)
-            
-            # Для інших типів (наприклад, числа Excel)
-            return parse_date_from_excel_cell(cell_value)
-        except Exception as e:
-            print(f"Помилка парсингу дати {cell_value}: {e}")
+
+        # У комірці може бути кілька дат (через пробіли або нові рядки):
+        # для початку періоду — найраніша, для кінця — найпізніша
+        dates = parse_dates_in_cell(cell_value)
+        if not dates:
+            print(f"Помилка парсингу дати {cell_value}: Неможливо розпарсити дату")
             return None
+        return min(dates) if take_first else max(dates)
     
     def read_category_sheet(self, sheet_name: str) -> List[Tuple[str, str, str, datetime, datetime]]:
         """
@@ -168,12 +141,16 @@ class SourceFileReader:
         ws = self.wb[sheet_name]
         results = []
         
-        # Читаємо дані з рядка 2 і далі
-        for row in range(2, ws.max_row + 1):
-            cell_b = ws.cell(row, 2).value  # Звання + ПІБ + посада
-            cell_c = ws.cell(row, 3).value  # Дата початку
-            cell_d = ws.cell(row, 4).value  # Дата кінця
-            cell_f = ws.cell(row, 6).value if ws.max_column >= 6 else None  # ПІБ окремо
+        # Читаємо дані з рядка 2 і далі; B — звання + ПІБ + посада, F — ПІБ окремо
+        rows = list(ws.iter_rows(min_row=2, max_col=6, values_only=True))
+        # Стовпці дат (C — початок, D — кінець) розбираються пакетом:
+        # для початку періоду беремо першу дату, для кінця — останню
+        start_dates = parse_date_column([values[2] for values in rows])
+        end_dates = parse_date_column([values[3] for values in rows], last=True)
+
+        for row, (values, start_date, end_date) in enumerate(zip(rows, start_dates, end_dates),
+                                                             start=2):
+            cell_b, cell_f = values[1], values[5]
             
             # Перевіряємо, чи є дані
             if not cell_b and not cell_f:
@@ -185,11 +162,6 @@ class SourceFileReader:
             if not pib:
                 continue
             
-            # Парсимо дати
-            # Для початку періоду беремо першу дату, для кінця - останню
-            start_date = self.parse_date(cell_c, take_first=True)
-            end_date = self.parse_date(cell_d, take_first=False)
-            
             if not start_date or not end_date:
                 print(f"Попередження: не вдалося розпарсити дати для рядка {row}, ПІБ: {pib}")
                 continue
@@ -204,7 +176,7 @@ class SourceFileReader:
         Читає дані з усіх аркушів категорій та об'єднує по ПІБ
         
         Returns:
-            Dict[pib, SoldierPeriod] - словник з даними по кожному ПІБ
+            Dict[канонічний ПІБ, SoldierPeriod] - словник з даними по кожному ПІБ
         """
         soldiers: Dict[str, SoldierPeriod] = {}
         
@@ -214,21 +186,22 @@ class SourceFileReader:
             records = self.read_category_sheet(category)
             
             for rank, pib, position, start_date, end_date in records:
-                # Нормалізуємо ПІБ (великі літери, без зайвих пробілів)
-                pib_normalized = " ".join(pib.upper().split())
+                # Ключ — канонічний ПІБ (регістр, апострофи, латинські двійники не враховуються),
+                # у табель пишеться ПІБ великими літерами без зайвих пробілів
+                pib_key = canonical_pib(pib)
                 
                 # Створюємо або отримуємо об'єкт SoldierPeriod
-                if pib_normalized not in soldiers:
-                    soldiers[pib_normalized] = SoldierPeriod(pib_normalized, rank, position)
+                if pib_key not in soldiers:
+                    soldiers[pib_key] = SoldierPeriod(" ".join(pib.upper().split()), rank, position)
                 else:
                     # Якщо вже є - оновлюємо звання та посаду, якщо вони були порожні
-                    soldier = soldiers[pib_normalized]
+                    soldier = soldiers[pib_key]
                     if not soldier.rank and rank:
                         soldier.rank = rank
                     if not soldier.position and position:
                         soldier.position = position
                 
-                soldier = soldiers[pib_normalized]
+                soldier = soldiers[pib_key]
                 
                 # Додаємо період до відповідної категорії
                 period = (start_date, end_date)
@@ -310,10 +283,18 @@ class TabelSheetWriter:
     def __init__(self, tabel_file: str):
         self.tabel_file = tabel_file
         self.wb = None
+        # Останній заповнений рядок аркушів, записаних у цій сесії: {аркуш: рядок}
+        self._extents: Dict[str, int] = {}
+        # Розібраний табель тієї ж версії, що й завантажена книга (для write-through)
+        self._base: Optional[TabelData] = None
         
     def load_workbook(self):
         """Завантажує Excel файл"""
-        self.wb = openpyxl.load_workbook(self.tabel_file)
+        snapshot = get_snapshot(self.tabel_file)
+        self.wb = openpyxl.load_workbook(snapshot.open())
+        tabel = peek_tabel(self.tabel_file)
+        if tabel is not None and tabel.content_hash == snapshot.content_hash:
+            self._base = tabel
         print(f"Завантажено файл табелю: {self.tabel_file}")
     
     def clear_sheet_data(self, sheet_name: str, start_row: int = 9):
@@ -324,14 +305,27 @@ class TabelSheetWriter:
         
         ws = self.wb[sheet_name]
         
-        # Очищаємо стовпці D, E, F та G:AK
-        for row in range(start_row, ws.max_row + 1):
+        # Очищаємо стовпці D, E, F та G:AK — лише до останнього рядка з ПІБ
+        # (ws.max_row може сягати десятків тисяч порожніх відформатованих рядків)
+        for row in range(start_row, self._data_extent(ws, sheet_name) + 1):
             # Стовпці D, E, F (посада, звання, ПІБ)
             for col in [4, 5, 6]:
                 ws.cell(row, col).value = None
             # Стовпці G:AK (дні місяця, максимально до 31 дня)
             for col in range(7, 38):  # G=7, AK=37 (за 31 день)
                 ws.cell(row, col).value = None
+
+    def _data_extent(self, ws, sheet_name: str) -> int:
+        """Останній рядок з ПІБ: записаний у цій сесії або з розібраного табеля цієї версії"""
+        if sheet_name in self._extents:
+            return self._extents[sheet_name]
+        matrix = self._base.matrices.get(sheet_name) if self._base else None
+        if matrix is not None:
+            return matrix.last_row
+        try:
+            return get_tabel_source(self.tabel_file).data_extent(sheet_name)
+        except ValueError:
+            return ws.max_row
     
     def fill_month_sheet(self, sheet_name: str, soldiers: Dict[str, SoldierPeriod], year: int, month: int):
         """
@@ -361,7 +355,7 @@ class TabelSheetWriter:
         row = 9
         
         # Сортуємо ПІБ за алфавітом
-        sorted_pibs = sorted(soldiers.keys())
+        sorted_pibs = sorted(soldiers, key=lambda key: soldiers[key].pib)
         
         for pib in sorted_pibs:
             soldier = soldiers[pib]
@@ -383,13 +377,64 @@ class TabelSheetWriter:
             
             row += 1
         
+        self._extents[sheet_name] = row - 1
         print(f"Заповнено аркуш '{sheet_name}': {len(sorted_pibs)} військовослужбовців")
     
     def save(self):
-        """Зберігає файл"""
+        """Зберігає файл і публікує записані дані в кеш табеля (write-through)"""
         if self.wb:
             self.wb.save(self.tabel_file)
             print(f"Файл збережено: {self.tabel_file}")
+            try:
+                catalog_for(publish_tabel(self.tabel_file, self.wb.sheetnames, self._month_matrices()))
+            except Exception as e:
+                # Розібрані дані табеля в кеші більше не актуальні — розберуться при читанні
+                invalidate_tabel(self.tabel_file)
+                print(f"Попередження: кеш табеля не оновлено: {e}")
+            sync_mark_store_in_background(self.tabel_file)
+
+    def _month_matrices(self) -> Dict[str, Optional[TabelMatrix]]:
+        """
+        Матриці аркушів місяців книги, як їх побачить розбір збереженого файлу:
+        записані аркуші — з книги в пам'яті, решта — з кешу попередньої версії
+        (якщо на аркуші немає формул).
+        """
+        matrices: Dict[str, Optional[TabelMatrix]] = {}
+        for name in self.wb.sheetnames:
+            parsed = parse_month_sheet_name(name)
+            if not parsed:
+                continue
+            ws = self.wb[name]
+            if (name not in self._extents and self._base is not None
+                    and name in self._base.matrices and not _has_formulas(ws)):
+                matrices[name] = self._base.matrices[name]
+                continue
+            rows = _saved_values(ws, self._extents.get(name, ws.max_row))
+            try:
+                matrices[name] = TabelMatrix.from_rows(name, parsed[0], parsed[1], rows)
+            except ValueError:
+                matrices[name] = None
+        return matrices
+
+
+def _has_formulas(ws) -> bool:
+    """Чи є на аркуші формули в стовпцях, які розбирає TabelMatrix"""
+    # ws._cells — лише наявні комірки (iter_rows створив би порожні)
+    return any(cell.data_type == "f" for (_, col), cell in ws._cells.items() if col <= COL_NOTE)
+
+
+def _saved_values(ws, max_row: int) -> Iterator[tuple]:
+    """
+    Значення рядків аркуша так, як їх прочитає XlsxReader зі збереженого файлу:
+    openpyxl зберігає формули без обчислених значень, тож формула — None.
+    """
+    for row in ws.iter_rows(min_row=1, max_row=max_row, max_col=COL_NOTE):
+        yield tuple(None if cell.data_type == "f" else cell.value for cell in row)
+
+
+def _read_source_file(source_file: str) -> Dict[str, SoldierPeriod]:
+    """Читає всі категорії джерельного файлу (виконується і в дочірньому процесі)"""
+    return SourceFileReader(source_file).read_all_categories()
 
 
 def fill_tabel_months(tabel_file: str = "Табель_Багатомісячний.xlsx"):
@@ -403,27 +448,33 @@ def fill_tabel_months(tabel_file: str = "Табель_Багатомісячни
     from path_utils import get_app_dir
     tabel_path = os.path.join(get_app_dir(), tabel_file) if not os.path.isabs(tabel_file) else tabel_file
 
-    available = get_available_months(tabel_path)
+    available = get_tabel_source(tabel_path).available_months()
     if not available:
         print("Не знайдено жодного аркуша місяця в табелі")
         return
 
     writer = TabelSheetWriter(tabel_file)
 
+    months = []
     for sheet_name in available:
         parsed = parse_month_sheet_name(sheet_name)
         if not parsed:
             continue
-        year, month = parsed
-        source_file = get_source_filename(sheet_name)
+        months.append((sheet_name, parsed, get_source_filename(sheet_name)))
+
+    # Джерельні файли місяців незалежні — читаємо їх паралельно в пулі процесів
+    results = parallel_map(_read_source_file, [source for _, _, source in months],
+                           return_exceptions=True)
+
+    for (sheet_name, (year, month), source_file), result in zip(months, results):
         print(f"\n{'='*60}")
         print(f"Обробка місяця: {sheet_name}")
         print(f"{'='*60}")
         
         try:
-            # Читаємо дані з джерела
-            reader = SourceFileReader(source_file)
-            soldiers = reader.read_all_categories()
+            if isinstance(result, Exception):
+                raise result
+            soldiers = result
             
             # Записуємо в табель
             writer.fill_month_sheet(sheet_name, soldiers, year, month)
@@ -488,7 +539,7 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         # Якщо передано аргумент - заповнюємо конкретний місяць
         month_arg = sys.argv[1].lower()
-        available = get_available_months(tabel_path)
+        available = get_tabel_source(tabel_path).available_months()
 
         matched = None
         for sheet_name in available:
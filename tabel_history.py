@@ -0,0 +1,165 @@
+"""
+Історія табеля по всіх аркушах місяців.
+
+Всі аркуші місяців зводяться в одну матрицю кодів позначок
+(боєць × день) з єдиною хронологічною віссю днів. Бійці ідентифікуються
+канонічним ПІБ, тому одна людина на різних аркушах — один рядок.
+Це дозволяє відповідати на запити "всі дні 100/роп/30 бійця за період"
+чи "кількість по категоріях на кожен день кварталу" без читання аркушів
+по одному через TabelReader.read_month_data.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pib_resolver import canonical_pib
+from tabel_catalog import TabelCatalog, get_catalog
+from tabel_matrix import MARK_100, MARK_ROP, MARK_30, MARK_0
+
+# Категорія -> коди позначок ("100" включає роп, як у рапортах)
+CATEGORY_CODES: Dict[str, Tuple[int, ...]] = {
+    "100": (MARK_100, MARK_ROP),
+    "роп": (MARK_ROP,),
+    "30": (MARK_30,),
+    "0": (MARK_0,),
+}
+
+_CODE_MARKS = {
+    MARK_100: "100",
+    MARK_ROP: "роп",
+    MARK_30: "30",
+    MARK_0: "0",
+}
+
+
+class TabelHistory:
+    """Часова шкала позначок усіх бійців по всіх аркушах місяців"""
+
+    def __init__(self, catalog: TabelCatalog):
+        # Вісь днів: лише дні місяців, для яких є аркуш з даними
+        self.dates: List[datetime] = []
+        # Останні відомі ПІБ (як у табелі), звання та посада
+        self.pibs: List[str] = []
+        self.ranks: List[str] = []
+        self.positions: List[str] = []
+        # Канонічні ПІБ рядків (ключі бійців)
+        self.keys: List[str] = []
+        self._index: Dict[str, int] = {}
+
+        blocks = []
+        for key in sorted(catalog.month_sheets):
+            matrix = catalog.tabel.matrices.get(catalog.month_sheets[key])
+            if matrix is None:
+                continue
+            days = matrix.days_in_month
+            start = len(self.dates)
+            self.dates.extend(datetime(matrix.year, matrix.month, d) for d in range(1, days + 1))
+
+            people = []
+            for pib, rank, position in zip(matrix.pibs.tolist(), matrix.ranks.tolist(),
+                                           matrix.positions.tolist()):
+                norm = canonical_pib(pib)
+                idx = self._index.get(norm)
+                if idx is None:
+                    idx = self._index[norm] = len(self.pibs)
+                    self.keys.append(norm)
+                    self.pibs.append(pib)
+                    self.ranks.append(rank)
+                    self.positions.append(position)
+                else:
+                    self.pibs[idx], self.ranks[idx], self.positions[idx] = pib, rank, position
+                people.append(idx)
+            blocks.append((start, days, np.array(people, dtype=np.int64), matrix.marks[:, :days]))
+
+        self.marks = np.zeros((len(self.pibs), len(self.dates)), dtype=np.uint8)
+        for start, days, people, marks in blocks:
+            # У зворотному порядку — при дублікатах ПІБ на аркуші перемагає перший рядок
+            self.marks[people[::-1], start:start + days] = marks[::-1]
+
+    def __len__(self) -> int:
+        return len(self.pibs)
+
+    def __repr__(self):
+        if not self.dates:
+            return "TabelHistory(порожня)"
+        return (f"TabelHistory(бійців: {len(self)}, "
+                f"{self.dates[0].strftime('%d.%m.%Y')}-{self.dates[-1].strftime('%d.%m.%Y')})")
+
+    # ---------- Допоміжне ----------
+
+    def _span(self, start: Optional[datetime], end: Optional[datetime]) -> slice:
+        """Зріз осі днів для періоду [start, end] (межі включно)"""
+        lo = bisect_left(self.dates, start) if start else 0
+        hi = bisect_right(self.dates, end) if end else len(self.dates)
+        return slice(lo, hi)
+
+    def _category_mask(self, block: np.ndarray, category: str) -> np.ndarray:
+        if category not in CATEGORY_CODES:
+            raise ValueError(f"Невідома категорія: {category}")
+        return np.isin(block, CATEGORY_CODES[category])
+
+    def person_index(self, pib: str) -> Optional[int]:
+        """Індекс бійця за ПІБ або None"""
+        return self._index.get(canonical_pib(pib))
+
+    # ---------- Запити ----------
+
+    def days(self, pib: str, category: str,
+             start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[datetime]:
+        """Дні категорії бійця за період (порожньо, якщо ПІБ не знайдено)"""
+        idx = self.person_index(pib)
+        if idx is None:
+            return []
+        span = self._span(start, end)
+        hits = np.flatnonzero(self._category_mask(self.marks[idx, span], category))
+        offset = span.start
+        return [self.dates[offset + i] for i in hits.tolist()]
+
+    def person_history(self, pib: str, start: Optional[datetime] = None,
+                       end: Optional[datetime] = None) -> List[Tuple[datetime, str]]:
+        """[(дата, позначка)] всіх непорожніх днів бійця за період"""
+        idx = self.person_index(pib)
+        if idx is None:
+            return []
+        span = self._span(start, end)
+        row = self.marks[idx, span]
+        offset = span.start
+        return [(self.dates[offset + i], _CODE_MARKS.get(int(row[i]), "?"))
+                for i in np.flatnonzero(row).tolist()]
+
+    def daily_counts(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     categories: Optional[List[str]] = None) -> Tuple[List[datetime], Dict[str, List[int]]]:
+        """
+        Кількість бійців по категоріях на кожен день періоду.
+
+        Returns:
+            (дати, {категорія: [кількість на кожну дату]})
+        """
+        span = self._span(start, end)
+        block = self.marks[:, span]
+        counts = {
+            category: self._category_mask(block, category).sum(axis=0).tolist()
+            for category in (categories or CATEGORY_CODES)
+        }
+        return self.dates[span], counts
+
+    def totals(self, category: str, start: Optional[datetime] = None,
+               end: Optional[datetime] = None) -> Dict[str, int]:
+        """{ПІБ: кількість днів категорії за період} — лише бійці з ненульовою кількістю"""
+        span = self._span(start, end)
+        per_person = self._category_mask(self.marks[:, span], category).sum(axis=1)
+        return {self.pibs[i]: int(per_person[i]) for i in np.flatnonzero(per_person).tolist()}
+
+
+def history_for(catalog: TabelCatalog) -> TabelHistory:
+    """Повертає історію версії табеля (будується один раз)"""
+    if catalog.history is None:
+        catalog.history = TabelHistory(catalog)
+    return catalog.history
+
+
+def get_history(tabel_file: str) -> TabelHistory:
+    """Історія поточної версії файлу табеля"""
+    return history_for(get_catalog(tabel_file))
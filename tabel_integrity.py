@@ -0,0 +1,193 @@
+"""
+Перевірка цілісності табеля.
+
+Погані дані зазвичай помічають лише тоді, коли документ вийшов неправильним.
+scan_tabel() перевіряє всі аркуші місяців за один прохід: матриці позначок
+аркушів складаються в один масив, і кожна перевірка — векторна операція
+над ним:
+  - невідомі позначки (не 100/30/0/н-п/н/п/роп);
+  - дублікати ПІБ на одному аркуші;
+  - позначки на дні, яких немає в місяці (31-ше листопада тощо);
+  - порожні звання;
+  - дати БР, для яких немає номера в BR_4ShB.xlsx;
+  - дати, не покриті Dodatky.md (раніше першого періоду перебування).
+Для розібраного табеля (кеш) перевірка року даних займає мілісекунди,
+тому GUI запускає її у фоні після кожної зміни файлів.
+
+Запуск з командного рядка:
+    python tabel_integrity.py [шлях_до_табеля]
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from openpyxl.utils import get_column_letter
+
+from pib_resolver import canonical_pib
+from tabel_catalog import get_catalog
+from tabel_matrix import COL_FIRST_DAY, COL_RANK, MAX_DAYS, MARK_EMPTY, MARK_UNKNOWN
+
+CHECK_UNKNOWN_MARKS = "Невідомі позначки"
+CHECK_DUPLICATE_PIBS = "Дублікати ПІБ на аркуші"
+CHECK_EXTRA_DAYS = "Позначки на неіснуючі дні"
+CHECK_BLANK_RANKS = "Порожні звання"
+CHECK_BR_4SHB = "Дати БР без номера в BR_4ShB.xlsx"
+CHECK_DODATKY = "Дати без населеного пункту в Dodatky.md"
+
+CHECKS = [CHECK_UNKNOWN_MARKS, CHECK_DUPLICATE_PIBS, CHECK_EXTRA_DAYS,
+          CHECK_BLANK_RANKS, CHECK_BR_4SHB, CHECK_DODATKY]
+
+
+class IntegrityReport:
+    """Результат перевірки: {перевірка: [опис проблеми]}"""
+
+    def __init__(self, tabel_file: str):
+        self.tabel_file = tabel_file
+        self.issues: Dict[str, List[str]] = {check: [] for check in CHECKS}
+        self.elapsed = 0.0
+
+    def add(self, check: str, message: str):
+        self.issues[check].append(message)
+
+    @property
+    def total(self) -> int:
+        return sum(len(items) for items in self.issues.values())
+
+    @property
+    def ok(self) -> bool:
+        """True, якщо проблем не знайдено"""
+        return self.total == 0
+
+    def __repr__(self):
+        return f"IntegrityReport(проблем: {self.total}, {self.elapsed:.3f} с)"
+
+    def summary(self, limit: int = 20) -> str:
+        """Звіт для логу/GUI (перші limit проблем кожної перевірки)"""
+        if self.ok:
+            return f"Табель без помилок ({self.elapsed:.2f} с)"
+        lines = [f"Знайдено проблем: {self.total} ({self.elapsed:.2f} с)"]
+        for check, items in self.issues.items():
+            if not items:
+                continue
+            lines.append(f"\n{check}: {len(items)}")
+            lines.extend(f"  {item}" for item in items[:limit])
+            if len(items) > limit:
+                lines.append(f"  … ще {len(items) - limit}")
+        return "\n".join(lines)
+
+
+def _format_dates(dates: List[datetime]) -> List[str]:
+    """Дати -> рядки, послідовні дні згортаються в діапазони"""
+    ranges = []
+    for day in dates:
+        if ranges and day - ranges[-1][1] == timedelta(days=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [start.strftime("%d.%m.%Y") if start == end else
+            f"{start.strftime('%d.%m.%Y')}-{end.strftime('%d.%m.%Y')}"
+            for start, end in ranges]
+
+
+def _scan_matrices(report: IntegrityReport, matrices: List) -> List[datetime]:
+    """
+    Перевірки позначок і ростера всіх аркушів одним проходом.
+
+    Returns:
+        Дати табеля, на які є хоча б одна позначка
+    """
+    if not matrices:
+        return []
+    marks = np.concatenate([m.marks for m in matrices])
+    rows = np.concatenate([m.rows for m in matrices])
+    ranks = np.concatenate([m.ranks for m in matrices])
+    sheet_of = np.repeat(np.arange(len(matrices)), [len(m) for m in matrices])
+    days_in_month = np.array([m.days_in_month for m in matrices])[sheet_of]
+    names = [m.sheet_name for m in matrices]
+
+    def cell(i: int, day: int) -> str:
+        return f"{names[sheet_of[i]]}!{get_column_letter(COL_FIRST_DAY + day)}{rows[i]}"
+
+    for i, day in np.argwhere(marks == MARK_UNKNOWN).tolist():
+        report.add(CHECK_UNKNOWN_MARKS, cell(i, day))
+
+    extra = (marks != MARK_EMPTY) & (np.arange(MAX_DAYS) >= days_in_month[:, None])
+    for i, day in np.argwhere(extra).tolist():
+        report.add(CHECK_EXTRA_DAYS, f"{cell(i, day)} (у місяці {days_in_month[i]} днів)")
+
+    for i in np.flatnonzero(ranks == "").tolist():
+        report.add(CHECK_BLANK_RANKS,
+                   f"{names[sheet_of[i]]}!{get_column_letter(COL_RANK)}{rows[i]}")
+
+    # Дублікати: однаковий канонічний ПІБ на тому самому аркуші
+    pibs = [pib for m in matrices for pib in m.pibs.tolist()]
+    keys = np.array([f"{sheet_of[i]}\x00{canonical_pib(pib)}" for i, pib in enumerate(pibs)])
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    seen = set()
+    for i in np.flatnonzero(counts[inverse] > 1).tolist():
+        group = inverse[i]
+        if group in seen:
+            continue
+        seen.add(group)
+        duplicate_rows = rows[inverse == group].tolist()
+        report.add(CHECK_DUPLICATE_PIBS,
+                   f"{names[sheet_of[i]]}: {pibs[i]} (рядки {', '.join(map(str, duplicate_rows))})")
+
+    dates = []
+    for matrix in matrices:
+        used = matrix.marks[:, :matrix.days_in_month].any(axis=0)
+        dates.extend(datetime(matrix.year, matrix.month, day + 1)
+                     for day in np.flatnonzero(used).tolist())
+    return dates
+
+
+def scan_tabel(tabel_file: str, br_4shb_file: Optional[str] = None,
+               dodatky_path: Optional[str] = None) -> IntegrityReport:
+    """
+    Перевіряє табель (і, якщо вказано, покриття BR_4ShB.xlsx та Dodatky.md).
+
+    Дата БР — день перед датою табеля (див. br_updater.get_tabel_date).
+    """
+    start = time.perf_counter()
+    report = IntegrityReport(tabel_file)
+    catalog = get_catalog(tabel_file)
+    matrices = [catalog.tabel.matrices[name] for name in catalog.available_months
+                if catalog.tabel.matrices.get(name) is not None]
+    tabel_dates = _scan_matrices(report, matrices)
+    br_dates = [day - timedelta(days=1) for day in tabel_dates]
+
+    if br_4shb_file and br_dates:
+        if os.path.exists(br_4shb_file):
+            from core.br_roles import _load_br_4shb_index
+            index = _load_br_4shb_index(br_4shb_file)
+            missing = [day for day in br_dates if day.date() not in index]
+            for item in _format_dates(missing):
+                report.add(CHECK_BR_4SHB, item)
+        else:
+            report.add(CHECK_BR_4SHB, f"Файл не знайдено: {br_4shb_file}")
+
+    if dodatky_path and br_dates:
+        from core.dodatky_parser import parse_dodatky
+        entries = parse_dodatky(dodatky_path) if os.path.exists(dodatky_path) else []
+        if entries:
+            first = entries[0]["date"]
+            for item in _format_dates([day for day in br_dates if day < first]):
+                report.add(CHECK_DODATKY, item)
+        else:
+            report.add(CHECK_DODATKY, f"Немає періодів перебування: {dodatky_path}")
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+    from path_utils import get_app_dir
+
+    app_dir = get_app_dir()
+    tabel_path = sys.argv[1] if len(sys.argv) > 1 else \
+        os.path.join(app_dir, "Табель_Багатомісячний.xlsx")
+    print(scan_tabel(tabel_path, os.path.join(app_dir, "BR_4ShB.xlsx"),
+                     os.path.join(app_dir, "Dodatky.md")).summary(limit=100))
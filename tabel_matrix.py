@@ -0,0 +1,252 @@
+"""
+Матричне представлення місячного аркуша табеля.
+
+Аркуш розбирається один раз: ростер (ПІБ, звання, посада, примітка)
+зберігається у масивах, а позначки за дні — у матриці кодів uint8
+(бійці × 31 день). Запити "хто на 100/роп/30/н-п на дату" стають
+операціями над стовпцем матриці замість обходу комірок.
+"""
+import calendar
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+# Розкладка стовпців аркуша місяця (1-based, як в openpyxl)
+COL_POSITION = 4   # D — посада
+COL_RANK = 5       # E — звання
+COL_PIB = 6        # F — ПІБ
+COL_FIRST_DAY = 7  # G — 1-й день місяця
+COL_NOTE = 38      # AL — примітка
+MAX_DAYS = 31
+HEADER_SEARCH_ROWS = 19
+
+# Коди позначок у матриці
+MARK_EMPTY = 0
+MARK_100 = 1
+MARK_ROP = 2
+MARK_30 = 3
+MARK_0 = 4        # "0", "н-п", "н/п"
+MARK_UNKNOWN = 5  # будь-яка інша непорожня позначка
+
+MARK_CODES = {
+    "100": MARK_100,
+    "роп": MARK_ROP,
+    "30": MARK_30,
+    "0": MARK_0,
+    "н-п": MARK_0,
+    "н/п": MARK_0,
+}
+
+# Запис бійця: (рядок, ПІБ, звання, посада, примітка, коди позначок за 31 день)
+SheetRecord = Tuple[int, str, str, str, str, List[int]]
+
+
+def normalize_mark(value) -> str:
+    """
+    Нормалізує значення комірки позначки до рядка.
+    openpyxl може повертати float (100.0 замість 100).
+    """
+    if not value:
+        return ""
+    mark = str(value).strip()
+    try:
+        num_val = float(mark)
+        if num_val == int(num_val):
+            mark = str(int(num_val))
+    except (ValueError, TypeError, OverflowError):
+        pass
+    return mark.lower()
+
+
+@lru_cache(maxsize=1024)
+def _mark_code_cached(value) -> int:
+    mark = normalize_mark(value)
+    if not mark:
+        return MARK_EMPTY
+    return MARK_CODES.get(mark, MARK_UNKNOWN)
+
+
+def mark_code(value) -> int:
+    """Повертає код позначки для значення комірки (з кешем для повторюваних значень)."""
+    if not value:
+        return MARK_EMPTY
+    try:
+        return _mark_code_cached(value)
+    except TypeError:
+        # Нехешоване значення — рахуємо без кешу
+        mark = normalize_mark(value)
+        return MARK_CODES.get(mark, MARK_UNKNOWN) if mark else MARK_EMPTY
+
+
+def split_sheet_rows(rows: Iterable[Sequence]) -> Tuple[int, Iterator[SheetRecord]]:
+    """
+    Знаходить рядок заголовків і повертає лінивий ітератор записів бійців.
+
+    Args:
+        rows: Ітератор кортежів значень комірок (з 1-го рядка аркуша)
+
+    Returns:
+        (header_row, ітератор (row, pib, rank, position, note, codes[31]))
+
+    Raises:
+        ValueError: якщо рядок з "ПІБ" не знайдено
+    """
+    row_iter = enumerate(rows, start=1)
+
+    header_row = None
+    for row_number, values in row_iter:
+        if row_number > HEADER_SEARCH_ROWS:
+            break
+        if len(values) >= COL_PIB:
+            value = values[COL_PIB - 1]
+            if value and "ПІБ" in str(value):
+                header_row = row_number
+                break
+
+    if not header_row:
+        raise ValueError("Не знайдено рядок з заголовками")
+
+    return header_row, _iter_records(row_iter)
+
+
+def _iter_records(row_iter: Iterator[Tuple[int, Sequence]]) -> Iterator[SheetRecord]:
+    """Генерує записи бійців з рядків даних (рядки без ПІБ пропускаються)."""
+    for row_number, values in row_iter:
+        if len(values) < COL_PIB:
+            continue
+        pib = values[COL_PIB - 1]
+        if not pib:
+            continue
+        pib_str = str(pib).strip()
+        if not pib_str:
+            continue
+
+        rank = values[COL_RANK - 1]
+        position = values[COL_POSITION - 1]
+        note = values[COL_NOTE - 1] if len(values) >= COL_NOTE else None
+        day_values = values[COL_FIRST_DAY - 1:COL_FIRST_DAY - 1 + MAX_DAYS]
+
+        codes = [mark_code(v) for v in day_values]
+        if len(codes) < MAX_DAYS:
+            codes.extend([MARK_EMPTY] * (MAX_DAYS - len(codes)))
+
+        yield (
+            row_number,
+            pib_str,
+            str(rank).strip() if rank else "",
+            str(position).strip() if position else "",
+            str(note) if note else "",
+            codes,
+        )
+
+
+class TabelMatrix:
+    """Розібраний аркуш місяця: ростер + матриця кодів позначок"""
+
+    def __init__(self, sheet_name: str, year: int, month: int, header_row: int,
+                 rows: np.ndarray, pibs: np.ndarray, ranks: np.ndarray,
+                 positions: np.ndarray, notes: np.ndarray, marks: np.ndarray):
+        self.sheet_name = sheet_name
+        self.year = year
+        self.month = month
+        self.days_in_month = calendar.monthrange(year, month)[1]
+        self.header_row = header_row
+        self.rows = rows            # int32 — номери рядків Excel
+        self.pibs = pibs            # object — ПІБ
+        self.ranks = ranks          # object — звання
+        self.positions = positions  # object — посади
+        self.notes = notes          # object — примітки
+        self.marks = marks          # uint8 (бійці × 31)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __repr__(self):
+        return f"TabelMatrix({self.sheet_name}, бійців: {len(self)})"
+
+    @property
+    def last_row(self) -> int:
+        """
+        Останній рядок з ПІБ у стовпці F (межа даних аркуша).
+        Рядки нижче можуть мати форматування, але не дані.
+        """
+        return int(self.rows.max()) if len(self.rows) else self.header_row
+
+    @classmethod
+    def from_rows(cls, sheet_name: str, year: int, month: int,
+                  rows: Iterable[Sequence]) -> "TabelMatrix":
+        """
+        Будує матрицю з послідовності рядків значень (починаючи з 1-го рядка аркуша).
+
+        Args:
+            rows: Ітератор кортежів значень комірок (стовпець A = індекс 0)
+        """
+        header_row, records = split_sheet_rows(rows)
+
+        row_numbers: List[int] = []
+        pibs: List[str] = []
+        ranks: List[str] = []
+        positions: List[str] = []
+        notes: List[str] = []
+        mark_rows: List[List[int]] = []
+
+        for row_number, pib, rank, position, note, codes in records:
+            row_numbers.append(row_number)
+            pibs.append(pib)
+            ranks.append(rank)
+            positions.append(position)
+            notes.append(note)
+            mark_rows.append(codes)
+
+        marks = np.array(mark_rows, dtype=np.uint8).reshape(len(mark_rows), MAX_DAYS)
+        return cls(
+            sheet_name, year, month, header_row,
+            np.array(row_numbers, dtype=np.int32),
+            to_object_array(pibs), to_object_array(ranks),
+            to_object_array(positions), to_object_array(notes),
+            marks,
+        )
+
+    @classmethod
+    def from_worksheet(cls, ws, sheet_name: str, year: int, month: int) -> "TabelMatrix":
+        """Будує матрицю з аркуша openpyxl (один прохід iter_rows)."""
+        rows = ws.iter_rows(min_row=1, max_col=COL_NOTE, values_only=True)
+        return cls.from_rows(sheet_name, year, month, rows)
+
+    # ---------- Запити ----------
+
+    def day_column(self, day: int) -> np.ndarray:
+        """Повертає вектор кодів позначок за день місяця (1-based)."""
+        return self.marks[:, day - 1]
+
+    def day_masks(self, code: int) -> np.ndarray:
+        """
+        Бітові маски днів з позначкою code для кожного бійця
+        (int64, біт d-1 = день d; лише дні, що існують у місяці).
+        """
+        days = self.days_in_month
+        weights = np.left_shift(np.int64(1), np.arange(days, dtype=np.int64))
+        return (self.marks[:, :days] == code) @ weights
+
+    def people(self, mask: np.ndarray) -> List[Tuple[str, str]]:
+        """[(pib, rank)] для бійців за булевою маскою."""
+        return list(zip(self.pibs[mask].tolist(), self.ranks[mask].tolist()))
+
+    def people_with_positions(self, mask: np.ndarray) -> List[Tuple[str, str, str]]:
+        """[(pib, rank, position)] — позиція з маленької літери."""
+        return [(pib, rank, lower_first(position))
+                for pib, rank, position in zip(self.pibs[mask].tolist(), self.ranks[mask].tolist(),
+                                               self.positions[mask].tolist())]
+
+
+def lower_first(text: str) -> str:
+    """Рядок з маленької першої літери (для посад у тексті БР)."""
+    return text[0].lower() + text[1:] if text else text
+
+
+def to_object_array(values: List[str]) -> np.ndarray:
+    """Масив рядків dtype=object (без обрізання довжини, як у 'U')."""
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr
@@ -0,0 +1,639 @@
+"""
+Джерела даних табеля з однаковим інтерфейсом.
+
+TabelSource дає три операції: перелік аркушів місяців, ростер з позначками
+за місяць (TabelMatrix) і позначки на дату. Реалізації:
+  - XlsxTabelSource — сам табель .xlsx (через tabel_cache);
+  - CsvTabelSource — експорт табеля в CSV (один файл, усі місяці);
+  - SqliteTabelSource — сховище позначок у SQLite (таблиця marks в app.db).
+
+get_tabel_source() обирає найшвидше доступне джерело: актуальний кеш
+розібраного xlsx, інакше сховище або CSV-експорт, зроблені з поточної
+версії файлу, інакше розбір самого xlsx. CSV створює export_csv();
+сховище оновлюють записувачі табеля після збереження файлу
+(sync_mark_store_in_background, ingest_tabel — лише змінені аркуші);
+читання xlsx сховище не змінює. Обидва містять версію (mtime, розмір)
+xlsx, з якої зроблені.
+
+Сховище індексоване за датою та ПІБ, тому запити "хто на 100/роп на дату",
+"перший день/продовження роп" та фільтр місяця за категорією виконуються
+SQL-запитом за мілісекунди навіть з історією за рік.
+"""
+import csv
+import hashlib
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.database import DB_PATH
+from memory_cache import file_cache
+from month_utils import parse_month_sheet_name
+from pib_resolver import canonical_pib
+from rop_index import rop_index_for
+from snapshot import file_version, get_snapshot
+from tabel_cache import TabelData, load_tabel, peek_tabel
+from tabel_catalog import catalog_for
+from tabel_matrix import (
+    TabelMatrix, MAX_DAYS, MARK_EMPTY, MARK_100, MARK_ROP, MARK_30, MARK_0, MARK_UNKNOWN,
+    lower_first, mark_code, to_object_array,
+)
+from xlsx_reader import XlsxReader
+
+CSV_DELIMITER = ";"
+CSV_META_PREFIX = "#"
+CSV_COLUMNS = ["sheet", "header_row", "row", "position", "rank", "pib", "note"] + \
+    [str(day) for day in range(1, MAX_DAYS + 1)]
+
+# Код позначки -> текст у CSV (невідомі позначки зберігаються як "?")
+_CODE_TEXT = {
+    MARK_EMPTY: "",
+    MARK_100: "100",
+    MARK_ROP: "роп",
+    MARK_30: "30",
+    MARK_0: "0",
+    MARK_UNKNOWN: "?",
+}
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tabel_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS tabel_sheets (
+    sheet TEXT PRIMARY KEY,
+    ord INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    header_row INTEGER NOT NULL,
+    digest TEXT NOT NULL DEFAULT ''
+);
+
+CREATE TABLE IF NOT EXISTS tabel_roster (
+    sheet TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    pib TEXT NOT NULL,
+    rank TEXT NOT NULL DEFAULT '',
+    position TEXT NOT NULL DEFAULT '',
+    note TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (sheet, idx)
+);
+
+-- Непорожні позначки: pib — канонічний ключ ПІБ, date — 'YYYY-MM-DD', mark — код
+CREATE TABLE IF NOT EXISTS marks (
+    sheet TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    pib TEXT NOT NULL,
+    date TEXT NOT NULL,
+    mark INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_marks_date ON marks (date, mark);
+CREATE INDEX IF NOT EXISTS idx_marks_pib ON marks (pib, date);
+CREATE INDEX IF NOT EXISTS idx_marks_sheet ON marks (sheet, idx);
+"""
+
+
+# З'єднання зі сховищем: по одному на потік і файл бази (by_path: {реальний_шлях: з'єднання})
+_connections = threading.local()
+
+
+class TabelSource(ABC):
+    """Базовий клас джерела табеля"""
+
+    kind = ""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.path})"
+
+    @abstractmethod
+    def load(self) -> TabelData:
+        """Всі аркуші місяців джерела (TabelData)"""
+
+    def peek(self) -> Optional[TabelData]:
+        """TabelData, якщо її можна отримати без повного розбору, інакше None"""
+        return self.load()
+
+    def source_version(self) -> Optional[Tuple[int, int]]:
+        """Версія (mtime_ns, розмір) xlsx, з якої зроблено експорт (None — невідомо)"""
+        return None
+
+    def available_months(self) -> List[str]:
+        """Назви аркушів місяців у хронологічному порядку"""
+        return list(catalog_for(self.load()).available_months)
+
+    def month_matrix(self, sheet_name: str) -> TabelMatrix:
+        """
+        Ростер і позначки аркуша місяця.
+
+        Raises:
+            ValueError: якщо аркуш не знайдено або немає рядка заголовків
+        """
+        return self.load().get_matrix(sheet_name)
+
+    def matrix_for_date(self, date: datetime) -> TabelMatrix:
+        """
+        Матриця аркуша місяця для дати.
+
+        Raises:
+            ValueError: якщо аркуш не знайдено
+        """
+        return catalog_for(self.load()).matrix_for_date(date)
+
+    def marks_on(self, date: datetime) -> Tuple[TabelMatrix, np.ndarray]:
+        """(матриця місяця, вектор кодів позначок бійців на дату)"""
+        matrix = self.matrix_for_date(date)
+        return matrix, matrix.day_column(date.day)
+
+    def people_by_mark(self, date: datetime) -> Dict[int, List[Tuple[str, str]]]:
+        """
+        {код позначки: [(pib, rank)]} на дату, у порядку рядків табеля.
+
+        Raises:
+            ValueError: якщо аркуш не знайдено
+        """
+        matrix, column = self.marks_on(date)
+        return {int(code): matrix.people(column == code)
+                for code in np.unique(column).tolist() if code != MARK_EMPTY}
+
+    def rop_first_day(self, date: datetime) -> List[Tuple[str, str, str]]:
+        """[(pib, rank, position)] — бійці, у яких на дату починається серія 'роп'"""
+        return rop_index_for(catalog_for(self.load())).first_day(date)
+
+    def rop_continuing(self, date: datetime) -> List[Tuple[str, str, str]]:
+        """[(pib, rank, position)] — бійці, у яких на дату триває серія 'роп' (2-й+ день)"""
+        return rop_index_for(catalog_for(self.load())).continuing(date)
+
+    def data_extent(self, sheet_name: str) -> int:
+        """
+        Останній рядок з ПІБ на аркуші (див. TabelMatrix.last_row).
+
+        Raises:
+            ValueError: якщо аркуш не знайдено або немає рядка заголовків
+        """
+        return self.month_matrix(sheet_name).last_row
+
+    def month_pibs(self, sheet_name: str, codes: Sequence[int]) -> List[str]:
+        """ПІБ бійців, що мають за місяць хоча б одну позначку з codes"""
+        matrix = self.month_matrix(sheet_name)
+        mask = np.isin(matrix.marks[:, :matrix.days_in_month], codes).any(axis=1)
+        return matrix.pibs[mask].tolist()
+
+
+class XlsxTabelSource(TabelSource):
+    """Табель .xlsx (розбір через кеш tabel_cache)"""
+
+    kind = "xlsx"
+
+    def load(self) -> TabelData:
+        return load_tabel(self.path)
+
+    def peek(self) -> Optional[TabelData]:
+        return peek_tabel(self.path)
+
+    def available_months(self) -> List[str]:
+        tabel = peek_tabel(self.path)
+        if tabel:
+            return list(catalog_for(tabel).available_months)
+        # Кеш неактуальний — лише назви аркушів, без розбору
+        with XlsxReader(get_snapshot(self.path).open()) as reader:
+            sheetnames = list(reader.sheetnames)
+        return _sort_months(sheetnames)
+
+
+class CsvTabelSource(TabelSource):
+    """
+    CSV-експорт табеля: рядок на бійця, стовпці CSV_COLUMNS.
+    Перший рядок — коментар з версією xlsx, з якої зроблено експорт.
+    """
+
+    kind = "csv"
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def fresh_for(self, tabel_file: str) -> bool:
+        """Чи зроблено експорт з поточної версії файлу табеля"""
+        return self.source_version() == file_version(tabel_file)
+
+    def source_version(self) -> Optional[Tuple[int, int]]:
+        try:
+            with open(self.path, "r", encoding="utf-8-sig", newline="") as f:
+                first = f.readline()
+        except OSError:
+            return None
+        return _parse_version(_read_csv_meta(first).get("source_version", ""))
+
+    def load(self) -> TabelData:
+        real_path = os.path.realpath(self.path)
+        version = file_version(real_path)
+        cached = file_cache.get(("csv", real_path), lambda d: d.version == version)
+        if cached:
+            return cached
+
+        rows: Dict[str, List[List[str]]] = {}
+        header_rows: Dict[str, int] = {}
+        meta: Dict[str, str] = {}
+        with open(real_path, "r", encoding="utf-8-sig", newline="") as f:
+            first = f.readline()
+            if first.startswith(CSV_META_PREFIX):
+                meta = _read_csv_meta(first)
+            else:
+                f.seek(0)
+            reader = csv.reader(f, delimiter=CSV_DELIMITER)
+            header = next(reader, None)
+            if header != CSV_COLUMNS:
+                raise ValueError(f"Невідомий формат CSV табеля: {real_path}")
+            for values in reader:
+                if not values:
+                    continue
+                sheet = values[0]
+                header_rows.setdefault(sheet, int(values[1]))
+                rows.setdefault(sheet, []).append(values)
+
+        matrices: Dict[str, Optional[TabelMatrix]] = {}
+        for sheet, sheet_rows in rows.items():
+            parsed = parse_month_sheet_name(sheet)
+            if not parsed:
+                continue
+            marks = np.array([[mark_code(v) for v in values[7:7 + MAX_DAYS]]
+                              for values in sheet_rows], dtype=np.uint8).reshape(-1, MAX_DAYS)
+            matrices[sheet] = TabelMatrix(
+                sheet, parsed[0], parsed[1], header_rows[sheet],
+                np.array([int(values[2]) for values in sheet_rows], dtype=np.int32),
+                to_object_array([values[5] for values in sheet_rows]),
+                to_object_array([values[4] for values in sheet_rows]),
+                to_object_array([values[3] for values in sheet_rows]),
+                to_object_array([values[6] for values in sheet_rows]),
+                marks,
+            )
+
+        data = TabelData(real_path, list(matrices), matrices, version[0], version[1],
+                         meta.get("content_hash", ""))
+        file_cache.put(("csv", real_path), data, data.estimate_size())
+        return data
+
+
+class SqliteTabelSource(TabelSource):
+    """
+    Сховище позначок у SQLite (схема SQLITE_SCHEMA, за замовчуванням — app.db).
+    Запити за датою та ПІБ виконуються індексованим SQL, без завантаження аркушів.
+    """
+
+    kind = "sqlite"
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        З'єднання поточного потоку з базою (відкривається один раз на потік,
+        не закривати). Схему створює ingest_tabel(): поки сховище порожнє,
+        запити піднімають sqlite3.OperationalError.
+        """
+        real_path = os.path.realpath(self.path)
+        conns = getattr(_connections, "by_path", None)
+        if conns is None:
+            conns = _connections.by_path = {}
+        conn = conns.get(real_path)
+        if conn is None:
+            conn = sqlite3.connect(real_path)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conns[real_path] = conn
+        return conn
+
+    def _meta(self, conn: sqlite3.Connection) -> Dict[str, str]:
+        return dict(conn.execute("SELECT key, value FROM tabel_meta").fetchall())
+
+    def _read_meta(self) -> Dict[str, str]:
+        if not self.exists():
+            return {}
+        try:
+            return self._meta(self.connect())
+        except sqlite3.Error:
+            return {}
+
+    def source_version(self) -> Optional[Tuple[int, int]]:
+        return _parse_version(self._read_meta().get("source_version", ""))
+
+    def fresh_for(self, tabel_file: str) -> bool:
+        meta = self._read_meta()
+        return (meta.get("source_path") == os.path.realpath(tabel_file)
+                and _parse_version(meta.get("source_version", "")) == file_version(tabel_file))
+
+    def load(self) -> TabelData:
+        real_path = os.path.realpath(self.path)
+        conn = self.connect()
+        meta = self._meta(conn)
+        # Номер ревізії зростає при кожному записі в сховище
+        revision = int(meta.get("revision", "0"))
+        cached = file_cache.get(("sqlite", real_path), lambda d: d.mtime_ns == revision)
+        if cached:
+            return cached
+
+        matrices: Dict[str, Optional[TabelMatrix]] = {}
+        for sheet, year, month, header_row in conn.execute(
+                "SELECT sheet, year, month, header_row FROM tabel_sheets ORDER BY ord").fetchall():
+            matrices[sheet] = self._read_sheet(conn, sheet, year, month, header_row)
+
+        data = TabelData(real_path, list(matrices), matrices, revision, 0,
+                         meta.get("content_hash", ""))
+        file_cache.put(("sqlite", real_path), data, data.estimate_size())
+        return data
+
+    def _read_sheet(self, conn: sqlite3.Connection, sheet: str, year: int, month: int,
+                    header_row: int) -> TabelMatrix:
+        roster = conn.execute(
+            "SELECT row, pib, rank, position, note FROM tabel_roster "
+            "WHERE sheet = ? ORDER BY idx", (sheet,)
+        ).fetchall()
+        marks = np.zeros((len(roster), MAX_DAYS), dtype=np.uint8)
+        cells = conn.execute(
+            "SELECT idx, CAST(substr(date, 9, 2) AS INTEGER), mark FROM marks WHERE sheet = ?",
+            (sheet,)
+        ).fetchall()
+        if cells:
+            cells = np.array(cells, dtype=np.int64)
+            marks[cells[:, 0], cells[:, 1] - 1] = cells[:, 2]
+        return TabelMatrix(
+            sheet, year, month, header_row,
+            np.array([r[0] for r in roster], dtype=np.int32),
+            to_object_array([r[1] for r in roster]),
+            to_object_array([r[2] for r in roster]),
+            to_object_array([r[3] for r in roster]),
+            to_object_array([r[4] for r in roster]),
+            marks,
+        )
+
+    # ---------- SQL-запити ----------
+
+    def _query(self, sql: str, params: Sequence) -> List[tuple]:
+        return self.connect().execute(sql, params).fetchall()
+
+    def _sheet_exists(self, date: datetime) -> bool:
+        return bool(self._query("SELECT 1 FROM tabel_sheets WHERE year = ? AND month = ?",
+                                (date.year, date.month)))
+
+    def people_by_mark(self, date: datetime) -> Dict[int, List[Tuple[str, str]]]:
+        if not self._sheet_exists(date):
+            raise ValueError(f"Аркуш для {date.strftime('%m.%Y')} не знайдено")
+        result: Dict[int, List[Tuple[str, str]]] = {}
+        for mark, pib, rank in self._query(
+                "SELECT m.mark, r.pib, r.rank FROM marks m "
+                "JOIN tabel_roster r ON r.sheet = m.sheet AND r.idx = m.idx "
+                "WHERE m.date = ? ORDER BY m.idx", (_iso(date),)):
+            result.setdefault(mark, []).append((pib, rank))
+        return result
+
+    def _rop_on(self, date: datetime, continuing: bool) -> List[Tuple[str, str, str]]:
+        # Серія 'роп' продовжується, якщо напередодні в бійця теж 'роп'
+        # (через межу місяця — лише якщо є аркуш попереднього місяця)
+        rows = self._query(
+            "SELECT r.pib, r.rank, r.position FROM marks m "
+            "JOIN tabel_roster r ON r.sheet = m.sheet AND r.idx = m.idx "
+            "WHERE m.date = ? AND m.mark = ? AND "
+            f"{'' if continuing else 'NOT '}EXISTS (SELECT 1 FROM marks p "
+            "WHERE p.pib = m.pib AND p.date = ? AND p.mark = ?) ORDER BY m.idx",
+            (_iso(date), MARK_ROP, _iso(date - timedelta(days=1)), MARK_ROP)
+        )
+        return [(pib, rank, lower_first(position)) for pib, rank, position in rows]
+
+    def rop_first_day(self, date: datetime) -> List[Tuple[str, str, str]]:
+        return self._rop_on(date, continuing=False)
+
+    def rop_continuing(self, date: datetime) -> List[Tuple[str, str, str]]:
+        return self._rop_on(date, continuing=True)
+
+    def data_extent(self, sheet_name: str) -> int:
+        rows = self._query(
+            "SELECT COALESCE(MAX(r.row), s.header_row) FROM tabel_sheets s "
+            "LEFT JOIN tabel_roster r ON r.sheet = s.sheet WHERE s.sheet = ?", (sheet_name,))
+        if not rows or rows[0][0] is None:
+            raise ValueError(f"Лист '{sheet_name}' не знайдено")
+        return rows[0][0]
+
+    def month_pibs(self, sheet_name: str, codes: Sequence[int]) -> List[str]:
+        placeholders = ", ".join("?" * len(codes))
+        return [row[0] for row in self._query(
+            "SELECT r.pib FROM tabel_roster r WHERE r.sheet = ? AND EXISTS ("
+            "SELECT 1 FROM marks m WHERE m.sheet = r.sheet AND m.idx = r.idx "
+            f"AND m.mark IN ({placeholders})) ORDER BY r.idx", (sheet_name, *codes))]
+
+
+def _sort_months(sheetnames: List[str]) -> List[str]:
+    """Назви аркушів місяців, відсортовані хронологічно"""
+    months = []
+    for name in sheetnames:
+        parsed = parse_month_sheet_name(name)
+        if parsed:
+            months.append((parsed[0], parsed[1], name))
+    months.sort(key=lambda x: (x[0], x[1]))
+    return [name for _, _, name in months]
+
+
+def _format_version(version: Tuple[int, int]) -> str:
+    return f"{version[0]}:{version[1]}"
+
+
+def _parse_version(value: str) -> Optional[Tuple[int, int]]:
+    try:
+        mtime_ns, size = value.split(":")
+        return int(mtime_ns), int(size)
+    except ValueError:
+        return None
+
+
+def _read_csv_meta(line: str) -> Dict[str, str]:
+    """Розбирає рядок-коментар '# key=value; key=value'"""
+    if not line.startswith(CSV_META_PREFIX):
+        return {}
+    meta = {}
+    for part in line[len(CSV_META_PREFIX):].split(";"):
+        key, _, value = part.strip().partition("=")
+        if key:
+            meta[key] = value
+    return meta
+
+
+def csv_path_for(tabel_file: str) -> str:
+    """Шлях CSV-експорту за замовчуванням (поруч з табелем)"""
+    return os.path.splitext(tabel_file)[0] + ".csv"
+
+
+def _iso(date: datetime) -> str:
+    return date.strftime("%Y-%m-%d")
+
+
+def export_csv(tabel_file: str, csv_path: Optional[str] = None) -> str:
+    """
+    Експортує аркуші місяців табеля в CSV.
+
+    Returns:
+        Шлях створеного файлу
+    """
+    csv_path = csv_path or csv_path_for(tabel_file)
+    tabel = load_tabel(tabel_file)
+    tmp_path = f"{csv_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(f"{CSV_META_PREFIX} source_version={_format_version(tabel.version)}; "
+                f"content_hash={tabel.content_hash}\n")
+        writer = csv.writer(f, delimiter=CSV_DELIMITER)
+        writer.writerow(CSV_COLUMNS)
+        for sheet in catalog_for(tabel).available_months:
+            matrix = tabel.matrices.get(sheet)
+            if matrix is None:
+                continue
+            for i in range(len(matrix)):
+                writer.writerow(
+                    [sheet, matrix.header_row, int(matrix.rows[i]), matrix.positions[i],
+                     matrix.ranks[i], matrix.pibs[i], matrix.notes[i]]
+                    + [_CODE_TEXT[code] for code in matrix.marks[i].tolist()]
+                )
+    os.replace(tmp_path, csv_path)
+    print(f"Табель експортовано в CSV: {csv_path}")
+    return csv_path
+
+
+def _matrix_digest(matrix: TabelMatrix) -> str:
+    """Відбиток вмісту аркуша (ростер + позначки) для інкрементального запису"""
+    h = hashlib.sha1()
+    h.update(f"{matrix.header_row}\x1e".encode("utf-8"))
+    h.update(matrix.rows.tobytes())
+    h.update(np.ascontiguousarray(matrix.marks).tobytes())
+    for values in (matrix.pibs, matrix.ranks, matrix.positions, matrix.notes):
+        h.update("\x1f".join(values.tolist()).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _ingest_sheet(conn: sqlite3.Connection, ord_: int, matrix: TabelMatrix, digest: str):
+    """Перезаписує один аркуш у сховищі (викликати в транзакції)"""
+    sheet = matrix.sheet_name
+    for table in ("tabel_sheets", "tabel_roster", "marks"):
+        conn.execute(f"DELETE FROM {table} WHERE sheet = ?", (sheet,))
+    conn.execute(
+        "INSERT INTO tabel_sheets (sheet, ord, year, month, header_row, digest) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (sheet, ord_, matrix.year, matrix.month, matrix.header_row, digest)
+    )
+    conn.executemany(
+        "INSERT INTO tabel_roster (sheet, idx, row, pib, rank, position, note) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(sheet, i, int(matrix.rows[i]), matrix.pibs[i], matrix.ranks[i],
+          matrix.positions[i], matrix.notes[i]) for i in range(len(matrix))]
+    )
+    # Лише дні, що існують у місяці
+    marks = matrix.marks[:, :matrix.days_in_month]
+    idx, day = np.nonzero(marks)
+    keys = [canonical_pib(pib) for pib in matrix.pibs.tolist()]
+    dates = [_iso(datetime(matrix.year, matrix.month, d)) for d in range(1, matrix.days_in_month + 1)]
+    conn.executemany(
+        "INSERT INTO marks (sheet, idx, pib, date, mark) VALUES (?, ?, ?, ?, ?)",
+        [(sheet, i, keys[i], dates[d], code) for i, d, code in
+         zip(idx.tolist(), day.tolist(), marks[idx, day].tolist())]
+    )
+
+
+def ingest_tabel(tabel: TabelData, db_path: Optional[str] = None) -> int:
+    """
+    Записує аркуші місяців TabelData у сховище позначок. Перезаписуються
+    лише аркуші, вміст яких змінився, кожен — однією транзакцією.
+
+    Returns:
+        Кількість перезаписаних аркушів
+    """
+    store = SqliteTabelSource(db_path or DB_PATH)
+    months = [sheet for sheet in catalog_for(tabel).available_months
+              if tabel.matrices.get(sheet) is not None]
+    conn = store.connect()
+    # Схема створюється лише тут: читачі сховища її не перевіряють
+    conn.executescript(SQLITE_SCHEMA)
+    meta = store._meta(conn)
+    same_source = meta.get("source_path") == tabel.path
+    stored = dict(conn.execute("SELECT sheet, digest FROM tabel_sheets").fetchall()) \
+        if same_source else {}
+
+    changed = 0
+    for ord_, sheet in enumerate(months):
+        matrix = tabel.matrices[sheet]
+        digest = _matrix_digest(matrix)
+        if stored.get(sheet) == digest:
+            continue
+        with conn:
+            _ingest_sheet(conn, ord_, matrix, digest)
+        changed += 1
+
+    with conn:
+        current = set(months)
+        stale = [row[0] for row in conn.execute("SELECT sheet FROM tabel_sheets").fetchall()
+                 if row[0] not in current]
+        for sheet in stale:
+            for table in ("tabel_sheets", "tabel_roster", "marks"):
+                conn.execute(f"DELETE FROM {table} WHERE sheet = ?", (sheet,))
+            changed += 1
+        conn.executemany("UPDATE tabel_sheets SET ord = ? WHERE sheet = ?",
+                         [(ord_, sheet) for ord_, sheet in enumerate(months)])
+        revision = int(meta.get("revision", "0")) + (1 if changed else 0)
+        conn.executemany(
+            "INSERT OR REPLACE INTO tabel_meta (key, value) VALUES (?, ?)",
+            [("source_path", tabel.path),
+             ("source_version", _format_version(tabel.version)),
+             ("content_hash", tabel.content_hash),
+             ("revision", str(revision))]
+        )
+    if changed:
+        print(f"Сховище позначок: оновлено аркушів {changed} ({store.path})")
+    return changed
+
+
+def sync_mark_store(tabel_file: str, db_path: Optional[str] = None) -> int:
+    """Оновлює сховище позначок з поточної версії табеля (див. ingest_tabel)"""
+    return ingest_tabel(load_tabel(tabel_file), db_path)
+
+
+def sync_mark_store_in_background(tabel_file: str,
+                                  db_path: Optional[str] = None) -> threading.Thread:
+    """
+    sync_mark_store() у фоновому потоці — для записувачів табеля після
+    збереження файлу (помилки запису сховища лише виводяться).
+    """
+    def work():
+        try:
+            sync_mark_store(tabel_file, db_path)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            print(f"Попередження: не вдалося оновити сховище позначок: {e}")
+
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+    return thread
+
+
+def get_tabel_source(tabel_file: str) -> TabelSource:
+    """
+    Найшвидше доступне джерело для файлу табеля.
+
+    .csv та .db/.sqlite відкриваються відповідним джерелом. Для .xlsx:
+    актуальний кеш розібраного табеля -> сховище позначок app.db або
+    CSV-експорт (поруч з табелем) поточної версії файлу -> розбір самого xlsx.
+    """
+    ext = os.path.splitext(tabel_file)[1].lower()
+    if ext == ".csv":
+        return CsvTabelSource(tabel_file)
+    if ext in (".db", ".sqlite", ".sqlite3"):
+        return SqliteTabelSource(tabel_file)
+
+    xlsx = XlsxTabelSource(tabel_file)
+    if xlsx.peek() is not None:
+        return xlsx
+    for export in (SqliteTabelSource(DB_PATH), CsvTabelSource(csv_path_for(tabel_file))):
+        if export.exists() and export.fresh_for(tabel_file):
+            return export
+    return xlsx
@@ -0,0 +1,311 @@
+"""
+Мінімальний читач значень одного аркуша .xlsx (zipfile + iterparse).
+
+Для read-only запитів потрібні лише значення одного аркуша, тому тут не
+розбираються стилі, формати та інші аркуші: назва аркуша знаходиться через
+xl/workbook.xml та його rels, sharedStrings.xml читається один раз,
+а потрібний sheetN.xml обробляється потоково.
+
+Значення повертаються "сирими": рядки, int/float, bool, коди помилок ("#N/A").
+Дати зберігаються в Excel як числа — перетворюйте їх через excel_serial_to_datetime().
+"""
+import hashlib
+import io
+import posixpath
+import struct
+import zipfile
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import iterparse, fromstring
+
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# Розмір фіксованої частини локального заголовка запису zip
+_LOCAL_HEADER_SIZE = 30
+
+_EPOCH_1900 = datetime(1899, 12, 30)
+_EPOCH_1904 = datetime(1904, 1, 1)
+
+
+def excel_serial_to_datetime(value, date1904: bool = False) -> datetime:
+    """Перетворює серійний номер дати Excel на datetime."""
+    serial = float(value)
+    if date1904:
+        return _EPOCH_1904 + timedelta(days=serial)
+    if serial < 60:
+        # Excel вважає 1900 рік високосним — до 01.03.1900 зсув на день
+        serial += 1
+    return _EPOCH_1900 + timedelta(days=serial)
+
+
+def _column_index(ref: str) -> int:
+    """'AB12' -> 28 (1-based номер стовпця)."""
+    col = 0
+    for ch in ref:
+        if "A" <= ch <= "Z":
+            col = col * 26 + (ord(ch) - 64)
+        else:
+            break
+    return col
+
+
+def _parse_number(text: str):
+    """Число з <v>: int, якщо ціле без експоненти, інакше float."""
+    if "." in text or "E" in text or "e" in text:
+        return float(text)
+    return int(text)
+
+
+class XlsxReader:
+    """Читач значень аркушів .xlsx без openpyxl"""
+
+    def __init__(self, source):
+        """
+        Args:
+            source: Шлях до .xlsx або file-like об'єкт (наприклад, BytesIO)
+        """
+        self._zip = zipfile.ZipFile(source)
+        self._ns = ""
+        self._shared_strings: Optional[List[str]] = None
+        self._sheet_paths: Dict[str, str] = {}
+        self._shared_strings_path: Optional[str] = None
+        self.sheetnames: List[str] = []
+        self.date1904 = False
+        self._read_workbook()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    # ---------- Структура книги ----------
+
+    def _read_rels(self, rels_path: str, base_dir: str) -> Dict[str, Tuple[str, str]]:
+        """{rId: (type, повний_шлях_у_zip)}"""
+        result = {}
+        try:
+            root = fromstring(self._zip.read(rels_path))
+        except KeyError:
+            return result
+        for rel in root.iter(f"{{{_PKG_REL_NS}}}Relationship"):
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                path = target.lstrip("/")
+            else:
+                path = posixpath.normpath(posixpath.join(base_dir, target))
+            result[rel.get("Id")] = (rel.get("Type", ""), path)
+        return result
+
+    def _read_workbook(self):
+        workbook_path = "xl/workbook.xml"
+        for rel_type, path in self._read_rels("_rels/.rels", "").values():
+            if rel_type.endswith("/officeDocument"):
+                workbook_path = path
+                break
+
+        base_dir = posixpath.dirname(workbook_path)
+        rels_path = posixpath.join(base_dir, "_rels", posixpath.basename(workbook_path) + ".rels")
+        rels = self._read_rels(rels_path, base_dir)
+
+        root = fromstring(self._zip.read(workbook_path))
+        if root.tag.startswith("{"):
+            self._ns = root.tag[:root.tag.index("}") + 1]
+        ns = self._ns
+
+        pr = root.find(f"{ns}workbookPr")
+        if pr is not None and pr.get("date1904") in ("1", "true"):
+            self.date1904 = True
+
+        sheets = root.find(f"{ns}sheets")
+        if sheets is not None:
+            for sheet in sheets.findall(f"{ns}sheet"):
+                name = sheet.get("name")
+                rel = rels.get(sheet.get(f"{{{_REL_NS}}}id"))
+                if name is None or rel is None:
+                    continue
+                self.sheetnames.append(name)
+                self._sheet_paths[name] = rel[1]
+
+        for rel_type, path in rels.values():
+            if rel_type.endswith("/sharedStrings"):
+                self._shared_strings_path = path
+                break
+
+    def _load_shared_strings(self) -> List[str]:
+        """Читає sharedStrings.xml один раз на екземпляр."""
+        if self._shared_strings is not None:
+            return self._shared_strings
+
+        strings: List[str] = []
+        if self._shared_strings_path:
+            ns = self._ns
+            tag_si, tag_t, tag_r = f"{ns}si", f"{ns}t", f"{ns}r"
+            try:
+                with self._zip.open(self._shared_strings_path) as f:
+                    for _, elem in iterparse(f, events=("end",)):
+                        if elem.tag != tag_si:
+                            continue
+                        parts = []
+                        for child in elem:
+                            if child.tag == tag_t:
+                                parts.append(child.text or "")
+                            elif child.tag == tag_r:
+                                t = child.find(tag_t)
+                                if t is not None:
+                                    parts.append(t.text or "")
+                        strings.append("".join(parts))
+                        elem.clear()
+            except KeyError:
+                pass
+        self._shared_strings = strings
+        return strings
+
+    # ---------- Відбитки вмісту ----------
+
+    def sheet_digest(self, sheet_name: str) -> str:
+        """SHA-1 байтів XML-частини аркуша (sheetN.xml) всередині zip."""
+        if sheet_name not in self._sheet_paths:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+        h = hashlib.sha1()
+        with self._zip.open(self._sheet_paths[sheet_name]) as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def shared_strings_digest(self) -> str:
+        """
+        SHA-1 списку спільних рядків (а не байтів sharedStrings.xml:
+        Excel переписує лічильники count при кожному збереженні).
+        """
+        h = hashlib.sha1()
+        for value in self._load_shared_strings():
+            h.update(value.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    # ---------- Читання рядків ----------
+
+    def iter_rows(self, sheet_name: str, max_col: Optional[int] = None) -> Iterator[tuple]:
+        """
+        Потоково генерує кортежі значень рядків аркуша, починаючи з 1-го рядка.
+        Пропущені рядки повертаються порожніми, щоб нумерація збігалась з Excel.
+
+        Args:
+            sheet_name: Назва аркуша
+            max_col: Обмеження кількості стовпців (рядки доповнюються None до max_col)
+        """
+        if sheet_name not in self._sheet_paths:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+
+        shared = self._load_shared_strings()
+        with self._zip.open(self._sheet_paths[sheet_name]) as f:
+            yield from _iter_sheet_xml(f, shared, self._ns, max_col)
+
+    def sheet_part(self, sheet_name: str) -> Tuple[bytes, int, List[str], str]:
+        """
+        Усе, що потрібно для розбору одного аркуша без решти книги (наприклад,
+        в іншому процесі): (стиснені байти sheetN.xml як у zip, метод стиснення,
+        спільні рядки, простір імен). Див. iter_sheet_part().
+        """
+        if sheet_name not in self._sheet_paths:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+        info = self._zip.getinfo(self._sheet_paths[sheet_name])
+        if info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            # Сирі байти з локального заголовка zip — без розпакування і
+            # повторного стиснення (XML аркуша в ~10 разів більший за стиснений)
+            fp = self._zip.fp
+            fp.seek(info.header_offset)
+            header = fp.read(_LOCAL_HEADER_SIZE)
+            name_len, extra_len = struct.unpack("<HH", header[26:30])
+            fp.seek(name_len + extra_len, io.SEEK_CUR)
+            data, compress_type = fp.read(info.compress_size), info.compress_type
+        else:
+            data, compress_type = self._zip.read(info), zipfile.ZIP_STORED
+        return data, compress_type, self._load_shared_strings(), self._ns
+
+
+def iter_sheet_part(part: Tuple[bytes, int, List[str], str],
+                    max_col: Optional[int] = None) -> Iterator[tuple]:
+    """Рядки аркуша з XlsxReader.sheet_part() (як XlsxReader.iter_rows)."""
+    data, compress_type, shared, ns = part
+    if compress_type == zipfile.ZIP_DEFLATED:
+        data = zlib.decompress(data, -zlib.MAX_WBITS)
+    yield from _iter_sheet_xml(io.BytesIO(data), shared, ns, max_col)
+
+
+def _iter_sheet_xml(f, shared: List[str], ns: str, max_col: Optional[int]) -> Iterator[tuple]:
+    tag_row, tag_c, tag_v, tag_is, tag_t = f"{ns}row", f"{ns}c", f"{ns}v", f"{ns}is", f"{ns}t"
+    empty_row = (None,) * max_col if max_col else ()
+
+    expected_row = 1
+    cells: Dict[int, object] = {}
+    next_col = 1
+
+    for _, elem in iterparse(f, events=("end",)):
+        tag = elem.tag
+        if tag == tag_c:
+            ref = elem.get("r")
+            col = _column_index(ref) if ref else next_col
+            next_col = col + 1
+            if max_col and col > max_col:
+                continue
+            value = _cell_value(elem, shared, tag_v, tag_is, tag_t)
+            if value is not None:
+                cells[col] = value
+        elif tag == tag_row:
+            r = elem.get("r")
+            row_number = int(r) if r else expected_row
+            while expected_row < row_number:
+                yield empty_row
+                expected_row += 1
+
+            width = max_col or (max(cells) if cells else 0)
+            values = [None] * width
+            for col, value in cells.items():
+                values[col - 1] = value
+            yield tuple(values)
+
+            expected_row = row_number + 1
+            cells = {}
+            next_col = 1
+            elem.clear()
+
+
+def _cell_value(elem, shared: List[str], tag_v: str, tag_is: str, tag_t: str):
+    cell_type = elem.get("t", "n")
+    if cell_type == "inlineStr":
+        is_elem = elem.find(tag_is)
+        if is_elem is None:
+            return None
+        return "".join(t.text or "" for t in is_elem.iter(tag_t))
+
+    v = elem.find(tag_v)
+    if v is None or v.text is None:
+        return None
+    text = v.text
+
+    if cell_type == "s":
+        return shared[int(text)]
+    if cell_type == "n":
+        return _parse_number(text)
+    if cell_type == "b":
+        return text == "1"
+    # "str" (рядок формули), "e" (помилка), "d" (ISO-дата) — як є
+    return text
+
+
+def read_sheet_rows(path, sheet_name: Optional[str] = None,
+                    max_col: Optional[int] = None) -> List[tuple]:
+    """
+    Повертає всі рядки одного аркуша (за замовчуванням — першого).
+    """
+    with XlsxReader(path) as reader:
+        if sheet_name is None:
+            sheet_name = reader.sheetnames[0]
+        return list(reader.iter_rows(sheet_name, max_col=max_col))
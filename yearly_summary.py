@@ -0,0 +1,246 @@
+"""
+Річне (або квартальне) зведення по бійцях для фінансової служби.
+
+Замість read_month_data по кожному аркушу і ручного підсумовування в
+Excel зведення рахується одним пакетним проходом по матрицях аркушів
+місяців: для кожного бійця (канонічний ПІБ) і місяця — дні 100 (з роп),
+30 та н-п, ознака "не виплачувати" з примітки та нараховані суми.
+
+Суми — орієнтовні: ані табель, ані рапорти ДГВ ставок не містять, тому
+розрахунок є припущенням. Ставки взято з назв рапортів (ДГВ 100к / 30к,
+н-п — 0), сума за місяць = ставка × дні / днів у місяці, для місяців з
+"не виплачувати" — 0. Якщо фінансова служба рахує інакше, змінюйте
+MONTHLY_RATES і YearlySummary.amounts; дні в зведенні від цього не залежать.
+
+Файл пишеться в режимі write-only openpyxl (рядки потоком, без моделі
+всіх комірок у пам'яті): аркуш "Зведення" — бійці × місяці з підсумками,
+аркуш "По місяцях" — рядок на бійця і місяць (зручно для зведених таблиць).
+
+Запуск з командного рядка:
+    python yearly_summary.py [рік] [шлях_до_табеля]
+"""
+import calendar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+
+from month_utils import MONTH_NAMES_UK_REVERSE
+from pib_resolver import canonical_pib
+from tabel_catalog import TabelCatalog, get_catalog
+from tabel_matrix import MARK_100, MARK_ROP, MARK_30, MARK_0
+
+# Категорії зведення: (назва, коди позначок)
+CATEGORIES: List[Tuple[str, Tuple[int, ...]]] = [
+    ("100", (MARK_100, MARK_ROP)),
+    ("30", (MARK_30,)),
+    ("0", (MARK_0,)),
+]
+CATEGORY_TITLES = {"100": "100/роп", "30": "30", "0": "н-п"}
+
+# Місячні ставки категорій (грн) — припущення за назвами рапортів ДГВ_100к/ДГВ_30к,
+# у табелі та рапортах сум немає (див. опис модуля)
+MONTHLY_RATES = {"100": 100000, "30": 30000, "0": 0}
+
+NO_PAYMENT_NOTE = "не виплачувати"
+
+
+class YearlySummary:
+    """Дні та суми по бійцях і місяцях"""
+
+    def __init__(self, months: List[Tuple[int, int]], pibs: List[str], ranks: List[str],
+                 positions: List[str], days: np.ndarray, no_payment: np.ndarray):
+        # [(рік, місяць)] у хронологічному порядку
+        self.months = months
+        # Останні відомі ПІБ/звання/посада бійців
+        self.pibs = pibs
+        self.ranks = ranks
+        self.positions = positions
+        # Дні: бійці × місяці × категорії (порядок CATEGORIES), int32
+        self.days = days
+        # "не виплачувати" в примітці: бійці × місяці
+        self.no_payment = no_payment
+
+    def __len__(self) -> int:
+        return len(self.pibs)
+
+    def __repr__(self):
+        return f"YearlySummary(бійців: {len(self)}, місяців: {len(self.months)})"
+
+    @property
+    def amounts(self) -> np.ndarray:
+        """Нараховані суми (грн): бійці × місяці × категорії"""
+        month_days = np.array([calendar.monthrange(y, m)[1] for y, m in self.months], dtype=np.float64)
+        rates = np.array([MONTHLY_RATES[name] for name, _ in CATEGORIES], dtype=np.float64)
+        amounts = self.days * rates[None, None, :] / month_days[None, :, None]
+        amounts[self.no_payment] = 0
+        return np.round(amounts, 2)
+
+    def month_title(self, i: int) -> str:
+        year, month = self.months[i]
+        return f"{MONTH_NAMES_UK_REVERSE[month]} {year}"
+
+
+def build_summary(catalog: TabelCatalog, year: Optional[int] = None,
+                  first_month: int = 1, last_month: int = 12) -> YearlySummary:
+    """
+    Зведення по аркушах місяців табеля.
+
+    Args:
+        catalog: Каталог версії табеля
+        year: Рік (None — усі роки табеля)
+        first_month, last_month: Межі місяців (наприклад, 4-6 для II кварталу)
+    """
+    keys = sorted(key for key in catalog.month_sheets
+                  if (year is None or key[0] == year) and first_month <= key[1] <= last_month)
+    matrices = [catalog.tabel.matrices.get(catalog.month_sheets[key]) for key in keys]
+    months = [key for key, matrix in zip(keys, matrices) if matrix is not None]
+    matrices = [matrix for matrix in matrices if matrix is not None]
+
+    index: Dict[str, int] = {}
+    pibs: List[str] = []
+    ranks: List[str] = []
+    positions: List[str] = []
+    blocks = []
+    for m, matrix in enumerate(matrices):
+        people = []
+        for pib, rank, position in zip(matrix.pibs.tolist(), matrix.ranks.tolist(),
+                                       matrix.positions.tolist()):
+            key = canonical_pib(pib)
+            idx = index.get(key)
+            if idx is None:
+                idx = index[key] = len(pibs)
+                pibs.append(pib)
+                ranks.append(rank)
+                positions.append(position)
+            else:
+                pibs[idx], ranks[idx], positions[idx] = pib, rank or ranks[idx], position or positions[idx]
+            people.append(idx)
+
+        marks = matrix.marks[:, :matrix.days_in_month]
+        counts = np.stack([np.isin(marks, codes).sum(axis=1) for _, codes in CATEGORIES], axis=1)
+        no_payment = np.array([NO_PAYMENT_NOTE in note.lower() for note in matrix.notes.tolist()],
+                              dtype=bool)
+        blocks.append((m, np.array(people, dtype=np.int64), counts, no_payment))
+
+    days = np.zeros((len(pibs), len(months), len(CATEGORIES)), dtype=np.int32)
+    flags = np.zeros((len(pibs), len(months)), dtype=bool)
+    for m, people, counts, no_payment in blocks:
+        # Дублікати ПІБ на аркуші підсумовуються
+        np.add.at(days[:, m, :], people, counts)
+        np.logical_or.at(flags[:, m], people, no_payment)
+
+    # Алфавітний порядок, як у списках особового складу
+    order = sorted(range(len(pibs)), key=lambda i: pibs[i])
+    return YearlySummary(months, [pibs[i] for i in order], [ranks[i] for i in order],
+                         [positions[i] for i in order], days[order], flags[order])
+
+
+def get_summary(tabel_file: str, year: Optional[int] = None,
+                first_month: int = 1, last_month: int = 12) -> YearlySummary:
+    """Зведення поточної версії файлу табеля"""
+    return build_summary(get_catalog(tabel_file), year, first_month, last_month)
+
+
+def _header_cells(ws, titles: List[str]) -> List[WriteOnlyCell]:
+    font = Font(bold=True, size=10)
+    fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+    alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    cells = []
+    for title in titles:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font, cell.fill, cell.alignment = font, fill, alignment
+        cells.append(cell)
+    return cells
+
+
+def export_summary(summary: YearlySummary, output_file: str, title: str = "") -> str:
+    """
+    Записує зведення у xlsx (write-only).
+
+    Returns:
+        Шлях до створеного файлу
+    """
+    amounts = summary.amounts
+    names = [name for name, _ in CATEGORIES]
+    paid = [name for name in names if MONTHLY_RATES[name]]
+
+    wb = Workbook(write_only=True)
+
+    # ---------- Зведення: бійці × місяці ----------
+    ws = wb.create_sheet("Зведення")
+    ws.column_dimensions["A"].width = 6
+    ws.column_dimensions["B"].width = 18
+    ws.column_dimensions["C"].width = 32
+    ws.column_dimensions["D"].width = 24
+    ws.freeze_panes = "E3"
+    if title:
+        ws.append([title])
+    else:
+        ws.append([f"Зведення по бійцях: {summary.month_title(0)} — {summary.month_title(-1)}"
+                   if summary.months else "Зведення по бійцях"])
+
+    headers = ["№", "Звання", "ПІБ", "Посада"]
+    for i in range(len(summary.months)):
+        headers += [f"{summary.month_title(i)}\n{CATEGORY_TITLES[name]}" for name in names]
+    headers += [f"Всього\n{CATEGORY_TITLES[name]}" for name in names]
+    headers += [f"Місяців\n«{NO_PAYMENT_NOTE}»"]
+    headers += [f"Сума {CATEGORY_TITLES[name]}, грн" for name in paid] + ["Сума разом, грн"]
+    ws.append(_header_cells(ws, headers))
+
+    total_days = summary.days.sum(axis=1)
+    total_amounts = amounts.sum(axis=1)
+    no_payment_months = summary.no_payment.sum(axis=1)
+    paid_idx = [names.index(name) for name in paid]
+    for i, pib in enumerate(summary.pibs):
+        row = [i + 1, summary.ranks[i], pib, summary.positions[i]]
+        row += summary.days[i].ravel().tolist()
+        row += total_days[i].tolist()
+        row.append(int(no_payment_months[i]))
+        row += [float(total_amounts[i, c]) for c in paid_idx]
+        row.append(float(total_amounts[i].sum()))
+        ws.append(row)
+
+    # ---------- По місяцях: рядок на бійця і місяць ----------
+    ws = wb.create_sheet("По місяцях")
+    for letter, width in zip("ABCDE", (18, 32, 16, 10, 10)):
+        ws.column_dimensions[letter].width = width
+    headers = ["Звання", "ПІБ", "Місяць"] + [CATEGORY_TITLES[name] for name in names]
+    headers += [NO_PAYMENT_NOTE] + [f"Сума {CATEGORY_TITLES[name]}, грн" for name in paid]
+    headers += ["Сума разом, грн"]
+    ws.append(_header_cells(ws, headers))
+    person_idx, month_idx = np.nonzero(summary.days.sum(axis=2) | summary.no_payment)
+    for i, m in zip(person_idx.tolist(), month_idx.tolist()):
+        row = [summary.ranks[i], summary.pibs[i], summary.month_title(m)]
+        row += summary.days[i, m].tolist()
+        row.append(NO_PAYMENT_NOTE if summary.no_payment[i, m] else "")
+        row += [float(amounts[i, m, c]) for c in paid_idx]
+        row.append(float(amounts[i, m].sum()))
+        ws.append(row)
+
+    wb.save(output_file)
+    print(f"Створено зведення: {output_file} (бійців: {len(summary)}, місяців: {len(summary.months)})")
+    return output_file
+
+
+def export_yearly_summary(tabel_file: str, year: int, output_file: Optional[str] = None) -> str:
+    """Рахує і записує зведення за рік (файл за замовчуванням — Зведення_<рік>.xlsx)"""
+    summary = get_summary(tabel_file, year)
+    if not summary.months:
+        raise ValueError(f"У табелі немає аркушів місяців за {year} рік")
+    return export_summary(summary, output_file or f"Зведення_{year}.xlsx",
+                          f"Зведення по бійцях за {year} рік")
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    from path_utils import get_app_dir
+
+    summary_year = int(sys.argv[1]) if len(sys.argv) > 1 else datetime.now().year
+    tabel_path = sys.argv[2] if len(sys.argv) > 2 else \
+        os.path.join(get_app_dir(), "Табель_Багатомісячний.xlsx")
+    export_yearly_summary(tabel_path, summary_year)